@@ -0,0 +1,241 @@
+"""Benchmark every pipeline stage on synthetic data of growing size.
+
+    python -m benchmarks.run [--scales 1,2,4,8] [--stages bias_amr,...] [--output PATH]
+                             [--compare BASELINE] [--figures]
+
+Scale s uses s * --docs charters and s * --graphs AMR graphs, generated from
+--seed. Each stage runs twice in a fresh interpreter with a cache directory
+of its own: "cold" with empty caches, then "warm" reusing what the first run
+stored. Timings, peak memory and the installed versions of penman, NLTK,
+transformers etc. go to a JSON file; --compare reads such a file as the
+baseline and exits with status 1 when a stage got slower than --tolerance.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import metadata
+
+from benchmarks.synthetic import write_amr, write_charters
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+STAGES = [
+    "create_csv_sentence",     # sentence extraction
+    "bias_exploration",
+    "data_exploration",        # word frequency
+    "bias_pos_tag",
+    "bias_amr",                # AMR concept counting
+    "bias_position_in_graph",  # structure analysis
+    "amr_embed",               # embedding
+]
+PACKAGES = ["penman", "nltk", "transformers", "torch", "numpy", "pandas", "matplotlib"]
+PHASES = ["cold", "warm"]
+
+
+def versions():
+    found = {"python": platform.python_version()}
+    for package in PACKAGES:
+        try:
+            found[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            found[package] = None
+    return found
+
+
+def run_stage(stage, workdir, cache_dir, figures=False):
+    """Measurements of one run of `stage` in a fresh interpreter, or {"error": ...}."""
+    command = [sys.executable, "-m", "benchmarks.stage", stage, workdir, cache_dir]
+    if figures:
+        command.append("--figures")
+    env = dict(os.environ, MPLBACKEND="Agg", PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    proc = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else f"exit status {proc.returncode}"}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["wall_seconds"] = wall
+    return result
+
+
+def prepare(workdir, scale, args, stages):
+    """Generate the inputs of one scale; returns their sizes."""
+    txt_dir = os.path.join(workdir, "txts")
+    amr_path = os.path.join(workdir, "synthetic.amr")
+    write_charters(txt_dir, args.docs * scale, seed=args.seed)
+    write_amr(amr_path, args.graphs * scale, seed=args.seed)
+    if "bias_pos_tag" in stages:
+        # POS tagging reads the sentence CSV; extract it once, untimed
+        prepare_dir = os.path.join(workdir, "_prepare")
+        result = run_stage("create_csv_sentence", workdir, prepare_dir)
+        if "error" in result:
+            raise SystemExit(f"preparing the sentence CSV failed: {result['error']}")
+        for name in ("bias-MapAIE.csv", "bias-MapAIE.parquet"):  # whichever sentence_format wrote
+            if os.path.exists(os.path.join(prepare_dir, name)):
+                shutil.copy(os.path.join(prepare_dir, name), os.path.join(workdir, name))
+    return {
+        "documents": args.docs * scale,
+        "text_bytes": sum(entry.stat().st_size for entry in os.scandir(txt_dir)),
+        "graphs": args.graphs * scale,
+        "amr_bytes": os.path.getsize(amr_path),
+    }
+
+
+def scaling_exponent(points):
+    """Least-squares slope of log(seconds) against log(scale): 1 is linear, 2 quadratic."""
+    points = [(math.log(x), math.log(y)) for x, y in points if y > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    if var == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var
+
+
+def plot_scaling(report, path):
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    for stage, runs in report["runs"].items():
+        scales = sorted((int(s) for s in runs if "error" not in runs[s]["cold"]))
+        if not scales:
+            continue
+        cold = [runs[str(s)]["cold"]["seconds"] for s in scales]
+        warm = [runs[str(s)]["warm"].get("seconds", float("nan")) for s in scales]
+        memory = [max(runs[str(s)]["cold"]["peak_rss_mb"], runs[str(s)]["cold"]["children_peak_rss_mb"])
+                  for s in scales]
+        axes[0].plot(scales, cold, marker="o", label=stage)
+        axes[1].plot(scales, warm, marker="o", label=stage)
+        axes[2].plot(scales, memory, marker="o", label=stage)
+    for ax, title, ylabel in zip(axes, ["Cold run", "Warm run", "Peak memory (cold)"],
+                                 ["Seconds", "Seconds", "MiB"]):
+        ax.set_xscale("log", base=2)
+        ax.set_yscale("log")
+        ax.set_title(title)
+        ax.set_xlabel("Scale")
+        ax.set_ylabel(ylabel)
+        ax.grid(alpha=0.3)
+    axes[0].legend(fontsize=8)
+    plt.tight_layout()
+    plt.savefig(path, dpi=150, bbox_inches="tight")
+    plt.close()
+
+
+def compare(report, baseline, tolerance, min_seconds):
+    """Print stages slower than the baseline by more than `tolerance`; return how many there are."""
+    changed = {k: (v, report["versions"].get(k)) for k, v in baseline.get("versions", {}).items()
+               if report["versions"].get(k) != v}
+    for package, (old, new) in changed.items():
+        print(f"  {package}: {old} -> {new}")
+
+    regressions = 0
+    for stage, runs in report["runs"].items():
+        for scale, phases in runs.items():
+            for phase in PHASES:
+                old = baseline.get("runs", {}).get(stage, {}).get(scale, {}).get(phase, {})
+                new = phases.get(phase, {})
+                if "seconds" not in old or "seconds" not in new or old["seconds"] < min_seconds:
+                    continue
+                ratio = new["seconds"] / old["seconds"]
+                if ratio > 1 + tolerance:
+                    regressions += 1
+                    print(f"  REGRESSION {stage} x{scale} {phase}: "
+                          f"{old['seconds']:.3f}s -> {new['seconds']:.3f}s ({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data.")
+    parser.add_argument("--scales", default="1,2,4,8", help="comma-separated size multipliers")
+    parser.add_argument("--docs", type=int, default=50, help="charters at scale 1")
+    parser.add_argument("--graphs", type=int, default=500, help="AMR graphs at scale 1")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated stage names")
+    parser.add_argument("--figures", action="store_true", help="let stages draw their figures (default: headless)")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="ignore baseline timings below this")
+    parser.add_argument("--no-plot", action="store_true", help="skip the scaling-curve figure")
+    parser.add_argument("--workdir", help="where to generate data (default: a temporary directory)")
+    args = parser.parse_args()
+
+    scales = [int(s) for s in args.scales.split(",")]
+    stages = args.stages.split(",")
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "versions": versions(),
+        "settings": {"docs": args.docs, "graphs": args.graphs, "seed": args.seed, "scales": scales,
+                     "figures": args.figures},
+        "sizes": {},
+        "runs": {stage: {} for stage in stages},
+        "scaling": {},
+    }
+
+    root = args.workdir or tempfile.mkdtemp(prefix="chai-bench-")
+    try:
+        failed = set()
+        for scale in scales:
+            workdir = os.path.join(root, f"scale_{scale}")
+            report["sizes"][str(scale)] = prepare(workdir, scale, args, stages)
+            for stage in stages:
+                if stage in failed:
+                    continue
+                cache_dir = os.path.join(workdir, stage)
+                phases = {"cold": run_stage(stage, workdir, cache_dir, args.figures)}
+                if "error" in phases["cold"]:
+                    failed.add(stage)
+                    print(f"{stage:24s} x{scale:<3d} failed: {phases['cold']['error']}")
+                else:
+                    phases["warm"] = run_stage(stage, workdir, cache_dir, args.figures)
+                    cold, warm = phases["cold"], phases["warm"]
+                    print(f"{stage:24s} x{scale:<3d} cold {cold['seconds']:8.3f}s  "
+                          f"warm {warm.get('seconds', float('nan')):8.3f}s  "
+                          f"import {cold['import_seconds']:6.3f}s  "
+                          f"rss {max(cold['peak_rss_mb'], cold['children_peak_rss_mb']):7.1f} MiB")
+                report["runs"][stage][str(scale)] = phases
+    finally:
+        if not args.workdir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    for stage, runs in report["runs"].items():
+        points = [(int(s), r["cold"]["seconds"]) for s, r in runs.items() if "seconds" in r["cold"]]
+        report["scaling"][stage] = scaling_exponent(points)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nScaling exponents (cold seconds vs. scale): "
+          + ", ".join(f"{s}={e:.2f}" for s, e in report["scaling"].items() if e is not None))
+    print(f"Results written to {args.output}")
+
+    if not args.no_plot:
+        plot_path = os.path.splitext(args.output)[0] + "_scaling.png"
+        plot_scaling(report, plot_path)
+        print(f"Scaling curves written to {plot_path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nComparison with {args.compare}:")
+        if compare(report, baseline, args.tolerance, args.min_seconds):
+            raise SystemExit(1)
+        print("  no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Run one pipeline stage on a benchmark workdir and print its timings as JSON.
+
+    python -m benchmarks.stage <stage> <workdir> <cache_dir> [--figures]
+
+Started in a fresh process by benchmarks.run so that imports, caches and
+peak memory are measured per stage. The config is pointed at the workdir
+before any stage module is imported, since they read it at import time.
+"""
+import contextlib
+import importlib
+import json
+import os
+import resource
+import sys
+import time
+
+
+def main():
+    stage, workdir, cache_dir = sys.argv[1:4]
+    figures = "--figures" in sys.argv[4:]
+
+    from src.config import cfg
+    from src.instrument import peak_rss_mb
+    cfg.txt_path = os.path.join(workdir, "txts")
+    cfg.amr_path = os.path.join(workdir, "synthetic.amr")
+    # sentence extraction writes its own CSV (and manifest); POS tagging reads the prepared one
+    csv_dir = cache_dir if stage == "create_csv_sentence" else workdir
+    cfg.MapAIE_csv_path = os.path.join(csv_dir, "bias-MapAIE.csv")
+    cfg.cache_dir = cache_dir
+    cfg.results_dir = os.path.join(cache_dir, "results")
+    cfg.headless = not figures
+    os.makedirs(os.path.join(cache_dir, "figures"), exist_ok=True)
+    os.chdir(cache_dir)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        module = importlib.import_module(f"src.{stage}")
+        imported = time.perf_counter()
+        module.main()
+        done = time.perf_counter()
+
+    print(json.dumps({
+        "import_seconds": imported - start,
+        "seconds": done - imported,
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF),
+        "children_peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Seeded synthetic stand-ins for the MapAIE charters and the bias AMR file"""
+import os
+import random
+
+SUBJECTS = [
+    "AI systems", "Developers", "Organisations", "Public authorities", "Data scientists",
+    "Providers", "Deployers", "Algorithms", "Member states", "Research teams",
+]
+VERBS = [
+    "must avoid", "should mitigate", "shall assess", "need to document", "are expected to monitor",
+    "commit to reducing", "must not reinforce", "should report", "will audit", "must address",
+]
+BIAS_OBJECTS = [
+    "bias", "algorithmic bias", "biases in training data", "gender bias", "unfair bias",
+    "bias and discrimination", "systemic bias", "any bias", "cognitive biases", "historical bias",
+]
+OBJECTS = [
+    "unfair discrimination", "risks to fundamental rights", "privacy harms", "opacity",
+    "unintended consequences", "security incidents", "environmental impacts", "misuse",
+]
+CLAUSES = [
+    "throughout the lifecycle", "before deployment", "in line with human rights law",
+    "e.g. through independent audits", "i.e. at every stage of design", "including data quality checks",
+    "where appropriate", "in consultation with Dr. Smith's committee", "as set out in Art. 5",
+]
+VOCABULARY = (
+    "the of and to in a for is that be on ai with as by data are or this it systems should "
+    "human rights use can development ethical principles must all from at their which will "
+    "technology society people trust transparency accountability fairness privacy safety "
+    "security responsibility oversight governance public research design deployment risk "
+    "impact values autonomy dignity justice inclusion diversity sustainability innovation "
+    "education law regulation standards stakeholders users citizens information decisions "
+    "models algorithms machine learning intelligence artificial benefit harm control "
+    "explainability robustness reliability well-being environment cooperation international"
+).split()
+
+CONCEPTS = [
+    "system", "data", "person", "ai", "model", "algorithm", "right-05", "fair-01", "have-03",
+    "reduce-01", "discriminate-02", "ensure-01", "avoid-01", "develop-02", "use-01", "human",
+    "society", "risk-01", "transparent", "protect-01", "possible-01", "obligate-01",
+]
+BIAS_CONCEPTS = ["bias", "bias-01"]
+ROLES = [":ARG0", ":ARG1", ":ARG2", ":mod", ":poss", ":topic", ":manner", ":purpose", ":location"]
+
+
+def _zipf_words(rng, n):
+    weights = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+    return rng.choices(VOCABULARY, weights=weights, k=n)
+
+
+def charter_sentence(rng, bias_rate):
+    """One sentence: a templated obligation, mentioning bias with probability `bias_rate`, or Zipfian filler."""
+    if rng.random() < 0.5:
+        obj = rng.choice(BIAS_OBJECTS) if rng.random() < bias_rate else rng.choice(OBJECTS)
+        return f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {obj} {rng.choice(CLAUSES)}."
+    words = _zipf_words(rng, rng.randint(6, 30))
+    if rng.random() < bias_rate / 2:
+        words.insert(rng.randrange(len(words)), rng.choice(["bias", "biases", "Bias", "bias-free"]))
+    return " ".join(words).capitalize() + rng.choice([".", ".", ".", ";", "!", "?"])
+
+
+def charter(rng, n_sentences, bias_rate):
+    """A charter: title, then numbered principles of a few sentences each."""
+    lines = [f"Charter on trustworthy AI no. {rng.randint(1, 999)}", ""]
+    principle = 0
+    while n_sentences > 0:
+        principle += 1
+        k = min(n_sentences, rng.randint(1, 6))
+        n_sentences -= k
+        lines.append(f"{principle}. " + " ".join(charter_sentence(rng, bias_rate) for _ in range(k)))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def write_charters(directory, n_docs, seed=0, sentences=(20, 200), bias_rate=0.3):
+    """Write `n_docs` charters named charter_<n>.txt into `directory`; same seed, same files."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    for i in range(n_docs):
+        text = charter(rng, rng.randint(*sentences), bias_rate)
+        with open(os.path.join(directory, f"charter_{i:05d}.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def amr_graph(rng, graph_id, bias_rate):
+    """A Penman graph with nested roles, re-entrancies, polarity and a ::snt line."""
+    n_vars = rng.randint(2, 12)
+    concepts = [rng.choice(CONCEPTS) for _ in range(n_vars)]
+    if rng.random() < bias_rate:
+        concepts[rng.randrange(n_vars)] = rng.choice(BIAS_CONCEPTS)
+    used = {0}
+
+    def node(i, depth):
+        indent = "   " * (depth + 1)
+        out = f"(v{i} / {concepts[i]}"
+        children = [j for j in range(i + 1, n_vars) if j not in used and rng.random() < 0.4]
+        used.update(children)
+        for j in children:
+            out += f"\n{indent}{rng.choice(ROLES)} " + node(j, depth + 1)
+        if rng.random() < 0.15:
+            out += f"\n{indent}:polarity -"
+        if i > 0 and rng.random() < 0.15:
+            out += f"\n{indent}:ARG1 v0"
+        if rng.random() < 0.05:
+            out += f'\n{indent}:name (n{i} / name :op1 "{rng.choice(SUBJECTS).split()[0]}")'
+        return out + ")"
+
+    sentence = charter_sentence(rng, bias_rate)
+    return f"# ::id synthetic_{graph_id}\n# ::snt {sentence}\n" + node(0, 0)
+
+
+def write_amr(path, n_graphs, seed=0, bias_rate=0.6):
+    """Write `n_graphs` Penman graphs separated by blank lines to `path`."""
+    rng = random.Random(seed)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n_graphs):
+            f.write(amr_graph(rng, i, bias_rate) + "\n\n")
@@ -0,0 +1,215 @@
+"""Alignment of the AMR graphs with the rows of the sentence corpus, by hashed sentence text
+
+    python -m src.alignment [--graph 12] [--id synthetic_12] [--row 40]
+
+Each graph's `::snt` and each row's `sentence` are normalized (NFKC,
+casefolded, only word characters kept, so "AI's" and "AI 's" agree) and
+hashed to 64 bits. Joining the two sorted key arrays gives, in both
+directions, CSR tables: graph g's rows are `graph_rows[graph_offsets[g]:
+graph_offsets[g + 1]]`, and row r's graphs are read the same way from
+`row_graphs`. Every lookup is then a slice. The index is cached in
+`cache_dir`, keyed by the AMR cache key and the content of the sentence file.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import unicodedata
+
+import numpy as np
+
+from src import amr_cache
+from src.amr_loader import iter_records
+from src.config import cfg
+from src.instrument import iter_measured, measure
+from src.manifest import file_hash
+from src.sentence_store import doc_key, iter_sentences, sentences_path
+
+CACHE_DIR = getattr(cfg, "cache_dir", os.path.join("data", "cache"))
+ALIGNMENT_FORMAT = 1
+NO_DOC = -1  # doc_id of rows whose filename had no digits
+_WORD = re.compile(r"\w+")
+
+
+def alignment_path(amr_path):
+    return os.path.join(CACHE_DIR, os.path.basename(amr_path) + ".alignment.npz")
+
+
+def normalize(sentence):
+    """The word characters of a sentence, NFKC-normalized and casefolded, without the spaces between them."""
+    return "".join(_WORD.findall(unicodedata.normalize("NFKC", sentence).casefold()))
+
+
+def sentence_key(sentence):
+    """64-bit hash of the normalized sentence; 0 for an empty or missing one, which never aligns."""
+    if not isinstance(sentence, str):
+        return 0
+    text = normalize(sentence)
+    if not text:
+        return 0
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True) or 1
+
+
+def _doc_number(doc_id):
+    key = doc_key(doc_id)
+    return NO_DOC if key is None else key
+
+
+def _join(keys, other_keys):
+    """CSR (offsets, matches) of the positions in `other_keys` equal to each of `keys`, in position order."""
+    order = np.argsort(other_keys, kind="stable")
+    sorted_keys = other_keys[order]
+    lo = np.searchsorted(sorted_keys, keys, "left")
+    counts = np.where(keys != 0, np.searchsorted(sorted_keys, keys, "right") - lo, 0)
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    within = np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts)
+    return offsets, order[np.repeat(lo, counts) + within]
+
+
+class SentenceAlignment:
+    """Graph <-> sentence-row links between cfg.amr_path and the sentence corpus.
+
+    Graphs are numbered from 0 in file order, as in AMRCorpus; rows from 0
+    in the order of the sentence file. A graph can align with several rows
+    (the sentence is repeated across documents, or found for several terms),
+    and a row with several graphs.
+    """
+
+    def __init__(self, graph_keys, graph_ids, row_keys, row_docs):
+        self.graph_keys = graph_keys
+        self.graph_ids = graph_ids
+        self.row_keys = row_keys
+        self.row_docs = row_docs
+        self.graph_offsets, self.graph_rows = _join(graph_keys, row_keys)
+        self.row_offsets, self.row_graphs = _join(row_keys, graph_keys)
+        self._numbers = None
+
+    @classmethod
+    def build(cls, amr_path=None, sentence_path=None):
+        """Hash the `::snt` of every graph and the sentence of every row."""
+        graph_keys, graph_ids = [], []
+        for _, _, metadata in iter_records(amr_path or cfg.amr_path):
+            graph_keys.append(sentence_key(metadata.get("snt")))
+            graph_ids.append(metadata.get("id", ""))
+        row_keys, row_docs = [], []
+        chunks = iter_sentences(sentence_path or sentences_path(), columns=["doc_id", "sentence"])
+        for chunk in iter_measured("sentence_hash", chunks, size=len):
+            row_keys.extend(sentence_key(s) for s in chunk["sentence"])
+            row_docs.extend(_doc_number(d) for d in chunk["doc_id"])
+        return cls(np.array(graph_keys, dtype=np.int64), graph_ids,
+                   np.array(row_keys, dtype=np.int64), np.array(row_docs, dtype=np.int64))
+
+    def save(self, path, key):
+        encoded = [s.encode("utf-8") for s in self.graph_ids]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            key=np.array(json.dumps(key)),
+            graph_keys=self.graph_keys,
+            id_bytes=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            id_offsets=np.cumsum([0] + [len(e) for e in encoded], dtype=np.int64),
+            row_keys=self.row_keys,
+            row_docs=self.row_docs,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def open(cls, path, key):
+        """The alignment saved at `path`, or None if it is missing or was saved under another key."""
+        try:
+            data = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        with data:
+            if str(data["key"]) != json.dumps(key):
+                return None
+            blob, bounds = data["id_bytes"].tobytes(), data["id_offsets"]
+            graph_ids = [blob[a:b].decode("utf-8") for a, b in zip(bounds[:-1], bounds[1:])]
+            return cls(data["graph_keys"], graph_ids, data["row_keys"], data["row_docs"])
+
+    def rows_of(self, graph):
+        """Rows of the sentence corpus whose sentence is that of graph number `graph`."""
+        return self.graph_rows[self.graph_offsets[graph]:self.graph_offsets[graph + 1]]
+
+    def graphs_of(self, row):
+        """Graph numbers whose `::snt` is the sentence of row `row`."""
+        return self.row_graphs[self.row_offsets[row]:self.row_offsets[row + 1]]
+
+    def documents_of(self, graph):
+        """[(doc_id, row)] of graph number `graph`; doc_id is None when the filename had no digits."""
+        rows = self.rows_of(graph)
+        return [(None if doc == NO_DOC else int(doc), int(row)) for doc, row in zip(self.row_docs[rows], rows)]
+
+    def graph_number(self, amr_id):
+        """Number of the graph with `::id` `amr_id`, or None."""
+        if self._numbers is None:
+            self._numbers = {amr_id: g for g, amr_id in reversed(list(enumerate(self.graph_ids)))}
+        return self._numbers.get(amr_id)
+
+    def pairs(self):
+        """(graph numbers, rows) of every aligned pair, by graph then row: the join table of the two corpora."""
+        graphs = np.repeat(np.arange(len(self.graph_keys)), np.diff(self.graph_offsets))
+        return graphs, self.graph_rows
+
+    def to_frame(self):
+        """The aligned pairs as a DataFrame (graph, amr_id, doc_id, row), to merge with per-graph or per-row results."""
+        import pandas as pd
+        graphs, rows = self.pairs()
+        docs = pd.array(self.row_docs[rows], dtype=pd.Int64Dtype())
+        docs[self.row_docs[rows] == NO_DOC] = pd.NA
+        return pd.DataFrame({"graph": graphs, "amr_id": [self.graph_ids[g] for g in graphs],
+                             "doc_id": docs, "row": rows})
+
+    def summary(self):
+        aligned_graphs = int((np.diff(self.graph_offsets) > 0).sum())
+        aligned_rows = int((np.diff(self.row_offsets) > 0).sum())
+        return {"graphs": len(self.graph_keys), "aligned_graphs": aligned_graphs,
+                "rows": len(self.row_keys), "aligned_rows": aligned_rows, "pairs": len(self.graph_rows)}
+
+
+def load_alignment(amr_path=None, sentence_path=None):
+    """The alignment of `amr_path` with the sentence corpus, from its cache when neither file changed."""
+    amr_path = amr_path or cfg.amr_path
+    sentence_path = sentence_path or sentences_path()
+    key = [ALIGNMENT_FORMAT, amr_cache.cache_key(amr_path), file_hash(sentence_path)]
+    path = alignment_path(amr_path)
+    alignment = SentenceAlignment.open(path, key)
+    if alignment is None:
+        with measure("alignment_build") as span:
+            alignment = SentenceAlignment.build(amr_path, sentence_path)
+            span["items"] = len(alignment.graph_keys)
+        alignment.save(path, key)
+    return alignment
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Link AMR graphs and sentence-corpus rows that share a sentence.")
+    parser.add_argument("--graph", type=int, action="append", default=[], help="graph number, from 1")
+    parser.add_argument("--id", action="append", default=[], help="::id of a graph")
+    parser.add_argument("--row", type=int, action="append", default=[], help="row of the sentence corpus, from 0")
+    args = parser.parse_args()
+
+    alignment = load_alignment()
+    summary = alignment.summary()
+    print(f"{summary['aligned_graphs']} of {summary['graphs']} graphs aligned with "
+          f"{summary['aligned_rows']} of {summary['rows']} sentence rows ({summary['pairs']} pairs).")
+    graphs = [g - 1 for g in args.graph] + [alignment.graph_number(amr_id) for amr_id in args.id]
+    for amr_id, g in zip(args.graph + args.id, graphs):
+        if g is None or not 0 <= g < len(alignment.graph_keys):
+            print(f"\nGraph {amr_id}: not found")
+            continue
+        print(f"\nGraph {g + 1} ({alignment.graph_ids[g]}):")
+        for doc_id, row in alignment.documents_of(g):
+            print(f"  doc {doc_id}, row {row}")
+    for row in args.row:
+        if not 0 <= row < len(alignment.row_keys):
+            print(f"\nRow {row}: not found")
+            continue
+        print(f"\nRow {row}: graphs {[int(g) + 1 for g in alignment.graphs_of(row)]}")
+
+
+if __name__ == "__main__":
+    main()
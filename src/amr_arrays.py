@@ -0,0 +1,217 @@
+"""Compact, array-backed AMR corpus: interned strings and CSR triple arrays"""
+import json
+import os
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from src import amr_cache
+from src.amr_loader import iter_records
+from src.config import cfg
+from src.instrument import measure
+
+CACHE_DIR = getattr(cfg, "cache_dir", os.path.join("data", "cache"))
+NONE = -1  # id of a missing target (penman uses None)
+
+
+def arrays_path(amr_path):
+    return os.path.join(CACHE_DIR, os.path.basename(amr_path) + ".arrays.npz")
+
+
+class AMRCorpus:
+    """Every graph of an AMR file as integer arrays.
+
+    Concepts, roles, variables and constants are interned into one list of
+    `strings`; triple k of the corpus is (`sources[k]`, `roles[k]`,
+    `targets[k]`), as ids into it. Graph g owns triples
+    `offsets[g]:offsets[g + 1]` (CSR layout) and has `tops[g]` as its top
+    variable. A node is identified corpus-wide by its key, which combines
+    the graph number and the variable id, so structure questions about every
+    node at once (is it a root, which roles point at it) become sorted-array
+    lookups instead of per-graph Python loops.
+    """
+
+    def __init__(self, strings, sources, roles, targets, offsets, tops):
+        self.strings = strings
+        self.ids = {s: i for i, s in enumerate(strings)}
+        self.sources = sources
+        self.roles = roles
+        self.targets = targets
+        self.offsets = offsets
+        self.tops = tops
+        self.graph_index = np.repeat(np.arange(len(tops), dtype=np.int64), np.diff(offsets))
+        self._sorted = {}
+
+    def __len__(self):
+        return len(self.tops)
+
+    @classmethod
+    def from_records(cls, records):
+        """Intern a stream of (top, triples, metadata) records."""
+        ids = {}
+        sources, roles, targets = array("i"), array("i"), array("i")
+        offsets, tops = array("q", [0]), array("i")
+
+        def intern(s):
+            if s is None:
+                return NONE
+            i = ids.get(s)
+            if i is None:
+                i = ids[s] = len(ids)
+            return i
+
+        for top, triples, _ in records:
+            for src, role, tgt in triples:
+                sources.append(intern(src))
+                roles.append(intern(role))
+                targets.append(intern(tgt))
+            offsets.append(len(sources))
+            tops.append(intern(top))
+        as_array = lambda a, dtype: np.frombuffer(a, dtype=dtype) if len(a) else np.empty(0, dtype=dtype)
+        return cls(list(ids), as_array(sources, np.int32), as_array(roles, np.int32),
+                   as_array(targets, np.int32), as_array(offsets, np.int64), as_array(tops, np.int32))
+
+    def save(self, path, key):
+        encoded = [s.encode("utf-8") for s in self.strings]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            key=np.array(json.dumps(key)),
+            string_bytes=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            string_offsets=np.cumsum([0] + [len(e) for e in encoded], dtype=np.int64),
+            sources=self.sources, roles=self.roles, targets=self.targets, offsets=self.offsets, tops=self.tops,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def open(cls, path, key):
+        """The corpus saved at `path`, or None if it is missing or was saved under another key."""
+        try:
+            data = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        with data:
+            if str(data["key"]) != json.dumps(key):
+                return None
+            blob, bounds = data["string_bytes"].tobytes(), data["string_offsets"]
+            strings = [blob[a:b].decode("utf-8") for a, b in zip(bounds[:-1], bounds[1:])]
+            return cls(strings, data["sources"], data["roles"], data["targets"], data["offsets"], data["tops"])
+
+    def string_id(self, s):
+        return self.ids.get(s, NONE - 1)  # an id no triple has
+
+    def graph(self, g):
+        """Graph number `g` (0-based) as a penman.Graph."""
+        lo, hi = self.offsets[g], self.offsets[g + 1]
+        string = lambda i: None if i == NONE else self.strings[i]
+        triples = [(string(s), string(r), string(t))
+                   for s, r, t in zip(self.sources[lo:hi], self.roles[lo:hi], self.targets[lo:hi])]
+        return amr_cache.from_record((string(self.tops[g]), triples, {}))
+
+    def instances(self):
+        """Indices of the :instance triples."""
+        return np.flatnonzero(self.roles == self.string_id(":instance"))
+
+    def concepts(self):
+        """Distinct concepts, in order of first appearance in the file."""
+        return [self.strings[i] for i in np.unique(self.targets[self.instances()]) if i != NONE]
+
+    def term_instances(self, matcher):
+        """{term: indices of the :instance triples whose concept contains it}, in triple order.
+
+        Each distinct concept string is matched once, not once per occurrence.
+        """
+        instances = self.instances()
+        concepts = self.targets[instances]
+        ids_by_term = {}
+        for i in np.unique(concepts):
+            if i == NONE:
+                continue
+            for term in matcher.terms_in(self.strings[i]):
+                ids_by_term.setdefault(term, []).append(i)
+        return {term: instances[np.isin(concepts, ids)] for term, ids in ids_by_term.items()}
+
+    def concept_counts(self, instances):
+        """Counter of lowercased concept -> occurrences among `instances`, in order of first appearance."""
+        ids, first, counts = np.unique(self.targets[instances], return_index=True, return_counts=True)
+        concepts = Counter()
+        for k in np.argsort(first, kind="stable"):
+            concepts[self.strings[ids[k]].lower()] += int(counts[k])
+        return concepts
+
+    def keys(self, column, triples=slice(None)):
+        """Corpus-wide keys of the ids in `column` (sources or targets) of `triples`; NONE shifts to 0."""
+        return self.graph_index[triples] * (len(self.strings) + 1) + column[triples].astype(np.int64) + 1
+
+    def node_keys(self, instances):
+        return self.keys(self.sources, instances)
+
+    def _sorted_keys(self, name):
+        """(stable argsort, sorted keys) of the target keys, the source keys or the non-instance source keys."""
+        if name not in self._sorted:
+            if name == "targets":
+                keys = self.keys(self.targets)
+            elif name == "sources":
+                keys = self.keys(self.sources)
+            else:  # sources of every role but :instance
+                keys = np.where(self.roles != self.string_id(":instance"), self.keys(self.sources), -1)
+            order = np.argsort(keys, kind="stable")
+            self._sorted[name] = (order, keys[order])
+        return self._sorted[name]
+
+    def is_root(self, instances):
+        """Whether each node is the target of no triple of its graph."""
+        _, keys = self._sorted_keys("targets")
+        return ~_contains(keys, self.node_keys(instances))
+
+    def is_leaf(self, instances):
+        """Whether each node has no role other than :instance."""
+        _, keys = self._sorted_keys("non_instance_sources")
+        return ~_contains(keys, self.node_keys(instances))
+
+    def incident(self, instances, direction):
+        """Indices of the triples into ("to") or out of ("from", :instance included) each node.
+
+        Node by node, each node's triples in corpus order, as a per-graph loop
+        over the nodes would visit them.
+        """
+        order, keys = self._sorted_keys("targets" if direction == "to" else "sources")
+        nodes = self.node_keys(instances)
+        lo = np.searchsorted(keys, nodes, "left")
+        counts = np.searchsorted(keys, nodes, "right") - lo
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return order[np.repeat(lo, counts) + within]
+
+    def role_counts(self, triples):
+        """Counter of role -> occurrences among `triples`, in order of first appearance."""
+        roles = self.roles[triples]
+        ids, first, counts = np.unique(roles, return_index=True, return_counts=True)
+        return Counter({self.strings[ids[k]]: int(counts[k]) for k in np.argsort(first, kind="stable")})
+
+
+def _contains(sorted_keys, keys):
+    pos = np.searchsorted(sorted_keys, keys)
+    return (pos < len(sorted_keys)) & (sorted_keys[np.minimum(pos, len(sorted_keys) - 1)] == keys)
+
+
+def load_amr_corpus(amr_path, key=None, end=None):
+    """The AMRCorpus of `amr_path`, from its cache when the file and penman are unchanged.
+
+    `key` is the file's amr_cache.cache_key, when the caller already has it.
+    With `end`, only the graphs before that byte offset are read, and `key`
+    must be the cache key of those bytes.
+    """
+    if key is None:
+        key = amr_cache.cache_key(amr_path)
+    path = arrays_path(amr_path)
+    with measure("amr_arrays_read") as span:
+        corpus = AMRCorpus.open(path, key)
+        span["items"] = len(corpus) if corpus is not None else 0
+    if corpus is None:
+        with measure("amr_arrays_build") as span:
+            corpus = AMRCorpus.from_records(iter_records(amr_path, key=key, end=end))
+            span["items"] = len(corpus)
+        corpus.save(path, key)
+    return corpus
@@ -0,0 +1,84 @@
+"""Persistent cache of parsed AMR graphs, keyed by file content and penman version"""
+import os
+import pickle
+import sys
+
+import penman
+
+from src.config import cfg
+from src.manifest import file_hash
+
+CACHE_DIR = getattr(cfg, "cache_dir", os.path.join("data", "cache"))
+CACHE_FORMAT = 2
+
+
+def cache_path(amr_path):
+    return os.path.join(CACHE_DIR, os.path.basename(amr_path) + ".graphs.pkl")
+
+
+def cache_key(amr_path, sha256=None):
+    """Key of the graphs of `amr_path`; `sha256`, the hex digest of the bytes to decode, replaces hashing the file."""
+    return (CACHE_FORMAT, penman.__version__, sha256 or file_hash(amr_path))
+
+
+def to_record(graph):
+    """Reduce a graph to (top, triples, metadata) with interned strings for compact pickling."""
+    triples = [
+        tuple(sys.intern(x) if isinstance(x, str) else x for x in triple)
+        for triple in graph.triples
+    ]
+    return graph.top, triples, graph.metadata
+
+
+def from_record(record):
+    top, triples, metadata = record
+    return penman.Graph(triples, top=top, metadata=metadata)
+
+
+def open_cache(amr_path, key):
+    """Return the cache file positioned after its header, or None if it is missing or stale."""
+    try:
+        f = open(cache_path(amr_path), "rb")
+    except OSError:
+        return None
+    try:
+        if pickle.load(f) == key:
+            return f
+    except (EOFError, pickle.UnpicklingError):
+        pass
+    f.close()
+    return None
+
+
+def iter_cached(f):
+    """Yield records from an open cache file, one pickled chunk at a time."""
+    with f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+
+class CacheWriter:
+    """Write record chunks to a temporary file and move it into place on commit."""
+
+    def __init__(self, amr_path, key):
+        self.path = cache_path(amr_path)
+        self.tmp_path = self.path + ".tmp"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.f = open(self.tmp_path, "wb")
+        pickle.dump(key, self.f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def write(self, records):
+        pickle.dump(records, self.f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def commit(self):
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
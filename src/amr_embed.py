@@ -1,55 +1,71 @@
-import torch
-from transformers import AutoTokenizer, AutoModel
-import penman
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from pathlib import Path
-import logging
+import os
 
 from src.config import cfg 
-
-logging.getLogger().setLevel(logging.ERROR)
-logging.getLogger("penman").setLevel(logging.ERROR)
-logging.getLogger("penman.codec").setLevel(logging.ERROR)
+from src.amr_arrays import load_amr_corpus
+from src.embedding_store import EmbeddingStore
+from src.encoder import MiniLMEncoder
+from src.concept_search import ConceptIndex, nearest_concepts
+from src.instrument import measure, stage
+from src.lexicon import TERMS
+from src.results import HEADLESS, write_results
 
 
 AMR_FILE = cfg.amr_path
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-TARGET_CONCEPT = "bias"
+TARGET_CONCEPTS = TERMS  # cfg.terms
 TOP_N = 10
 
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModel.from_pretrained(MODEL_NAME)
+def load_amr_concepts(file_path, corpus=None):
+    """Extract all conceptin AMR graph."""
+    if corpus is None:
+        corpus = load_amr_corpus(file_path)
+    return corpus.concepts()
 
-def encode(texts):
-    """Encode text into embeddings with model"""
-    inputs = tokenizer(texts, padding=True, truncation=True, return_tensors="pt")
-    with torch.no_grad():
-        outputs = model(**inputs)
-    embeddings = outputs.last_hidden_state.mean(dim=1)
-    return embeddings.cpu().numpy()
 
-def load_amr_concepts(file_path):
-    """Extract all conceptin AMR graph."""
-    text = Path(file_path).read_text(encoding="utf-8")
-    graphs = penman.loads(text)
-    concepts = []
-    for g in graphs:
-        for triple in g.triples:
-            src, role, tgt = triple
-            if role == ":instance":
-                concepts.append(tgt)
-    return list(set(concepts))
-
-concepts = load_amr_concepts(AMR_FILE)
-print(f"{len(concepts)} concepts extraits du fichier AMR.")
-
-all_embeddings = encode(concepts)
-bias_embedding = encode([TARGET_CONCEPT])
-
-similarities = cosine_similarity(bias_embedding, all_embeddings)[0]
-
-sorted_indices = np.argsort(similarities)[::-1]
-print(f"\nNearest concept from '{TARGET_CONCEPT}':\n")
-for idx in sorted_indices[:TOP_N]:
-    print(f"{concepts[idx]:20s} | Similarity = {similarities[idx]:.4f}")
+def concept_index(store, concepts, encode):
+    """ConceptIndex of the AMR concepts, reopened memory-mapped when saved for the same concepts."""
+    index_dir = os.path.join(store.dir, "concept_index")
+    try:
+        index = ConceptIndex.load(index_dir)
+        if index.labels == concepts and index.matrix.shape[0] == len(concepts):
+            return index
+    except (OSError, ValueError):
+        pass
+    # Only concepts missing from the on-disk store are encoded
+    index = ConceptIndex(concepts, store.embed(concepts, encode))
+    index.save(index_dir)
+    return index
+
+
+@stage("amr_embed")
+def main(corpus=None, headless=None):
+    """Print the concepts nearest to each target; `corpus` (an AMRCorpus) replaces reading cfg.amr_path.
+
+    Headless runs also write them to the results directory.
+    """
+    if headless is None:
+        headless = HEADLESS
+    with measure("triple_scan") as span:
+        concepts = load_amr_concepts(AMR_FILE, corpus)
+        span["items"] = len(concepts)
+    print(f"{len(concepts)} concepts extraits du fichier AMR.")
+
+    encoder = MiniLMEncoder(MODEL_NAME)
+    store = EmbeddingStore(encoder.name)
+    index = concept_index(store, concepts, encoder.encode)
+    target_embeddings = store.embed(TARGET_CONCEPTS, encoder.encode)
+
+    # All targets at once: one similarity product, top-k by argpartition
+    with measure("concept_search", items=len(TARGET_CONCEPTS)):
+        nearest = nearest_concepts(TARGET_CONCEPTS, target_embeddings, top_k=TOP_N, index=index)
+    for target, matches in nearest.items():
+        print(f"\nNearest concept from '{target}':\n")
+        for concept, similarity in matches:
+            print(f"{concept:20s} | Similarity = {similarity:.4f}")
+
+    if headless:
+        write_results("amr_embed", {"concepts": len(concepts), "nearest": nearest})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Indexed view of a penman graph for structure analysis"""
+from collections import defaultdict
+
+
+class IndexedGraph:
+    """Adjacency index over the triples of one AMR graph, built in a single pass."""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.triples = graph.triples
+        self.incoming = defaultdict(list)   # target -> [(source, role)]
+        self.outgoing = defaultdict(list)   # source -> [(role, target)], :instance included
+        self.concepts = defaultdict(list)   # concept -> [position in instances]
+        self.instances = []                 # [(variable, concept)] in triple order
+        self.targets = set()
+
+        for src, rel, tgt in self.triples:
+            self.incoming[tgt].append((src, rel))
+            self.outgoing[src].append((rel, tgt))
+            self.targets.add(tgt)
+            if rel == ":instance" and tgt:
+                self.concepts[tgt].append(len(self.instances))
+                self.instances.append((src, tgt))
+
+    def _variables(self, positions):
+        return [self.instances[i][0] for i in sorted(positions)]
+
+    def find_nodes(self, term):
+        """Return variables whose concept contains `term` (case-insensitive), in triple order."""
+        term = term.lower()
+        return self._variables(i for concept, positions in self.concepts.items()
+                               if term in concept.lower() for i in positions)
+
+    def find_terms(self, matcher):
+        """Return {term: [variable]} for every term of `matcher` found in a concept, in triple order.
+
+        Each distinct concept is scanned once for all the terms, however many
+        there are and however often it occurs. Terms come in the order of
+        their first node.
+        """
+        positions = {}
+        for concept, occurrences in self.concepts.items():
+            for term in matcher.terms_in(concept):
+                positions.setdefault(term, []).extend(occurrences)
+        order = sorted(positions, key=lambda term: min(positions[term]))
+        return {term: self._variables(positions[term]) for term in order}
+
+    def parents(self, node):
+        return list(self.incoming.get(node, ()))
+
+    def children(self, node):
+        return [(rel, tgt) for rel, tgt in self.outgoing.get(node, ()) if rel != ":instance"]
+
+    def siblings(self, node):
+        """Targets of every parent of `node`, other than `node` itself."""
+        siblings = set()
+        for src, _ in self.incoming.get(node, ()):
+            siblings.update(tgt for _, tgt in self.outgoing.get(src, ()) if tgt != node)
+        return siblings
+
+    def is_root(self, node):
+        return node not in self.targets
+
+    def is_leaf(self, node):
+        return not any(rel != ":instance" for rel, _ in self.outgoing.get(node, ()))
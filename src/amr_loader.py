@@ -0,0 +1,118 @@
+"""Streaming AMR loader: splits the file on graph boundaries and decodes chunks in a process pool"""
+import io
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import penman
+
+from src.config import cfg
+from src import amr_cache
+from src.instrument import iter_measured
+
+WORKERS = getattr(cfg, "workers", None) or os.cpu_count() or 1
+CHUNK_SIZE = 1 << 20  # characters of AMR text per worker task
+
+
+class _Limited(io.RawIOBase):
+    """The next `size` bytes of a binary file, read as a stream of their own."""
+
+    def __init__(self, raw, size):
+        self.raw = raw
+        self.remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self.raw.readinto(memoryview(buffer)[:self.remaining]) if self.remaining > 0 else 0
+        self.remaining -= n
+        return n
+
+
+def iter_chunks(amr_path, chunk_size=CHUNK_SIZE, start=0, end=None):
+    """Yield blocks of AMR text, cut only on the blank lines that separate graphs.
+
+    `start` and `end` restrict the text to that byte range of the file, which
+    must begin on a graph boundary.
+    """
+    lines, size = [], 0
+    with open(amr_path, "rb") as raw:
+        raw.seek(start)
+        source = raw if end is None else io.BufferedReader(_Limited(raw, end - start))
+        for line in io.TextIOWrapper(source, encoding="utf-8"):
+            if size >= chunk_size and not line.strip():
+                yield "".join(lines)
+                lines, size = [], 0
+                continue
+            lines.append(line)
+            size += len(line)
+    if lines:
+        yield "".join(lines)
+
+
+def _silence_penman():
+    logging.getLogger("penman").setLevel(logging.ERROR)
+    logging.getLogger("penman.codec").setLevel(logging.ERROR)
+
+
+def decode_chunk(text):
+    """Decode a block of AMR text into (top, triples, metadata) records."""
+    return [amr_cache.to_record(g) for g in penman.loads(text)]
+
+
+def _decode_chunks(amr_path, workers, chunk_size, start=0, end=None):
+    """Yield decoded chunks in file order, keeping at most 2 * workers chunks in flight."""
+    chunks = iter_measured("read_file", iter_chunks(amr_path, chunk_size, start, end), size=len)
+    if end is None:
+        end = os.path.getsize(amr_path)
+    if workers <= 1 or end - start <= chunk_size:
+        for chunk in chunks:
+            yield decode_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_silence_penman) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(decode_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_records(amr_path, workers=WORKERS, chunk_size=CHUNK_SIZE, key=None, end=None):
+    """Yield one (top, triples, metadata) record per graph, reading the cache when it is fresh.
+
+    On a cache miss the file is decoded in parallel and the cache is written
+    as the stream is consumed; it only replaces the old cache once the whole
+    file has been read. `key` is the file's cache_key, when already computed.
+    `end` stops at that byte offset, `key` then being the cache key of the
+    bytes before it.
+    """
+    if key is None:
+        key = amr_cache.cache_key(amr_path)
+    cached = amr_cache.open_cache(amr_path, key)
+    if cached is not None:
+        yield from iter_measured("amr_cache_read", amr_cache.iter_cached(cached))
+        return
+
+    writer = amr_cache.CacheWriter(amr_path, key)
+    try:
+        for records in iter_measured("penman_decode", _decode_chunks(amr_path, workers, chunk_size, 0, end), size=len):
+            writer.write(records)
+            yield from records
+    except BaseException:
+        writer.abort()
+        raise
+    writer.commit()
+
+
+def iter_records_between(amr_path, start, end=None, workers=WORKERS, chunk_size=CHUNK_SIZE):
+    """Yield the records of the graphs in bytes `start`:`end` of the file, decoded without the cache.
+
+    Used to read only the graphs appended to a file since an earlier run.
+    """
+    for records in iter_measured("penman_decode", _decode_chunks(amr_path, workers, chunk_size, start, end), size=len):
+        yield from records
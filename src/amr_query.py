@@ -0,0 +1,228 @@
+"""Subgraph pattern queries over an AMRCorpus, answered from concept and role postings
+
+    python -m src.amr_query "~bias <:ARG1 >:polarity=-" [--show 10]
+
+A pattern describes one node, then constraints on its edges, separated by spaces:
+
+    ~bias             concept containing "bias" (case-insensitive); `bias-01` is exact, `*` any concept
+    <:ARG1            a parent reaches the node via :ARG1
+    <:ARG0/~develop   ... from a parent whose concept matches ~develop
+    >:polarity=-      the node has a :polarity edge to the constant -
+    >:mod/data        the node has a :mod child whose concept is data
+    !>:polarity=-     prefix any constraint with ! to require its absence
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from src import amr_cache
+from src.amr_arrays import NONE, load_amr_corpus
+from src.config import cfg
+from src.instrument import measure
+
+CACHE_DIR = getattr(cfg, "cache_dir", os.path.join("data", "cache"))
+
+
+def postings_path(amr_path):
+    return os.path.join(CACHE_DIR, os.path.basename(amr_path) + ".postings.npz")
+
+
+def _postings(ids, size):
+    """(order, bounds): positions sorted by id, and where each id's run starts, CSR style."""
+    order = np.argsort(ids, kind="stable")
+    bounds = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ids, minlength=size), out=bounds[1:])
+    return order, bounds
+
+
+class AMRIndex:
+    """Inverted indexes of an AMRCorpus: concept -> :instance triples and role -> triples.
+
+    Postings are in triple order, so every lookup is a slice; constraints are
+    checked with sorted node-key lookups instead of scanning the triples.
+    """
+
+    def __init__(self, corpus, role_order=None, role_bounds=None, concept_order=None, concept_bounds=None):
+        self.corpus = corpus
+        size = len(corpus.strings)
+        self.instances = corpus.instances()
+        if role_order is None:
+            role_order, role_bounds = _postings(corpus.roles, size)
+            # positions into self.instances, by concept (a missing concept has no posting)
+            concepts = corpus.targets[self.instances]
+            concept_order, concept_bounds = _postings(np.where(concepts == NONE, size, concepts), size + 1)
+        self.role_order, self.role_bounds = role_order, role_bounds
+        self.concept_order, self.concept_bounds = concept_order, concept_bounds
+        self.concept_ids = np.flatnonzero(np.diff(concept_bounds[:size + 1]))  # ids used as concepts
+        self._lowered = None
+
+    def save(self, path, key):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, key=np.array(json.dumps(key)), role_order=self.role_order, role_bounds=self.role_bounds,
+                 concept_order=self.concept_order, concept_bounds=self.concept_bounds)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def open(cls, corpus, path, key):
+        """The index saved at `path` for `corpus`, or None if it is missing or stale."""
+        try:
+            data = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        with data:
+            if str(data["key"]) != json.dumps(key) or len(data["role_bounds"]) != len(corpus.strings) + 1:
+                return None
+            return cls(corpus, data["role_order"], data["role_bounds"], data["concept_order"], data["concept_bounds"])
+
+    def role_triples(self, role):
+        i = self.corpus.string_id(role)
+        if i < 0:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(self.role_order[self.role_bounds[i]:self.role_bounds[i + 1]])
+
+    def concept_nodes(self, spec):
+        """:instance triples whose concept matches `spec`: "*", "~substring" or an exact concept."""
+        if spec == "*":
+            return self.instances
+        if spec.startswith("~"):
+            if self._lowered is None:
+                self._lowered = [self.corpus.strings[i].lower() for i in self.concept_ids]
+            needle = spec[1:].lower()
+            ids = [i for i, concept in zip(self.concept_ids, self._lowered) if needle in concept]
+        else:
+            i = self.corpus.string_id(spec)
+            ids = [i] if i >= 0 else []
+        if not ids:
+            return np.empty(0, dtype=np.int64)
+        positions = np.concatenate([self.concept_order[self.concept_bounds[i]:self.concept_bounds[i + 1]]
+                                    for i in ids])
+        return self.instances[np.sort(positions)]
+
+    def match(self, pattern):
+        """QueryResult of the nodes matching `pattern` (a string or a Pattern)."""
+        pattern = Pattern.parse(pattern) if isinstance(pattern, str) else pattern
+        corpus = self.corpus
+        nodes = self.concept_nodes(pattern.concept)
+        for direction, role, spec, constant, negated in pattern.constraints:
+            if not len(nodes):
+                break
+            edges = self.role_triples(role)
+            if direction == "<":
+                if spec is not None:  # the parent's concept
+                    parents = corpus.node_keys(self.concept_nodes(spec))
+                    edges = edges[np.isin(corpus.keys(corpus.sources, edges), parents)]
+                allowed = corpus.keys(corpus.targets, edges)
+            else:
+                if constant is not None:
+                    edges = edges[corpus.targets[edges] == corpus.string_id(constant)]
+                elif spec is not None:  # the child's concept
+                    children = corpus.node_keys(self.concept_nodes(spec))
+                    edges = edges[np.isin(corpus.keys(corpus.targets, edges), children)]
+                allowed = corpus.keys(corpus.sources, edges)
+            found = np.isin(corpus.node_keys(nodes), allowed)
+            nodes = nodes[~found if negated else found]
+        return QueryResult(corpus, nodes)
+
+
+class Pattern:
+    """A node's concept spec and its edge constraints, (direction, role, concept spec, constant, negated)."""
+
+    def __init__(self, concept="*", constraints=()):
+        self.concept = concept
+        self.constraints = list(constraints)
+
+    def parent(self, role, concept=None, negated=False):
+        self.constraints.append(("<", role, concept, None, negated))
+        return self
+
+    def child(self, role, concept=None, constant=None, negated=False):
+        self.constraints.append((">", role, concept, constant, negated))
+        return self
+
+    @classmethod
+    def parse(cls, text):
+        tokens = text.split()
+        if not tokens:
+            raise ValueError("Empty AMR pattern")
+        pattern = cls(tokens[0])
+        for token in tokens[1:]:
+            negated = token.startswith("!")
+            token = token.lstrip("!")
+            direction, edge = token[:1], token[1:]
+            if direction not in "<>" or not edge.startswith(":"):
+                raise ValueError(f"Bad constraint {token!r} in AMR pattern {text!r}: expected <:role or >:role")
+            role, _, constant = edge.partition("=")
+            role, _, concept = role.partition("/")
+            if direction == "<":
+                if constant:
+                    raise ValueError(f"Bad constraint {token!r} in AMR pattern {text!r}: parents have no constant")
+                pattern.parent(role, concept or None, negated)
+            else:
+                pattern.child(role, concept or None, constant or None, negated)
+        return pattern
+
+
+class QueryResult:
+    """Matched nodes, as :instance triple indices of the corpus, with aggregates."""
+
+    def __init__(self, corpus, instances):
+        self.corpus = corpus
+        self.instances = instances
+
+    def __len__(self):
+        return len(self.instances)
+
+    def graphs(self):
+        """1-based numbers of the graphs with a match."""
+        return (np.unique(self.corpus.graph_index[self.instances]) + 1).tolist()
+
+    def nodes(self, limit=None):
+        """(graph number, variable, concept) of each match, in corpus order."""
+        strings = self.corpus.strings
+        return [(int(self.corpus.graph_index[k]) + 1, strings[self.corpus.sources[k]], strings[self.corpus.targets[k]])
+                for k in self.instances[:limit]]
+
+    def concept_counts(self):
+        return self.corpus.concept_counts(self.instances)
+
+    def summary(self):
+        return {"matches": len(self), "graphs": len(self.graphs()), "concepts": dict(self.concept_counts())}
+
+
+def load_amr_index(amr_path, corpus=None):
+    """The AMRIndex of `amr_path`, from its cache when the file and penman are unchanged."""
+    key = amr_cache.cache_key(amr_path)  # hashes the file: computed once for the corpus and the postings
+    if corpus is None:
+        corpus = load_amr_corpus(amr_path, key)
+    path = postings_path(amr_path)
+    index = AMRIndex.open(corpus, path, key)
+    if index is None:
+        with measure("amr_postings_build", items=len(corpus)):
+            index = AMRIndex(corpus)
+        index.save(path, key)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match subgraph patterns against the AMR corpus.")
+    parser.add_argument("patterns", nargs="+", help='e.g. "~bias <:ARG1 >:polarity=-"')
+    parser.add_argument("--show", type=int, default=10, help="matches to list per pattern")
+    args = parser.parse_args()
+
+    index = load_amr_index(cfg.amr_path)
+    for text in args.patterns:
+        with measure("amr_query") as span:
+            result = index.match(text)
+            span["items"] = len(result)
+        print(f"\n{text}: {len(result)} matches in {len(result.graphs())} graphs")
+        for concept, count in result.concept_counts().most_common():
+            print(f"  {concept}: {count}")
+        for graph, var, concept in result.nodes(args.show):
+            print(f"  graph {graph}: ({var} / {concept})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Stage summaries of an append-only AMR file, kept as mergeable state with a checkpoint
+
+A summary covers the graphs before a byte offset of the file. When the file
+has only grown since, the next run decodes just the appended graphs,
+summarizes them on their own and merges that into the saved summary.
+Summaries are JSON-like values that merge element-wise: numbers add, lists
+concatenate and dicts merge key by key, so per-graph counts, Counters and
+lists of graph numbers fold in exactly as a full recompute would build them.
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+
+import penman
+
+from src import amr_cache
+from src.amr_arrays import AMRCorpus, load_amr_corpus
+from src.amr_loader import iter_records_between
+from src.config import cfg
+from src.instrument import measure
+
+CACHE_DIR = getattr(cfg, "cache_dir", os.path.join("data", "cache"))
+STATE_FORMAT = 1
+
+
+def state_path(amr_path, name):
+    return os.path.join(CACHE_DIR, f"{os.path.basename(amr_path)}.{name}.summary.json")
+
+
+def merge(old, new):
+    """`new` folded into `old`; dict keys only in `new` come after those of `old`, as in a full pass."""
+    if isinstance(new, dict):
+        merged = old.copy()
+        for key, value in new.items():
+            merged[key] = merge(merged[key], value) if key in merged else value
+        return merged
+    return old + new
+
+
+def load_state(path):
+    """The saved state, with every dict read back as a Counter (order kept), or {} if there is none."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f, object_pairs_hook=lambda pairs: Counter(dict(pairs)))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _hash_range(path, start, end, digest=None, chunk_size=1 << 20):
+    """`digest` (a new SHA-256 by default) updated with bytes `start`:`end` of the file."""
+    digest = digest or hashlib.sha256()
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest
+
+
+def update(amr_path, name, summarize, key=None, corpus=None):
+    """(summary, graph count) of stage `name` over every graph of `amr_path`.
+
+    `summarize(corpus, first_graph)` summarizes an AMRCorpus whose graph 0 is
+    graph `first_graph` (0-based) of the file. The state saved by the last
+    run is reused when its `key` matches and the file still starts with the
+    bytes it covered: only the graphs after its offset are decoded. Otherwise,
+    or when `corpus` (the whole file, already loaded) is given, everything is
+    summarized again.
+    """
+    path = state_path(amr_path, name)
+    key = [STATE_FORMAT, penman.__version__, key]
+    st = os.stat(amr_path)
+    state = load_state(path)
+    offset = 0
+    digest = hashlib.sha256()
+    if corpus is None and json.dumps(state.get("key")) == json.dumps(key) and state["offset"] <= st.st_size:
+        if state["offset"] == st.st_size and state["mtime"] == st.st_mtime:
+            return state["summary"], state["graph_count"]
+        with measure("checkpoint_hash", items=state["offset"]):
+            digest = _hash_range(amr_path, 0, state["offset"])
+        if digest.hexdigest() == state["sha256"]:
+            offset = state["offset"]
+        else:
+            digest = hashlib.sha256()
+
+    hashed = offset  # bytes of the file already in `digest`
+    if offset and offset == st.st_size:  # touched but unchanged
+        summary, graph_count = state["summary"], state["graph_count"]
+    elif offset:
+        appended = AMRCorpus.from_records(iter_records_between(amr_path, offset, st.st_size))
+        with measure("summary_merge", items=len(appended)):
+            summary = merge(state["summary"], summarize(appended, state["graph_count"]))
+        graph_count = state["graph_count"] + len(appended)
+    else:
+        if corpus is None:
+            # only the bytes the checkpoint will cover, even if graphs are being appended meanwhile
+            digest, hashed = _hash_range(amr_path, 0, st.st_size), st.st_size
+            corpus = load_amr_corpus(amr_path, amr_cache.cache_key(amr_path, digest.hexdigest()), end=st.st_size)
+        summary, graph_count = summarize(corpus, 0), len(corpus)
+
+    digest = _hash_range(amr_path, hashed, st.st_size, digest)
+    save_state(path, {
+        "key": key,
+        "offset": st.st_size,
+        "mtime": st.st_mtime,
+        "sha256": digest.hexdigest(),
+        "graph_count": graph_count,
+        "summary": summary,
+    })
+    return summary, graph_count
@@ -1,120 +1,124 @@
-from penman import load
-from collections import defaultdict
-import matplotlib.pyplot as plt
-from collections import Counter
+import numpy as np
 
-import logging
-
-from src.config import cfg 
-
-logging.getLogger().setLevel(logging.ERROR)
-logging.getLogger("penman").setLevel(logging.ERROR)
-logging.getLogger("penman.codec").setLevel(logging.ERROR)
+from src.config import Config, cfg
+from src.amr_query import load_amr_index
+from src.amr_summary import update as update_summary
+from src.instrument import measure, stage
+from src.lexicon import TermMatcher, slug
+from src.results import HEADLESS, write_results
 
 amr_file = cfg.amr_path
-
-with open(amr_file, "r", encoding="utf-8") as f:
-    amr_graphs = list(load(f))
-
-# Extract concepts containing "bias"
-bias_concepts = defaultdict(int)
-for graph in amr_graphs:
-    for triple in graph.triples:
-        if triple[1] == ':instance' and triple[2] and 'bias' in triple[2].lower():
-            bias_concepts[triple[2].lower()] += 1
-
-#distibution de bias et bias-01
-sorted_bias_concepts = sorted(bias_concepts.items(), key=lambda x: x[1], reverse=True)
-concepts, counts = zip(*sorted_bias_concepts) if sorted_bias_concepts else ([], [])
-# concepts, counts = zip(*bias_concepts)
-plt.figure(figsize=(5, 6))
-plt.bar(concepts, counts, color='skyblue')
-plt.xlabel('Concepts related to "bias"')
-plt.ylabel('Frequency')
-plt.title('Histogram of concepts related to "bias" in AMR')
-plt.xticks(rotation=45, ha='right')
-plt.tight_layout()
-plt.savefig("figures/hist_concept.png", dpi=300, bbox_inches="tight")
-
-def analyze_bias_structure(graph):
-    """Return structure info for nodes related to bias or bias-01."""
-    triples = graph.triples
-    bias_nodes = [
-        src
-        for (src, rel, tgt) in triples
-        if rel == ':instance' and tgt and 'bias' in tgt.lower()
-    ]    
-    structures = []
-    for node in bias_nodes:
-        parents = [(src, rel) for (src, rel, tgt) in triples if tgt == node]
-        children = [(rel, tgt) for (src, rel, tgt) in triples if src == node and rel != ':instance']
-        siblings = set()
-        for (src, rel, tgt) in triples:
-            if tgt == node:
-                siblings.update([sib_tgt for (sib_src, sib_rel, sib_tgt) in triples if sib_src == src and sib_tgt != node])
-        
-        # Root detection
-        all_targets = {t for (_, _, t) in triples}
-        is_root = node not in all_targets
-        
-        structures.append({
-            "node": node,
-            "is_root": is_root,
-            "parents": parents,
-            "siblings": list(siblings),
-            "children": children
-        })
-    return structures
-
-summary = {
-    "root_count": 0,
-    "non_root_count": 0,
-    "relations_to_bias": Counter(),
-    "relations_from_bias": Counter(),
-    "graphs_with_polarity": [],
-}
-
-for i, graph in enumerate(amr_graphs):
-    triples = graph.triples
-    bias_nodes = [src for (src, rel, tgt) in triples if rel == ":instance" and tgt and "bias" in tgt.lower()]
-    for node in bias_nodes:
-        # Root or not
-        all_targets = {t for (_, _, t) in triples}
-        if node not in all_targets:
-            summary["root_count"] += 1
-        else:
-            summary["non_root_count"] += 1
-
-        # Incoming and outgoing relations
-        for src, rel, tgt in triples:
-            if tgt == node:
-                summary["relations_to_bias"][rel] += 1
-            if src == node:
-                summary["relations_from_bias"][rel] += 1
-                if rel == ":polarity":
-                    summary["graphs_with_polarity"].append(i+1)
-
-
-print("\n=== Summary of bias structures ===")
-print(f"Root occurrences: {summary['root_count']}")
-print(f"Non-root occurrences: {summary['non_root_count']}")
-print("\nRelations to 'bias' (parents):")
-for rel, count in summary["relations_to_bias"].most_common():
-    print(f"  {rel}: {count}")
-print("\nRelations from 'bias' (children):")
-for rel, count in summary["relations_from_bias"].most_common():
-    print(f"  {rel}: {count}")
-print(f"\nGraphs with polarity markers: {summary['graphs_with_polarity']}")
-
-
-plt.figure(figsize=(6,4))
-relations_to_bias = summary["relations_to_bias"]
-sorted_relations = sorted(relations_to_bias.items(), key=lambda x: x[1], reverse=True)
-relations, counts = zip(*sorted_relations)
-plt.bar(relations, counts)
-plt.title("Relations to 'bias' (Parent Links)")
-plt.xticks(rotation=45)
-plt.ylabel("Frequency")
-
-plot_path = 'figures/bias_amr.png'
-plt.savefig(plot_path, dpi=300, bbox_inches="tight")
+MATCHER = TermMatcher()
+QUERIES = vars(getattr(cfg, "amr_queries", None) or Config({}))  # nested config objects hold name -> pattern
+
+def summarize(corpus, first_graph=0):
+    """Concept counts and structure summary of every term over an AMRCorpus whose graph 0 is graph `first_graph`."""
+    # Whole-corpus array operations
+    with measure("triple_scan", items=len(corpus)):
+        found = corpus.term_instances(MATCHER)
+        matched = np.unique(np.concatenate(list(found.values()))) if found else np.empty(0, dtype=np.int64)
+        term_concepts = corpus.concept_counts(matched)
+
+        summaries = {}
+        for term in MATCHER.terms:
+            nodes = found.get(term, np.empty(0, dtype=np.int64))
+            roots = int(corpus.is_root(nodes).sum())
+            outgoing = corpus.incident(nodes, "from")
+            polarity = outgoing[corpus.roles[outgoing] == corpus.string_id(":polarity")]
+            summaries[term] = {
+                "root_count": roots,
+                "non_root_count": len(nodes) - roots,
+                "relations_to": corpus.role_counts(corpus.incident(nodes, "to")),
+                "relations_from": corpus.role_counts(outgoing),
+                "graphs_with_polarity": (corpus.graph_index[polarity] + first_graph + 1).tolist(),
+            }
+    return {"concepts": term_concepts, "terms": summaries}
+
+
+@stage("bias_amr")
+def main(corpus=None, headless=None):
+    """Summarize the structures of each term over cfg.amr_path, or over `corpus` (its AMRCorpus) when given.
+
+    The summary is saved with a checkpoint, so a rerun after graphs were
+    appended to the file only decodes the new ones. Headless runs write the
+    numbers to the results directory instead of plotting.
+    """
+    if headless is None:
+        headless = HEADLESS
+
+    summary, _ = update_summary(amr_file, "bias_amr", summarize, MATCHER.signature, corpus)
+    term_concepts, summaries = summary["concepts"], summary["terms"]
+
+    #distibution des concepts (bias, bias-01, ...)
+    sorted_concepts = sorted(term_concepts.items(), key=lambda x: x[1], reverse=True)
+
+    for term, summary in summaries.items():
+        print(f"\n=== Summary of {term} structures ===")
+        print(f"Root occurrences: {summary['root_count']}")
+        print(f"Non-root occurrences: {summary['non_root_count']}")
+        print(f"\nRelations to '{term}' (parents):")
+        for rel, count in summary["relations_to"].most_common():
+            print(f"  {rel}: {count}")
+        print(f"\nRelations from '{term}' (children):")
+        for rel, count in summary["relations_from"].most_common():
+            print(f"  {rel}: {count}")
+        print(f"\nGraphs with polarity markers: {summary['graphs_with_polarity']}")
+
+    # Named pattern queries from the config, e.g. {"negated_bias": "~bias >:polarity=-"}.
+    # Unlike the summary they need the whole corpus: after an append the file is decoded again.
+    queries = {}
+    if QUERIES:
+        index = load_amr_index(amr_file, corpus)
+        print("\n=== Pattern queries ===")
+        with measure("amr_query", items=len(QUERIES)):
+            for name, pattern in QUERIES.items():
+                queries[name] = index.match(pattern).summary()
+                print(f"{name} ({pattern}): {queries[name]['matches']} matches in {queries[name]['graphs']} graphs")
+
+    if headless:
+        results = {"concepts": dict(sorted_concepts), "terms": summaries}
+        if queries:
+            results["queries"] = queries
+        write_results("bias_amr", results)
+        return
+
+    plot_concepts(sorted_concepts)
+    for term, summary in summaries.items():
+        if summary["relations_to"]:
+            plot_relations_to(term, summary["relations_to"])
+
+
+def plot_concepts(sorted_concepts):
+    import matplotlib.pyplot as plt
+
+    concepts, counts = zip(*sorted_concepts) if sorted_concepts else ([], [])
+    label = ", ".join(f'"{term}"' for term in MATCHER.terms)
+    plt.figure(figsize=(5, 6))
+    plt.bar(concepts, counts, color='skyblue')
+    plt.xlabel(f'Concepts related to {label}')
+    plt.ylabel('Frequency')
+    plt.title(f'Histogram of concepts related to {label} in AMR')
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    with measure("save_figure", items=1):
+        plt.savefig("figures/hist_concept.png", dpi=300, bbox_inches="tight")
+
+
+def plot_relations_to(term, relations_to):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(6,4))
+    sorted_relations = sorted(relations_to.items(), key=lambda x: x[1], reverse=True)
+    relations, counts = zip(*sorted_relations)
+    plt.bar(relations, counts)
+    plt.title(f"Relations to '{term}' (Parent Links)")
+    plt.xticks(rotation=45)
+    plt.ylabel("Frequency")
+
+    plot_path = f'figures/{slug(term)}_amr.png'
+    with measure("save_figure", items=1):
+        plt.savefig(plot_path, dpi=300, bbox_inches="tight")
+
+
+if __name__ == "__main__":
+    main()
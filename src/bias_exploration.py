@@ -1,128 +1,169 @@
 import os
-import math
-import string
 import unicodedata
-from collections import Counter
-import matplotlib.pyplot as plt
 from nltk.corpus import stopwords
-import nltk
+from src.collocations import TokenCorpus
 from src.config import cfg
-
-nltk.download("stopwords", quiet=True)
+from src.corpus import iter_documents
+from src.instrument import measure, stage
+from src.lexicon import slug
+from src.nltk_resources import ensure
+from src.positional_index import PositionalIndex
+from src.results import HEADLESS, write_results
+from src.sketch import make_counter
+
+ensure("stopwords")
 stop_words = set(stopwords.words("english"))
 
 text_dir = cfg.txt_path
-if not os.path.exists(text_dir):
-    raise FileNotFoundError(f"Text folder not found: {text_dir}")
-
-# --- 1️ Count 'bias' occurrences ---
-bias_counts = {}
-for filename in os.listdir(text_dir):
-    if filename.endswith(".txt"):
-        file_path = os.path.join(text_dir, filename)
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            text = f.read().lower()
-            bias_counts[filename] = text.count("bias")
-
-sorted_docs = sorted(bias_counts.items(), key=lambda x: x[1], reverse=True)
-if not sorted_docs:
-    exit()
-
-top_n = max(1, math.ceil(len(sorted_docs) * 0.1))
-top_docs = sorted_docs[:top_n]
-print(f"\nTop {top_n} ({round(top_n / len(sorted_docs) * 100, 1)}%) documents with most 'bias' occurrences:")
-for doc, count in top_docs:
-    print(f"  {doc}: {count}")
-
-# --- 2️ Extract collocations around 'bias' ---
-window_size = 5
-contexts = []
-
-for doc, _ in top_docs:
-    file_path = os.path.join(text_dir, doc)
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        words = [w.strip(string.punctuation) for w in f.read().lower().split()]
-        for i, word in enumerate(words):
-            if word == "bias":
-                left_context = " ".join(words[max(0, i - window_size):i])
-                right_context = " ".join(words[i + 1:i + 1 + window_size])
-                contexts.append((left_context, "bias", right_context))
-
-ngrams = []
-for left, center, right in contexts:
-    left_parts = left.split()
-    right_parts = right.split()
-    if left_parts:
-        ngrams.append(f"{left_parts[-1]} bias")
-    if right_parts:
-        ngrams.append(f"bias {right_parts[0]}")
-
-ngram_freq = Counter(ngrams)
-top_ngrams = ngram_freq.most_common(27)
-
-# --- 3️ Broader context words around 'bias' ---
-window_size = 5
-context_words = []
-for doc, _ in top_docs:
-    file_path = os.path.join(text_dir, doc)
-    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-        text = unicodedata.normalize("NFKC", f.read().lower())
-        words = [w.strip(string.punctuation + "•") for w in text.split()]
-        for i, word in enumerate(words):
-            if word == "bias":
-                left_context = words[max(0, i - window_size):i]
-                right_context = words[i + 1:i + 1 + window_size]
-                context_words.extend(left_context + right_context)
-
-# Clean and count
-context_filtered = []
-for w in context_words:
-    w = "".join(ch for ch in w if not unicodedata.category(ch).startswith("C"))
-    if w and w not in stop_words and w != "bias":
-        context_filtered.append(w)
-
-context_freq = Counter(context_filtered)
-top_context = context_freq.most_common(15)
-
-fig, axes = plt.subplots(3, 1, figsize=(12, 14))
-fig.suptitle("‘Bias’ Analysis Across Corpus", fontsize=16, fontweight="bold")
-
-# Plot 1: Top biased documents
-docs, counts = zip(*top_docs)
-axes[0].bar(docs, counts, color="skyblue")
-axes[0].set_title(f"Top {top_n} Documents with Most 'Bias' Occurrences")
-axes[0].set_ylabel("Count")
-axes[0].tick_params(axis="x", rotation=45)
-
-# Plot 2: Top collocations
-if top_ngrams:
-    ngram_labels, ngram_counts = zip(*top_ngrams)
-    axes[1].bar(ngram_labels, ngram_counts, color="lightgreen")
-    axes[1].set_title("Most Frequent Collocations with 'bias'")
-    axes[1].set_ylabel("Frequency")
-    axes[1].tick_params(axis="x", rotation=45)
-
-# Plot 3: Context words
-if top_context:
-    words, freqs = zip(*top_context)
-    axes[2].bar(words, freqs, color="salmon")
-    axes[2].set_title(f"Top Context Words Around 'bias' (±{window_size} words)")
-    axes[2].set_ylabel("Frequency")
-    axes[2].tick_params(axis="x", rotation=45)
-
-plt.tight_layout(rect=[0, 0, 1, 0.96])
-
-# --- Save subplot figure ---
-output_dir = os.path.join("data")
-os.makedirs(output_dir, exist_ok=True)
-output_path = os.path.join(output_dir, "bias_analysis_subplots.png")
-plt.savefig(output_path, dpi=300, bbox_inches="tight")
-plt.close()
-
-print("\nTop collocations with 'bias':")
-for ng, freq in top_ngrams:
-    print(f"  {ng}: {freq}")
-
-print("\nTop context words around 'bias':")
-for word, freq in top_context:
-    print(f"  {word}: {freq}")
+
+TOP_FRACTION = getattr(cfg, "top_fraction", 0.1)
+window_size = getattr(cfg, "window_size", 5)
+NGRAM = getattr(cfg, "collocation_ngram", 3)
+
+
+@stage("bias_exploration")
+def main(corpus=None, headless=None):
+    """Plot counts, collocations and context words of each term; `corpus` ({filename: text}) replaces reading the files.
+
+    Headless runs write the counts to the results directory instead of plotting.
+    """
+    if headless is None:
+        headless = HEADLESS
+
+    # --- 0 Read the corpus once into a positional index of every term and the token arrays ---
+    if corpus is None and not os.path.exists(text_dir):
+        raise FileNotFoundError(f"Text folder not found: {text_dir}")
+    with measure("positional_index") as span:
+        index = PositionalIndex()
+        documents = corpus.items() if corpus is not None else iter_documents(text_dir)
+        tokens = TokenCorpus.from_texts(documents, each=index.add)
+        span["items"] = len(index.words)
+
+    results = {}
+    for term in index.terms:
+        result = analyze_term(index, term)
+        if result is None:
+            continue
+        result.update(analyze_collocations(tokens, index.matcher, term))
+        results[term] = result
+        if not headless:
+            plot_analysis(term, result["top_documents"], result["collocations"], result["context_words"])
+
+    if headless:
+        write_results("bias_exploration", {
+            "terms": {
+                term: {key: dict(items) for key, items in result.items()}
+                for term, result in results.items()
+            },
+        })
+
+
+def analyze_term(index, term):
+    """Print and return the top documents, collocations and context words of one term."""
+    # --- 1️ Count occurrences ---
+    sorted_docs = sorted(index.counts[term].items(), key=lambda x: x[1], reverse=True)
+    if not sorted_docs:
+        return None
+
+    top_docs = index.top_documents(TOP_FRACTION, term)
+    top_n = len(top_docs)
+    print(f"\nTop {top_n} ({round(top_n / len(sorted_docs) * 100, 1)}%) documents with most '{term}' occurrences:")
+    for doc, count in top_docs:
+        print(f"  {doc}: {count}")
+
+    # --- 2️ Extract collocations around the term ---
+    top_doc_names = [doc for doc, _ in top_docs]
+    ngram_freq = index.collocations(top_doc_names, window_size, term)
+    top_ngrams = ngram_freq.most_common(27)
+
+    # --- 3️ Broader context words around the term ---
+    context_words = index.context_words(top_doc_names, window_size, term)
+
+    # Clean and count, leaving out the term itself
+    forms = index.matcher.forms_of(term)
+    context_filtered = []
+    for w in context_words:
+        w = "".join(ch for ch in w if not unicodedata.category(ch).startswith("C"))
+        if w and w not in stop_words and w not in forms:
+            context_filtered.append(w)
+
+    context_freq = make_counter()  # a fixed-memory sketch when word_counting is "sketch"
+    context_freq.update(context_filtered)
+    top_context = context_freq.most_common(15)
+
+    print(f"\nTop collocations with '{term}':")
+    for ng, freq in top_ngrams:
+        print(f"  {ng}: {freq}")
+
+    print(f"\nTop context words around '{term}':")
+    for word, freq in top_context:
+        print(f"  {word}: {freq}")
+
+    return {"top_documents": top_docs, "collocations": top_ngrams, "context_words": top_context}
+
+
+def analyze_collocations(tokens, matcher, term):
+    """Print and return the strongest collocates and the most frequent n-grams of one term over every document."""
+    length = len(term.split())
+    with measure("collocations") as span:
+        starts = tokens.find(term, matcher)
+        collocates = tokens.collocates(starts, length, window_size, exclude=stop_words | matcher.forms_of(term))
+        ngrams = tokens.ngrams(starts, length, NGRAM, term)
+        span["items"] = len(starts)
+    top_collocates = collocates[:15]
+    top_ngrams = ngrams.most_common(15)
+
+    print(f"\nCollocates of '{term}' over the whole corpus (±{window_size} words, by log-likelihood):")
+    for word, score in top_collocates:
+        print(f"  {word}: count={score['count']} pmi={score['pmi']} ll={score['ll']}")
+
+    print(f"\nMost frequent {NGRAM}-grams with '{term}' over the whole corpus:")
+    for ng, freq in top_ngrams:
+        print(f"  {ng}: {freq}")
+
+    return {"corpus_collocates": top_collocates, "corpus_ngrams": top_ngrams}
+
+
+def plot_analysis(term, top_docs, top_ngrams, top_context):
+    import matplotlib.pyplot as plt
+
+    top_n = len(top_docs)
+    fig, axes = plt.subplots(3, 1, figsize=(12, 14))
+    fig.suptitle(f"‘{term.capitalize()}’ Analysis Across Corpus", fontsize=16, fontweight="bold")
+
+    # Plot 1: Top documents
+    docs, counts = zip(*top_docs)
+    axes[0].bar(docs, counts, color="skyblue")
+    axes[0].set_title(f"Top {top_n} Documents with Most '{term.capitalize()}' Occurrences")
+    axes[0].set_ylabel("Count")
+    axes[0].tick_params(axis="x", rotation=45)
+
+    # Plot 2: Top collocations
+    if top_ngrams:
+        ngram_labels, ngram_counts = zip(*top_ngrams)
+        axes[1].bar(ngram_labels, ngram_counts, color="lightgreen")
+        axes[1].set_title(f"Most Frequent Collocations with '{term}'")
+        axes[1].set_ylabel("Frequency")
+        axes[1].tick_params(axis="x", rotation=45)
+
+    # Plot 3: Context words
+    if top_context:
+        words, freqs = zip(*top_context)
+        axes[2].bar(words, freqs, color="salmon")
+        axes[2].set_title(f"Top Context Words Around '{term}' (±{window_size} words)")
+        axes[2].set_ylabel("Frequency")
+        axes[2].tick_params(axis="x", rotation=45)
+
+    plt.tight_layout(rect=[0, 0, 1, 0.96])
+
+    # --- Save subplot figure ---
+    output_dir = os.path.join("data")
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, f"{slug(term)}_analysis_subplots.png")
+    with measure("save_figure", items=1):
+        plt.savefig(output_path, dpi=300, bbox_inches="tight")
+    plt.close()
+
+
+if __name__ == "__main__":
+    main()
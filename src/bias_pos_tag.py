@@ -1,49 +1,113 @@
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
-import nltk
-from nltk.tokenize import word_tokenize
-import matplotlib.pyplot as plt
-from src.config import cfg
-
-nltk.download('punkt')
-nltk.download('averaged_perceptron_tagger_eng')
-
-csv_path=cfg.MapAIE_csv_path
-bias_df = pd.read_csv(csv_path)
-
-def get_bias_pos(sentence):
-    '''extract POS tag for the word bias'''
-    words = word_tokenize(sentence)
-    pos_tags = nltk.pos_tag(words)
-    for word, tag in pos_tags:
-        if word.lower() == 'bias':
-            return tag
-    return None
-
-# Apply the function to each sentence
-bias_df['bias_pos'] = bias_df['sentence'].apply(get_bias_pos)
-
-# examples of sentences where bias is tag as adjective
-jj_examples = bias_df[bias_df['bias_pos'] == 'JJ']['sentence'].head(20)
-
-print("\nExample sentences where 'bias' is tagged as JJ:\n")
-if not jj_examples.empty:
-    for i, sent in enumerate(jj_examples, 1):
-        print(f"{i}. {sent}")
-
-# Count the frequency of each POS tag for 'bias'
-pos_counts = bias_df['bias_pos'].value_counts()
-
-# Plotting
-plt.figure(figsize=(10, 6))
-pos_counts.plot(kind='bar', edgecolor='black')
-plt.title('Syntactic Roles of the Term "bias" in the Corpus')
-plt.xlabel('POS Tag')
-plt.ylabel('Frequency')
-plt.xticks(rotation=45)
-plt.grid(axis='y', linestyle='--', alpha=0.7)
-plt.tight_layout()
-
-plot_path = 'figures/bias_pos_visualization.png'
-plt.savefig(plot_path, dpi=300, bbox_inches="tight")
-
-plt.show()
+from src.instrument import measure, stage
+from src.lexicon import TermMatcher, slug
+from src.nltk_resources import ensure
+from src.pos_tagging import WORKERS, TagCache, tag_word
+from src.results import HEADLESS, write_results
+from src.sentence_store import SentenceWriter, iter_sentences, pos_tags_path, sentences_path
+
+ensure('punkt_tab', 'averaged_perceptron_tagger_eng')
+
+MATCHER = TermMatcher()
+
+
+def tag_column(term):
+    """Column of the per-row tag file holding the tag of `term`: 'bias_pos' for 'bias'."""
+    return f"{slug(term)}_pos"
+
+
+@stage("bias_pos_tag")
+def main(bias_df=None, headless=None):
+    """Tag each term in the sentences found for it; `bias_df` replaces reading the sentence corpus when given.
+
+    The corpus is read and tagged chunk by chunk, so it never has to fit in
+    memory. The tags are written to pos_tags_path() as they are found: row i
+    holds the tag of each term in row i of the sentence corpus (None when the
+    row is not about that term, or the term is not a token of it). Headless
+    runs write the tag counts to the results directory instead of plotting.
+    """
+    if headless is None:
+        headless = HEADLESS
+    if bias_df is None:
+        chunks = iter_sentences(sentences_path(), columns=["sentence", "term"])
+    else:
+        chunks = [bias_df]
+
+    forms = {term: frozenset(MATCHER.forms_of(term)) for term in MATCHER.terms}
+    pos_counts = {term: Counter() for term in MATCHER.terms}
+    jj_examples = {term: [] for term in MATCHER.terms}
+    columns = [tag_column(term) for term in MATCHER.terms]
+    # One cache connection, one worker pool and one tag file for every chunk
+    with TagCache() as cache, ProcessPoolExecutor(WORKERS) as pool, \
+            SentenceWriter(pos_tags_path(), columns=columns) as writer:
+        for chunk in chunks:
+            if 'term' in chunk:
+                terms = chunk['term'].tolist()
+                sentences = chunk['sentence'].tolist()
+                rows = range(len(chunk))
+            else:
+                # one row per sentence: tag it for each term it contains
+                pairs = [(row, sentence, term) for row, sentence in enumerate(chunk['sentence'])
+                         for term in MATCHER.terms_in(sentence)]
+                rows = [row for row, _, _ in pairs]
+                sentences = [sentence for _, sentence, _ in pairs]
+                terms = [term for _, _, term in pairs]
+            # Tag all sentences of all terms in parallel batches, reusing cached tags
+            tags = tag_word(sentences, [forms.get(term, frozenset([term])) for term in terms], cache=cache, pool=pool)
+            row_tags = [dict.fromkeys(columns) for _ in range(len(chunk))]
+            for row, sentence, term, tag in zip(rows, sentences, terms, tags):
+                if term not in pos_counts or tag is None:
+                    continue
+                row_tags[row][tag_column(term)] = tag
+                pos_counts[term][tag] += 1
+                # examples of sentences where the term is tag as adjective
+                if tag == 'JJ' and len(jj_examples[term]) < 20:
+                    jj_examples[term].append(sentence)
+            writer.write([list(values.values()) for values in row_tags])
+
+    results = {}
+    for term in MATCHER.terms:
+        print(f"\nExample sentences where '{term}' is tagged as JJ:\n")
+        for i, sent in enumerate(jj_examples[term], 1):
+            print(f"{i}. {sent}")
+
+        # Frequency of each POS tag for the term
+        counts = pd.Series(dict(pos_counts[term].most_common()), dtype=int, name='count')
+        results[term] = {
+            "pos_counts": {str(tag): int(n) for tag, n in counts.items()},
+            "jj_examples": jj_examples[term],
+        }
+        if not headless:
+            plot_pos_counts(term, counts)
+
+    if headless:
+        write_results("bias_pos_tag", {"terms": results})
+        return
+
+    import matplotlib.pyplot as plt
+    plt.show()
+
+
+def plot_pos_counts(term, pos_counts):
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(10, 6))
+    if pos_counts.empty:
+        plt.bar([], [])  # the term only occurs inside other words
+    else:
+        pos_counts.plot(kind='bar', edgecolor='black')
+    plt.title(f'Syntactic Roles of the Term "{term}" in the Corpus')
+    plt.xlabel('POS Tag')
+    plt.ylabel('Frequency')
+    plt.xticks(rotation=45)
+    plt.grid(axis='y', linestyle='--', alpha=0.7)
+    plt.tight_layout()
+
+    plot_path = f'figures/{slug(term)}_pos_visualization.png'
+    with measure("save_figure", items=1):
+        plt.savefig(plot_path, dpi=300, bbox_inches="tight")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,139 +1,141 @@
-from penman import load
-from collections import defaultdict, Counter
-import matplotlib.pyplot as plt
-import logging
+import numpy as np
 from src.config import cfg
+from src.amr_graph import IndexedGraph
+from src.amr_summary import update as update_summary
+from src.instrument import measure, stage
+from src.lexicon import TermMatcher, slug
+from src.results import HEADLESS, write_results
 
-# --- Logging configuration ---
-logging.getLogger().setLevel(logging.ERROR)
-logging.getLogger("penman").setLevel(logging.ERROR)
-logging.getLogger("penman.codec").setLevel(logging.ERROR)
-
-# --- Load AMR file ---
+# --- AMR file, summarized incrementally as graphs are appended ---
 amr_file = cfg.amr_path
+MATCHER = TermMatcher()
 
-with open(amr_file, "r", encoding="utf-8") as f:
-    amr_graphs = list(load(f))
-
-print(f"Loaded {len(amr_graphs)} AMR graphs.\n")
-
-# --- Count occurrences of concepts related to 'bias' ---
-bias_concepts = defaultdict(int)
-
-for graph in amr_graphs:
-    for src, rel, tgt in graph.triples:
-        if rel == ":instance" and tgt and "bias" in tgt.lower():
-            bias_concepts[tgt.lower()] += 1
-
-# --- Analyze structural position of 'bias' in each graph ---
-def analyze_bias_structure(graph):
-    """Return structural info for nodes representing 'bias' or 'bias-01'."""
-    triples = graph.triples
-    bias_nodes = [
-        src
-        for (src, rel, tgt) in triples
-        if rel == ":instance" and tgt and "bias" in tgt.lower()
-    ]
+# --- Analyze structural position of each term in each graph ---
+def analyze_term_structure(index, nodes):
+    """Return structural info for the nodes of one term (e.g. 'bias' or 'bias-01')."""
     structures = []
 
-    for node in bias_nodes:
-        parents = [(src, rel) for (src, rel, tgt) in triples if tgt == node]
-        children = [(rel, tgt) for (src, rel, tgt) in triples if src == node and rel != ":instance"]
-        siblings = set()
-
-        for (src, rel, tgt) in triples:
-            if tgt == node:
-                siblings.update(
-                    [sib_tgt for (sib_src, sib_rel, sib_tgt) in triples if sib_src == src and sib_tgt != node]
-                )
-
-        all_targets = {t for (_, _, t) in triples}
-        is_root = node not in all_targets
-        is_leaf = not any(src == node and rel != ":instance" for (src, rel, tgt) in triples)
-
+    for node in nodes:
         structures.append({
             "node": node,
-            "is_root": is_root,
-            "is_leaf": is_leaf,
-            "parents": parents,
-            "siblings": list(siblings),
-            "children": children
+            "is_root": index.is_root(node),
+            "is_leaf": index.is_leaf(node),
+            "parents": index.parents(node),
+            "siblings": list(index.siblings(node)),
+            "children": index.children(node)
         })
     return structures
 
 
-# --- Iterate and print structure info for graphs containing 'bias' ---
-for i, graph in enumerate(amr_graphs):
-    structures = analyze_bias_structure(graph)
-    if structures:
-        print(f"\n--- Graph {i + 1} ---")
-        for s in structures:
-            pos_type = "root" if s["is_root"] else "leaf" if s["is_leaf"] else "node"
-            print(f"Node: {s['node']} ({pos_type})")
-            print(f"  Parents: {s['parents']}")
-            print(f"  Siblings: {s['siblings']}")
-            print(f"  Children: {s['children']}")
-
-summary = {
-    "root_count": 0,
-    "node_count": 0,
-    "leaf_count": 0,
-    "relations_to_bias": Counter(),
-    "relations_from_bias": Counter(),
-}
-
-for graph in amr_graphs:
-    triples = graph.triples
-    bias_nodes = [src for (src, rel, tgt) in triples if rel == ":instance" and tgt and "bias" in tgt.lower()]
-
-    for node in bias_nodes:
-        all_targets = {t for (_, _, t) in triples}
-        is_root = node not in all_targets
-        is_leaf = not any(src == node and rel != ":instance" for (src, rel, tgt) in triples)
-
-        if is_root:
-            summary["root_count"] += 1
-        elif is_leaf:
-            summary["leaf_count"] += 1
-        else:
-            summary["node_count"] += 1
-
-        for src, rel, tgt in triples:
-            if tgt == node:
-                summary["relations_to_bias"][rel] += 1
-            if src == node:
-                summary["relations_from_bias"][rel] += 1
-
-print("\nRelations TO 'bias' (Parent → Bias):")
-for rel, count in summary["relations_to_bias"].most_common():
-    print(f"  {rel}: {count}")
-
-print("\nRelations FROM 'bias' (Bias → Child):")
-for rel, count in summary["relations_from_bias"].most_common():
-    print(f"  {rel}: {count}")
-
-# --- parent relations ---
-plt.figure(figsize=(6, 4))
-relations_to_bias = summary["relations_to_bias"]
-if relations_to_bias:
-    sorted_relations = sorted(relations_to_bias.items(), key=lambda x: x[1], reverse=True)
-    relations, counts = zip(*sorted_relations)
-    plt.bar(relations, counts, color="lightcoral")
-    plt.title("Relations TO 'bias' (Parent Links)")
-    plt.xticks(rotation=45)
-    plt.ylabel("Frequency")
-    plt.tight_layout()
-    plt.savefig("figures/relations_to_bias.png", dpi=300, bbox_inches="tight")
-
-# --- child relations ---
-plt.figure(figsize=(6, 4))
-relations_from_bias = summary["relations_from_bias"]
-if relations_from_bias:
-    sorted_relations = sorted(relations_from_bias.items(), key=lambda x: x[1], reverse=True)
-    relations, counts = zip(*sorted_relations)
-    plt.bar(relations, counts, color="mediumseagreen")
-    plt.title("Relations FROM 'bias' (Child Links)")
-    plt.xticks(rotation=45)
-    plt.ylabel("Frequency")
-    plt.tight_layout()
-    plt.savefig("figures/relations_from_bias.png", dpi=300, bbox_inches="tight")
+def summarize(corpus, first_graph=0):
+    """Counts, relations and printed structure of every term over an AMRCorpus whose graph 0 is graph `first_graph`."""
+    # Node lines only name their term when there is more than one
+    labelled = len(MATCHER.terms) > 1
+
+    with measure("triple_scan", items=len(corpus)):
+        found = corpus.term_instances(MATCHER)
+        matched = np.unique(np.concatenate(list(found.values()))) if found else np.empty(0, dtype=np.int64)
+        term_concepts = corpus.concept_counts(matched)
+
+        # --- Counts and relations of every term, over the whole corpus at once ---
+        summaries = {}
+        for term in MATCHER.terms:
+            nodes = found.get(term, np.empty(0, dtype=np.int64))
+            roots = corpus.is_root(nodes)
+            leaves = corpus.is_leaf(nodes) & ~roots
+            summaries[term] = {
+                "root_count": int(roots.sum()),
+                "node_count": int(len(nodes) - roots.sum() - leaves.sum()),
+                "leaf_count": int(leaves.sum()),
+                "relations_to": corpus.role_counts(corpus.incident(nodes, "to")),
+                "relations_from": corpus.role_counts(corpus.incident(nodes, "from")),
+            }
+
+    # --- Structure info, only for the graphs where a term occurs ---
+    lines = []
+    for g in np.unique(corpus.graph_index[matched]):
+        index = IndexedGraph(corpus.graph(g))
+        lines.append(f"\n--- Graph {g + first_graph + 1} ---")
+        for term, nodes in index.find_terms(MATCHER).items():
+            for s in analyze_term_structure(index, nodes):
+                pos_type = "root" if s["is_root"] else "leaf" if s["is_leaf"] else "node"
+                label = f" [{term}]" if labelled else ""
+                lines.append(f"Node: {s['node']} ({pos_type}){label}")
+                lines.append(f"  Parents: {s['parents']}")
+                lines.append(f"  Siblings: {s['siblings']}")
+                lines.append(f"  Children: {s['children']}")
+    return {"concepts": term_concepts, "terms": summaries, "structure": lines}
+
+
+@stage("bias_position_in_graph")
+def main(corpus=None, headless=None):
+    """Print where the nodes of each term sit in cfg.amr_path (or `corpus`, its AMRCorpus) and plot their relations.
+
+    The summary is saved with a checkpoint, so a rerun after graphs were
+    appended to the file only decodes the new ones. Headless runs write the
+    summary to the results directory instead of plotting.
+    """
+    if headless is None:
+        headless = HEADLESS
+
+    summary, graph_count = update_summary(amr_file, "bias_position_in_graph", summarize, MATCHER.signature, corpus)
+    term_concepts, summaries = summary["concepts"], summary["terms"]
+    print(f"Loaded {graph_count} AMR graphs.\n")
+    for line in summary["structure"]:
+        print(line)
+
+    for term, summary in summaries.items():
+        print(f"\nRelations TO '{term}' (Parent → {term.capitalize()}):")
+        for rel, count in summary["relations_to"].most_common():
+            print(f"  {rel}: {count}")
+
+        print(f"\nRelations FROM '{term}' ({term.capitalize()} → Child):")
+        for rel, count in summary["relations_from"].most_common():
+            print(f"  {rel}: {count}")
+
+    if headless:
+        write_results("bias_position_in_graph", {
+            "graph_count": graph_count,
+            "concepts": dict(term_concepts),
+            "terms": summaries,
+        })
+        return
+
+    for term, summary in summaries.items():
+        plot_relations(term, summary)
+
+
+def plot_relations(term, summary):
+    import matplotlib.pyplot as plt
+
+    # --- parent relations ---
+    plt.figure(figsize=(6, 4))
+    relations_to = summary["relations_to"]
+    if relations_to:
+        sorted_relations = sorted(relations_to.items(), key=lambda x: x[1], reverse=True)
+        relations, counts = zip(*sorted_relations)
+        plt.bar(relations, counts, color="lightcoral")
+        plt.title(f"Relations TO '{term}' (Parent Links)")
+        plt.xticks(rotation=45)
+        plt.ylabel("Frequency")
+        plt.tight_layout()
+        with measure("save_figure", items=1):
+            plt.savefig(f"figures/relations_to_{slug(term)}.png", dpi=300, bbox_inches="tight")
+
+    # --- child relations ---
+    plt.figure(figsize=(6, 4))
+    relations_from = summary["relations_from"]
+    if relations_from:
+        sorted_relations = sorted(relations_from.items(), key=lambda x: x[1], reverse=True)
+        relations, counts = zip(*sorted_relations)
+        plt.bar(relations, counts, color="mediumseagreen")
+        plt.title(f"Relations FROM '{term}' (Child Links)")
+        plt.xticks(rotation=45)
+        plt.ylabel("Frequency")
+        plt.tight_layout()
+        with measure("save_figure", items=1):
+            plt.savefig(f"figures/relations_from_{slug(term)}.png", dpi=300, bbox_inches="tight")
+
+
+if __name__ == "__main__":
+    main()
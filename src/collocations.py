@@ -0,0 +1,190 @@
+"""Collocations of any term over the whole text corpus, computed on integer token arrays
+
+    python -m src.collocations bias "machine learning" [--window 5] [--ngram 3] [--top 20]
+
+The corpus is tokenized once, as the positional index does (lowercased,
+punctuation stripped, empty tokens dropped), into one array of token ids with per-document
+offsets. Occurrences of a term, the words in a window around each of them
+and the n-grams containing them are then array operations over those
+positions, so every document is covered, not only the most frequent ones.
+"""
+import argparse
+import string
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from src.config import cfg
+from src.corpus import iter_documents
+from src.instrument import measure
+from src.lexicon import TermMatcher
+
+WINDOW = getattr(cfg, "window_size", 5)
+NGRAM = getattr(cfg, "collocation_ngram", 3)
+MIN_COUNT = getattr(cfg, "collocation_min_count", 3)  # co-occurrences below this are not scored
+
+
+class TokenCorpus:
+    """Every document as token ids: document d is `tokens[offsets[d]:offsets[d + 1]]`, ids into `vocab`.
+
+    Windows never cross a document boundary: `doc_index` gives the document
+    of every token, and positions from another document are left out.
+    """
+
+    def __init__(self, vocab, tokens, offsets, names):
+        self.vocab = vocab
+        self.ids = {w: i for i, w in enumerate(vocab)}
+        self.tokens = tokens
+        self.offsets = offsets
+        self.names = names
+        self.doc_index = np.repeat(np.arange(len(names), dtype=np.int32), np.diff(offsets))
+        self.frequencies = np.bincount(tokens, minlength=len(vocab))
+
+    def __len__(self):
+        return len(self.tokens)
+
+    @classmethod
+    def from_texts(cls, documents, each=None):
+        """Encode (filename, text) pairs; `each(filename, text)` is called on every one, to fill other indexes in the same read.
+
+        Raw tokens are interned first and only the distinct ones are stripped
+        of punctuation, then mapped to their word ids in one array lookup.
+        """
+        raw_ids, names = {}, []
+        tokens, offsets = array("i"), array("q", [0])
+        for filename, text in documents:
+            if each is not None:
+                each(filename, text)
+            tokens.extend([raw_ids.setdefault(raw, len(raw_ids)) for raw in text.lower().split()])
+            offsets.append(len(tokens))
+            names.append(filename)
+
+        ids = {}
+        words = [raw.strip(string.punctuation) for raw in raw_ids]
+        word_ids = np.array([ids.setdefault(w, len(ids)) if w else -1 for w in words] or [-1], dtype=np.int32)
+        tokens = word_ids[np.frombuffer(tokens, dtype=np.int32)] if len(tokens) else np.empty(0, dtype=np.int32)
+        kept = np.concatenate([[0], np.cumsum(tokens >= 0)])  # tokens that were only punctuation are dropped
+        return cls(list(ids), tokens[tokens >= 0], kept[np.frombuffer(offsets, dtype=np.int64)], names)
+
+    @classmethod
+    def build(cls, text_dir=None):
+        return cls.from_texts(iter_documents(text_dir))
+
+    def find(self, term, matcher=None):
+        """Sorted start positions of `term` and its forms under `matcher` (default: the configured term settings)."""
+        matcher = matcher or TermMatcher([term])
+        starts = []
+        for form in matcher.forms_of(term):
+            ids = [self.ids.get(w, -1) for w in form.split()]
+            n = len(ids)
+            if min(ids) < 0 or n > len(self):
+                continue
+            match = self.tokens[:len(self) - n + 1] == ids[0]
+            for k in range(1, n):
+                match &= self.tokens[k:len(self) - n + 1 + k] == ids[k]
+            found = np.flatnonzero(match)
+            starts.append(found[self.doc_index[found] == self.doc_index[found + n - 1]])
+        return np.unique(np.concatenate(starts)) if starts else np.empty(0, dtype=np.int64)
+
+    def _spans(self, starts, offsets):
+        """Positions `starts[i] + offsets[j]`, and whether each lies in the document of `starts[i]`."""
+        positions = starts[:, None] + offsets[None, :]
+        valid = (positions >= 0) & (positions < len(self))
+        positions = np.where(valid, positions, 0)
+        valid &= self.doc_index[positions] == self.doc_index[starts][:, None]
+        return positions, valid
+
+    def cooccurrences(self, starts, length=1, window=WINDOW):
+        """(count of every vocabulary word within `window` tokens of an occurrence, number of window slots filled)."""
+        offsets = np.concatenate([np.arange(-window, 0), np.arange(length, length + window)])
+        positions, valid = self._spans(starts, offsets)
+        words = self.tokens[positions[valid]]
+        return np.bincount(words, minlength=len(self.vocab)), len(words)
+
+    def collocates(self, starts, length=1, window=WINDOW, min_count=MIN_COUNT, exclude=()):
+        """[(word, {"count", "pmi", "ll"})] of the words around the occurrences, by decreasing log-likelihood.
+
+        Scores come from the usual 2x2 table of a window collocation: window
+        slots against the rest of the corpus, the word against every other
+        word. "pmi" is log2(observed / expected) and "ll" is the log-likelihood
+        G², negative when the word occurs less often than expected.
+        """
+        joint, slots = self.cooccurrences(starts, length, window)
+        total = len(self)
+        candidates = np.flatnonzero(joint >= max(min_count, 1))
+        if exclude:
+            excluded = np.array([self.ids.get(w, -1) for w in exclude])
+            candidates = candidates[~np.isin(candidates, excluded)]
+        o11 = joint[candidates].astype(np.float64)
+        c1 = self.frequencies[candidates].astype(np.float64)
+        observed = [o11, slots - o11, c1 - o11, total - slots - c1 + o11]
+        rows, cols = [slots, slots, total - slots, total - slots], [c1, total - c1, c1, total - c1]
+        expected = [r * c / total for r, c in zip(rows, cols)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pmi = np.log2(o11 / expected[0])
+            ll = 2 * sum(np.where(o > 0, o * np.log(o / e), 0.0) for o, e in zip(observed, expected))
+        ll = np.where(o11 < expected[0], -ll, ll)
+        order = np.argsort(-ll, kind="stable")
+        return [(self.vocab[candidates[k]], {"count": int(o11[k]), "pmi": round(float(pmi[k]), 3),
+                                             "ll": round(float(ll[k]), 3)})
+                for k in order]
+
+    def ngrams(self, starts, length=1, n=NGRAM, label=None):
+        """Counter of the `n`-token sequences containing each occurrence, the occurrence written as `label`."""
+        if n < length:
+            raise ValueError(f"{n}-grams cannot contain a term of {length} tokens")
+        rows = []
+        for k in range(n - length + 1):  # the occurrence starts at token k of the n-gram
+            positions, valid = self._spans(starts, np.arange(-k, n - k))
+            grams = self.tokens[positions[valid.all(axis=1)]].astype(np.int64)
+            grams[:, k:k + length] = -1
+            rows.append(grams)
+        grams = np.concatenate(rows)
+        base = len(self.vocab) + 1
+        if base ** n < 2 ** 63:  # one int64 key per n-gram, a faster unique than rows
+            powers = base ** np.arange(n - 1, -1, -1, dtype=np.int64)
+            keys, counts = np.unique((grams + 1) @ powers, return_counts=True)
+            grams = keys[:, None] // powers % base - 1
+        else:
+            grams, counts = np.unique(grams, axis=0, return_counts=True)
+        words = lambda gram: " ".join(self.vocab[i] for i in gram if i >= 0)
+        ngrams = Counter()
+        for gram, count in zip(grams, counts):
+            k = int(np.argmax(gram < 0))
+            ngrams[" ".join(filter(None, [words(gram[:k]), label, words(gram[k + length:])]))] += int(count)
+        return ngrams
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collocates and n-grams of terms over the whole text corpus.")
+    parser.add_argument("terms", nargs="+", help="target terms; their forms follow the term settings of config.json")
+    parser.add_argument("--window", type=int, default=WINDOW, help="tokens on each side of an occurrence")
+    parser.add_argument("--ngram", type=int, default=NGRAM, help="length of the n-grams containing the term")
+    parser.add_argument("--min-count", type=int, default=MIN_COUNT, help="fewest co-occurrences to score a word")
+    parser.add_argument("--top", type=int, default=20, help="collocates and n-grams to list per term")
+    args = parser.parse_args()
+
+    with measure("token_encode") as span:
+        corpus = TokenCorpus.build(cfg.txt_path)
+        span["items"] = len(corpus)
+    print(f"{len(corpus)} tokens, {len(corpus.vocab)} distinct, in {len(corpus.names)} documents.")
+    matcher = TermMatcher(args.terms)
+    for term in matcher.terms:
+        length = len(term.split())
+        with measure("collocations") as span:
+            starts = corpus.find(term, matcher)
+            collocates = corpus.collocates(starts, length, args.window, args.min_count, matcher.forms_of(term))
+            ngrams = corpus.ngrams(starts, length, args.ngram, term)
+            span["items"] = len(starts)
+        print(f"\n'{term}': {len(starts)} occurrences")
+        print(f"Collocates (±{args.window} tokens, by log-likelihood):")
+        for word, score in collocates[:args.top]:
+            print(f"  {word}: count={score['count']} pmi={score['pmi']} ll={score['ll']}")
+        print(f"{args.ngram}-grams:")
+        for gram, count in ngrams.most_common(args.top):
+            print(f"  {gram}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Cosine nearest-neighbour search of many query embeddings against a concept vocabulary"""
+import json
+import os
+
+import numpy as np
+
+
+def l2_normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores, k):
+    """Column indices of the k largest scores of each row, best first."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1)
+
+
+class ConceptIndex:
+    """Vocabulary embeddings normalized once, queried by blocks of rows.
+
+    Scoring a block is one matrix product and the top-k is taken with
+    argpartition, so memory stays at (n_queries, block_size) however large
+    the vocabulary is. An index can be saved and reopened memory-mapped.
+    """
+
+    def __init__(self, labels, embeddings, normalized=False):
+        self.labels = list(labels)
+        self.matrix = embeddings if normalized else l2_normalize(embeddings)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "matrix.npy"), np.asarray(self.matrix))
+        with open(os.path.join(directory, "labels.json"), "w", encoding="utf-8") as f:
+            json.dump(self.labels, f)
+
+    @classmethod
+    def load(cls, directory):
+        matrix = np.load(os.path.join(directory, "matrix.npy"), mmap_mode="r")
+        with open(os.path.join(directory, "labels.json"), "r", encoding="utf-8") as f:
+            labels = json.load(f)
+        return cls(labels, matrix, normalized=True)
+
+    def search(self, queries, top_k=10, block_size=65536):
+        """Return (indices, scores), both (n_queries, top_k), best match first."""
+        queries = l2_normalize(queries)
+        best_idx = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self.labels), block_size):
+            block_scores = queries @ np.asarray(self.matrix[start:start + block_size]).T
+            block_idx = _top_k(block_scores, top_k)
+            scores = np.concatenate([best_scores, np.take_along_axis(block_scores, block_idx, axis=1)], axis=1)
+            idx = np.concatenate([best_idx, block_idx + start], axis=1)
+            keep = _top_k(scores, top_k)
+            best_scores = np.take_along_axis(scores, keep, axis=1)
+            best_idx = np.take_along_axis(idx, keep, axis=1)
+        return best_idx, best_scores
+
+
+def nearest_concepts(query_labels, query_embeddings, labels=None, embeddings=None, top_k=10, index=None):
+    """Map each query label to its top_k [(concept, similarity)], against `index` or (labels, embeddings)."""
+    if index is None:
+        index = ConceptIndex(labels, embeddings)
+    indices, scores = index.search(query_embeddings, top_k)
+    return {
+        query: [(index.labels[i], float(s)) for i, s in zip(row_idx, row_scores)]
+        for query, row_idx, row_scores in zip(query_labels, indices, scores)
+    }
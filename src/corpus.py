@@ -0,0 +1,47 @@
+"""Read the .txt corpus of cfg.txt_path, from the files or from the packed copy of src.corpus_store"""
+import os
+
+from src.config import cfg
+from src.instrument import iter_measured
+
+# read documents as slices of one memory-mapped pack file instead of opening each file
+PACKED = getattr(cfg, "packed_corpus", False)
+
+
+def list_documents(text_dir=None):
+    """Filenames of the .txt files, in directory order; refreshes the pack first when packed."""
+    text_dir = text_dir or cfg.txt_path
+    if PACKED:
+        from src.corpus_store import open_store
+        return list(open_store(text_dir).order)
+    if not os.path.exists(text_dir):
+        raise FileNotFoundError(f"Text folder not found: {text_dir}")
+    return [filename for filename in os.listdir(text_dir) if filename.endswith(".txt")]
+
+
+def read_document(filename, text_dir=None):
+    """Text of one document; with a pack, as refreshed by the last list_documents in this process (or its parent)."""
+    text_dir = text_dir or cfg.txt_path
+    if PACKED:
+        from src.corpus_store import open_store
+        return open_store(text_dir, refresh=False).text(filename)
+    with open(os.path.join(text_dir, filename), "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
+def iter_documents(text_dir=None):
+    """Yield (filename, text) for every .txt file, in directory order."""
+    text_dir = text_dir or cfg.txt_path
+    if not os.path.exists(text_dir):
+        raise FileNotFoundError(f"Text folder not found: {text_dir}")
+    yield from iter_measured("read_files", _read_documents(text_dir))
+
+
+def _read_documents(text_dir):
+    for filename in list_documents(text_dir):
+        yield filename, read_document(filename, text_dir)
+
+
+def load_corpus(text_dir=None):
+    """{filename: text} of the whole corpus, to share between stages."""
+    return dict(iter_documents(text_dir))
@@ -0,0 +1,159 @@
+"""Packed copy of the text corpus: every document in one file, read as slices of an mmap
+
+    python -m src.corpus_store    # pack cfg.txt_path, or bring the pack up to date
+"""
+import mmap
+import os
+import re
+
+from src.config import cfg
+from src.manifest import load_manifest, save_manifest, scan
+
+CACHE_DIR = getattr(cfg, "cache_dir", os.path.join("data", "cache"))
+
+
+class CorpusStore:
+    """The .txt files of `text_dir` concatenated into one pack file, plus an index.
+
+    Texts are stored as every stage reads them (UTF-8 with undecodable bytes
+    dropped and newlines normalized), re-encoded as UTF-8. The index maps each
+    filename to its size, mtime and hash (as in src.manifest) and to the
+    offset, length and doc_id of its text in the pack. `refresh` appends new
+    and modified documents and only rewrites the pack once more than half of
+    it belongs to stale versions. A rewrite goes to a new pack file that the
+    index switches to atomically, so an interrupted run never leaves an index
+    pointing into the wrong file.
+    """
+
+    def __init__(self, text_dir=None, store_dir=None):
+        self.text_dir = text_dir or cfg.txt_path
+        store_dir = store_dir or os.path.join(CACHE_DIR, "corpus")
+        self.dir = os.path.join(store_dir, re.sub(r"[^\w.-]+", "__", os.path.abspath(self.text_dir)).strip("_"))
+        self.index_path = os.path.join(self.dir, "index.json")
+        index = load_manifest(self.index_path)
+        self.pack = index.get("pack")
+        self.documents = index.get("documents", {})  # filename -> size, mtime, sha256, offset, length, doc_id
+        self.order = index.get("order", [])          # filenames in directory order
+        if not self.pack or not os.path.exists(self.pack_path):
+            self.pack, self.documents, self.order = None, {}, []
+        self._stale = None  # pack file replaced by a rewrite, removed once the index is saved
+        self._mm = None
+
+    @property
+    def pack_path(self):
+        return os.path.join(self.dir, self.pack or "")
+
+    def __len__(self):
+        return len(self.order)
+
+    def refresh(self):
+        """Bring the pack in line with `text_dir`; returns the number of documents (re)packed."""
+        if not os.path.exists(self.text_dir):
+            raise FileNotFoundError(f"Text folder not found: {self.text_dir}")
+        filenames = [filename for filename in os.listdir(self.text_dir) if filename.endswith(".txt")]
+        entries, changed, removed = scan(self.text_dir, filenames, self.documents)
+        for filename, entry in entries.items():
+            # touched but identical files get a fresh manifest entry: keep their place in the pack
+            if "offset" not in entry and filename not in changed:
+                old = self.documents[filename]
+                entry.update(offset=old["offset"], length=old["length"], doc_id=old["doc_id"])
+        if not changed and not removed and filenames == self.order:
+            if entries != self.documents:
+                # only mtimes moved: record them, or every later refresh hashes these files again
+                self.documents = entries
+                self._save_index()
+            return 0
+
+        self.close()
+        os.makedirs(self.dir, exist_ok=True)
+        if self.pack is None:
+            self.pack = "corpus.0.pack"
+        with open(self.pack_path, "ab") as f:
+            for filename in changed:
+                self._append(f, filename, entries[filename])
+        live = sum(entry["length"] for entry in entries.values())
+        if os.path.getsize(self.pack_path) > 2 * live:
+            self._rewrite(entries, filenames)
+        self.documents, self.order = entries, filenames
+        self._save_index()
+        return len(changed)
+
+    def _append(self, f, filename, entry):
+        with open(os.path.join(self.text_dir, filename), "r", encoding="utf-8", errors="ignore") as source:
+            data = source.read().encode("utf-8")
+        entry.update(offset=f.tell(), length=len(data), doc_id=re.sub(r"\D", "", filename))
+        f.write(data)
+
+    def _rewrite(self, entries, filenames):
+        """Copy the live texts, in directory order, to the next pack file."""
+        old_path = self.pack_path
+        generation = int(re.search(r"\d+", self.pack).group()) + 1
+        self.pack = f"corpus.{generation}.pack"
+        with open(old_path, "rb") as old, open(self.pack_path, "wb") as new:
+            for filename in filenames:
+                entry = entries[filename]
+                old.seek(entry["offset"])
+                data = old.read(entry["length"])
+                entry["offset"] = new.tell()
+                new.write(data)
+        self._stale = old_path
+
+    def _save_index(self):
+        save_manifest(self.index_path, {"pack": self.pack, "documents": self.documents, "order": self.order})
+        if self._stale:
+            os.remove(self._stale)
+            self._stale = None
+
+    def _map(self):
+        if self._mm is None:
+            with open(self.pack_path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return memoryview(b"")
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._mm)
+
+    def view(self, filename):
+        """Zero-copy memoryview of the UTF-8 bytes of one document."""
+        entry = self.documents[filename]
+        return self._map()[entry["offset"]:entry["offset"] + entry["length"]]
+
+    def text(self, filename):
+        return str(self.view(filename), "utf-8")
+
+    def doc_id(self, filename):
+        return self.documents[filename]["doc_id"]
+
+    def iter_documents(self):
+        """Yield (filename, text) in directory order."""
+        for filename in self.order:
+            yield filename, self.text(filename)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+_stores = {}  # text_dir -> CorpusStore, one per process
+
+
+def open_store(text_dir=None, refresh=True):
+    """This process's store for `text_dir`; `refresh` first syncs it with the files."""
+    text_dir = text_dir or cfg.txt_path
+    store = _stores.get(text_dir)
+    if store is None:
+        store = _stores[text_dir] = CorpusStore(text_dir)
+    if refresh:
+        store.refresh()
+    return store
+
+
+def main():
+    store = CorpusStore()
+    packed = store.refresh()
+    size = os.path.getsize(store.pack_path) if store.pack else 0
+    print(f"Packed {packed} new or modified of {len(store)} documents into {store.pack_path} ({size / 1e6:.1f} MB).")
+
+
+if __name__ == "__main__":
+    main()
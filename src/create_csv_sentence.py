@@ -1,46 +1,160 @@
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import islice
 from nltk.corpus import stopwords
-import nltk
 import pandas as pd
 from src.config import cfg
+from src.corpus import list_documents, read_document
+from src.instrument import iter_measured, stage
+from src.lexicon import TermMatcher
+from src.manifest import load_manifest, save_manifest, scan
+from src.nltk_resources import ensure
+from src.segment import hit_sentence_spans, sentence_spans
+from src.sentence_store import COLUMNS, FORMAT, SentenceWriter, iter_sentences, sentences_path
 
 # --- Setup ---
-nltk.download("stopwords", quiet=True)
+ensure("stopwords", "punkt_tab")
 stop_words = set(stopwords.words("english"))
 
 text_dir = cfg.txt_path
-csv_file = cfg.MapAIE_csv_path
-
-bias_sentences = []
-
-# Loop over each document
-for filename in os.listdir(text_dir):
-    if filename.endswith(".txt"):
-        doc_id = re.sub(r"\D", "", filename)  # extract number from filename
-        with open(os.path.join(text_dir, filename), "r", encoding="utf-8", errors="ignore") as f:
-            text = f.read()
-            # Split into sentences
-            sentences = nltk.sent_tokenize(text)
-            # Keep only those containing "bias"
-            for s in sentences:
-                if "bias" in s.lower():
-                    bias_sentences.append({"doc_id": doc_id, "sentence": s.strip()})
-
-# Convert to DataFrame for organization
-bias_df = pd.DataFrame(bias_sentences)
-
-# Display size of bias-MapAIE corpus
-print(f"The bias-MapAIE corpus contains {len(bias_df)} sentences.")
-
-# Optional: show first few rows
-print(bias_df.head())
-
-# Save corpus to CSV if needed
-bias_df.to_csv(
-    csv_file, 
-    index=False,
-    quoting=1,
-    escapechar="\\", # escape special characters
-    encoding="utf-8"
-)
\ No newline at end of file
+output_file = sentences_path()  # cfg.MapAIE_csv_path, or the .parquet next to it
+manifest_file = output_file + ".manifest.json"
+WORKERS = getattr(cfg, "workers", None) or os.cpu_count() or 1
+# "hits": segment only around matches of the term; "full": segment whole documents
+SEGMENTATION = getattr(cfg, "sentence_segmentation", "hits")
+MATCHER = TermMatcher()  # cfg.terms, matched case-insensitively
+
+
+def get_doc_id(filename):
+    return re.sub(r"\D", "", filename)  # extract number from filename
+
+
+def extract_sentences(filename, text=None):
+    """Return the rows of one document: one per sentence, or per sentence and term it contains with a "term" column."""
+    doc_id = get_doc_id(filename)
+    rows = []
+    if text is None:
+        text = read_document(filename, text_dir)
+    # Split into sentences
+    if SEGMENTATION == "full":
+        spans = sentence_spans(text)
+    else:
+        spans = hit_sentence_spans(text, MATCHER.regex)
+    # Keep only those containing a term
+    for start, end in spans:
+        s = text[start:end]
+        terms = MATCHER.terms_in(s)
+        if not terms:
+            continue
+        sentence = s.strip()
+        start += len(s) - len(s.lstrip())
+        row = {"doc_id": doc_id, "sentence": sentence, "start": start, "end": start + len(sentence)}
+        if "term" in COLUMNS:
+            rows.extend({**row, "term": term} for term in terms)
+        else:
+            rows.append(row)
+    return rows
+
+
+def files_to_copy(filenames, manifest, dirty):
+    """The unchanged files whose rows can be copied from the current corpus while writing in directory order.
+
+    Each manifest entry records where the rows of its file start ("first_row")
+    and how many there are ("rows"), so files sharing a doc_id stay apart. A
+    file whose rows come before those of a file listed earlier (the directory
+    order changed) is re-extracted instead.
+    """
+    copied, next_row = set(), 0
+    for name in filenames:
+        entry = manifest.get(name)
+        if entry is None or name in dirty:
+            continue
+        if entry["rows"] and entry["first_row"] < next_row:
+            continue
+        copied.add(name)
+        next_row = max(next_row, entry["first_row"] + entry["rows"])
+    return copied
+
+
+def existing_rows(manifest, copied):
+    """Yield the rows of each file of `copied` that has any, in corpus order, reading the corpus chunk by chunk."""
+    spans = sorted((entry["first_row"], entry["rows"], name) for name, entry in manifest.items() if entry["rows"])
+    rows = (row for chunk in iter_sentences(output_file, raw=True) for row in chunk.to_dict("records"))
+    for _, count, name in spans:
+        file_rows = list(islice(rows, count))
+        if name in copied:
+            yield file_rows
+
+
+@stage("create_csv_sentence")
+def main(corpus=None, keep_rows=False):
+    """Extract the sentences of every term and write the sentence corpus (CSV or Parquet).
+
+    `corpus` ({filename: text}) is used instead of reading the files when given.
+    Rows are written as documents are extracted, and the rows of unchanged
+    documents are copied from the previous corpus as it is read, so the
+    corpus is never held in memory. With `keep_rows` (the pipeline runner)
+    a CSV corpus is also returned as a DataFrame; a Parquet corpus is read
+    back in chunks downstream.
+    """
+    filenames = list_documents(text_dir)
+
+    # Only new, modified or deleted documents are re-extracted when a previous run exists
+    manifest = load_manifest(manifest_file) if os.path.exists(output_file) else {}
+    if any(entry.get("terms") != MATCHER.signature or entry.get("columns") != COLUMNS
+           or "rows" not in entry for entry in manifest.values()):
+        manifest = {}  # the corpus was built for other terms, settings or columns: rebuild it
+    entries, changed, removed = scan(text_dir, filenames, manifest)
+    for entry in entries.values():
+        entry["terms"] = MATCHER.signature
+        entry["columns"] = COLUMNS
+    copied = files_to_copy(filenames, manifest, set(changed + removed))
+    todo = [filename for filename in filenames if filename not in copied]
+    print(f"Extracting sentences from {len(todo)} of {len(filenames)} documents.")
+
+    # Merge in directory order, as a full rebuild would, writing rows as documents come out of the pool
+    keep = keep_rows and FORMAT == "csv"
+    bias_sentences = []
+    head = []
+    with ExitStack() as stack:
+        new_rows = iter(())
+        if todo:
+            # reading (unless `corpus` is given) and sentence tokenization, in the workers
+            pool = stack.enter_context(ProcessPoolExecutor(min(WORKERS, len(todo))))
+            texts = [corpus.get(filename) for filename in todo] if corpus else [None] * len(todo)
+            new_rows = iter_measured("sentence_tokenization", pool.map(extract_sentences, todo, texts, chunksize=8))
+            stack.callback(new_rows.close)  # ends the span once every document is consumed
+        todo = set(todo)
+
+        writer = stack.enter_context(SentenceWriter(output_file))
+        old_rows = iter(())
+        if any(manifest[filename]["rows"] for filename in copied):
+            old_rows = existing_rows(manifest, copied)
+            stack.callback(old_rows.close)  # closes the previous corpus before it is replaced
+        for filename in filenames:
+            if filename in todo:
+                rows = next(new_rows)
+            else:
+                rows = next(old_rows) if manifest[filename]["rows"] else []
+            entries[filename].update(first_row=writer.rows, rows=len(rows))
+            writer.write(rows)
+            head.extend(rows[:5 - len(head)])
+            if keep:
+                bias_sentences.extend(rows)
+
+    # Display size of bias-MapAIE corpus
+    print(f"The bias-MapAIE corpus contains {writer.rows} sentences.")
+
+    # Optional: show first few rows
+    print(pd.DataFrame(head, columns=COLUMNS))
+
+    save_manifest(manifest_file, entries)
+    if keep:
+        return pd.DataFrame(bias_sentences, columns=COLUMNS)
+    return None
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,114 @@
 import os
 import re
 from collections import Counter
-import matplotlib.pyplot as plt
-import nltk
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from nltk.corpus import stopwords
 
 from src.config import cfg
+from src.corpus import list_documents, read_document
+from src.instrument import measure, stage
+from src.nltk_resources import ensure
+from src.results import HEADLESS, write_results
+from src.sketch import COUNTING, make_counter
 
 # --- Setup ---
-nltk.download('stopwords', quiet=True)
-nltk.download("punkt", quiet=True)
+ensure("stopwords")
 
-# --- Load all .txt files from cfg.txt_path ---
-corpus_text = ""
-if not os.path.exists(cfg.txt_path):
-    raise FileNotFoundError(f"Text path not found: {cfg.txt_path}")
+stop_words = set(stopwords.words("english"))
+WORKERS = getattr(cfg, "workers", None) or os.cpu_count() or 1
+WORD_PATTERN = re.compile(r"\b[a-zA-Z]{2,}\b")
 
-for filename in os.listdir(cfg.txt_path):
-    if filename.endswith(".txt"):
-        file_path = os.path.join(cfg.txt_path, filename)
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            corpus_text += f.read().lower() + " "
 
-print(f"Loaded {len(corpus_text)} characters from text files in '{cfg.txt_path}'.")
+def count_text(text):
+    """Count the non-stopword tokens of one document; also return its length in characters."""
+    text = text.lower()
+    # --- Tokenization & Cleaning ---
+    # Extract alphabetic words only (length >= 2), then remove stopwords
+    tokens = WORD_PATTERN.findall(text)
+    return Counter(w for w in tokens if w not in stop_words), len(text) + 1
 
-# --- Tokenization & Cleaning ---
-# Extract alphabetic words only (length >= 2)
-tokens = re.findall(r"\b[a-zA-Z]{2,}\b", corpus_text)
 
-# Remove stopwords
-stop_words = set(stopwords.words("english"))
-filtered_tokens = [w for w in tokens if w not in stop_words]
-
-# --- Frequency analysis ---
-word_freq = Counter(filtered_tokens)
-top_words = word_freq.most_common(40)
-
-# Print top words
-print("\nTop 40 most frequent words (excluding stopwords):")
-for word, freq in top_words:
-    print(f"{word}: {freq}")
-
-# --- Visualization ---
-plt.figure(figsize=(12, 6))
-words, counts = zip(*top_words)
-plt.bar(words, counts)
-plt.title("Top 40 Most Frequent Words (Excluding Stopwords)")
-plt.xticks(rotation=45, ha="right")
-plt.ylabel("Frequency")
-plt.tight_layout()
-
-# --- Save chart ---
-output_dir = os.path.join("data")
-os.makedirs(output_dir, exist_ok=True)
-output_path = os.path.join(output_dir, "word_frequency.png")
-plt.savefig(output_path, dpi=300, bbox_inches="tight")
-plt.close()
+def count_words(filename):
+    return count_text(read_document(filename))
+
+
+def count_share(count, documents):
+    """Fold the counts of a share of the documents into one counter, in a worker; sketches stay fixed-size."""
+    word_freq, n_chars = make_counter(), 0
+    for document in documents:
+        file_freq, file_chars = count(document)
+        word_freq.update(file_freq)
+        n_chars += file_chars
+    return word_freq, n_chars
+
+
+@stage("data_exploration")
+def main(corpus=None, headless=None):
+    """Plot the 40 most frequent words; `corpus` ({filename: text}) replaces reading the files.
+
+    Headless runs write the counts to the results directory instead of plotting.
+    """
+    if headless is None:
+        headless = HEADLESS
+    # --- Count words of all .txt files from cfg.txt_path, one file per task ---
+    if corpus is not None:
+        count, documents = count_text, list(corpus.values())
+    else:
+        count, documents = count_words, list_documents(cfg.txt_path)
+
+    # --- Frequency analysis: merge per-file counts in directory order ---
+    word_freq = make_counter()
+    n_chars = 0
+    workers = max(1, min(WORKERS, len(documents)))
+    with measure("word_count", items=len(documents)), ProcessPoolExecutor(workers) as pool:
+        if COUNTING == "sketch":
+            # one sketch per worker share, merged here: memory does not grow with the vocabulary
+            shares = [documents[i::workers] for i in range(workers)]
+            for share_freq, share_chars in pool.map(partial(count_share, count), shares):
+                word_freq.merge(share_freq)
+                n_chars += share_chars
+        else:
+            for file_freq, file_chars in pool.map(count, documents, chunksize=16):
+                word_freq.update(file_freq)
+                n_chars += file_chars
+
+    print(f"Loaded {n_chars} characters from text files in '{cfg.txt_path}'.")
+    if COUNTING == "sketch":
+        print(f"Approximate counts ({word_freq.describe()}).")
+
+    top_words = word_freq.most_common(40)
+
+    # Print top words
+    print("\nTop 40 most frequent words (excluding stopwords):")
+    for word, freq in top_words:
+        print(f"{word}: {freq}")
+
+    if headless:
+        results = {"characters": n_chars, "top_words": dict(top_words)}
+        if COUNTING == "sketch":
+            results["sketch"] = {"max_overestimate": word_freq.epsilon * word_freq.total, "confidence": 1 - word_freq.delta}
+        write_results("data_exploration", results)
+        return
+
+    # --- Visualization ---
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(12, 6))
+    words, counts = zip(*top_words)
+    plt.bar(words, counts)
+    plt.title("Top 40 Most Frequent Words (Excluding Stopwords)")
+    plt.xticks(rotation=45, ha="right")
+    plt.ylabel("Frequency")
+    plt.tight_layout()
+
+    # --- Save chart ---
+    output_dir = os.path.join("data")
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, "word_frequency.png")
+    with measure("save_figure", items=1):
+        plt.savefig(output_path, dpi=300, bbox_inches="tight")
+    plt.close()
+
+
+if __name__ == "__main__":
+    main()
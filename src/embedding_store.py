@@ -0,0 +1,89 @@
+"""Disk-backed embedding store keyed by (model name, text)"""
+import json
+import os
+import re
+
+import numpy as np
+
+from src.config import cfg
+
+CACHE_DIR = getattr(cfg, "cache_dir", os.path.join("data", "cache"))
+
+
+class EmbeddingStore:
+    """Append-only float32 matrix on disk plus a text-to-row index, one directory per model.
+
+    Rows are memory-mapped on read; only texts that are not in the index yet
+    go through the encoder.
+    """
+
+    def __init__(self, model_name, store_dir=None):
+        self.model_name = model_name
+        store_dir = store_dir or os.path.join(CACHE_DIR, "embeddings")
+        self.dir = os.path.join(store_dir, re.sub(r"[^\w.-]+", "__", model_name))
+        self.matrix_path = os.path.join(self.dir, "embeddings.f32")
+        self.index_path = os.path.join(self.dir, "index.json")
+        self.dim = None
+        self.texts = []
+        self.rows = {}
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        n_bytes = os.path.getsize(self.matrix_path) if os.path.exists(self.matrix_path) else 0
+        if index.get("model") != self.model_name or n_bytes < len(index["texts"]) * index["dim"] * 4:
+            return  # index and matrix out of sync: start over
+        self.dim = index["dim"]
+        self.texts = index["texts"]
+        self.rows = {text: i for i, text in enumerate(self.texts)}
+
+    def _save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": self.dim, "texts": self.texts}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __contains__(self, text):
+        return text in self.rows
+
+    def matrix(self):
+        """Memory-mapped (n, dim) view of every stored embedding."""
+        if not self.texts:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(len(self.texts), self.dim))
+
+    def add(self, texts, embeddings):
+        """Append embeddings for texts that are not stored yet."""
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if all(text in self.rows for text in texts):
+            return
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+            os.makedirs(self.dir, exist_ok=True)
+            # drop rows a previous, interrupted run may have left behind
+            open(self.matrix_path, "wb").close()
+        with open(self.matrix_path, "r+b") as f:
+            f.seek(len(self.texts) * self.dim * 4)
+            for text, row in zip(texts, embeddings):
+                if text in self.rows:
+                    continue
+                f.write(row.tobytes())
+                self.rows[text] = len(self.texts)
+                self.texts.append(text)
+            f.truncate()
+        self._save_index()
+
+    def embed(self, texts, encode):
+        """Embeddings for `texts`, calling `encode` only on the texts missing from the store."""
+        missing = list(dict.fromkeys(t for t in texts if t not in self.rows))
+        if missing:
+            self.add(missing, encode(missing))
+        matrix = self.matrix()
+        return np.asarray(matrix[[self.rows[t] for t in texts]])
@@ -0,0 +1,82 @@
+"""CPU sentence encoder: length-bucketed batches and attention-masked mean pooling"""
+import numpy as np
+
+from src.config import cfg
+from src.instrument import measure
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class MiniLMEncoder:
+    """Encode texts in fixed-size batches of similar token length.
+
+    Inputs are read in blocks of `batch_size * sort_blocks` texts, sorted by
+    token count inside each block, and padded per batch only, so memory stays
+    bounded whatever the number of texts. torch, transformers and the model
+    are only imported and loaded on first use. Texts are truncated to
+    `max_length` tokens, by default the longest input the model accepts.
+    """
+
+    def __init__(self, model_name=MODEL_NAME, batch_size=None, threads=None, quantize=None,
+                 max_length=None, sort_blocks=32):
+        self.model_name = model_name
+        self.batch_size = batch_size or getattr(cfg, "encoder_batch_size", 64)
+        self.threads = threads or getattr(cfg, "encoder_threads", None)
+        self.quantize = quantize if quantize is not None else getattr(cfg, "encoder_quantize", False)
+        self.max_length = max_length or getattr(cfg, "encoder_max_length", None)
+        self.sort_blocks = sort_blocks
+        self.token_limit = None
+        self.tokenizer = None
+        self.model = None
+
+    @property
+    def name(self):
+        """Identifies the embeddings this encoder produces, e.g. as an EmbeddingStore key."""
+        truncation = f"+max{self.max_length}" if self.max_length else ""  # unset: the model's own limit
+        return self.model_name + "+masked-mean" + truncation + ("+int8" if self.quantize else "")
+
+    def load(self):
+        if self.model is not None:
+            return
+        import torch
+        from transformers import AutoTokenizer, AutoModel
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        model = AutoModel.from_pretrained(self.model_name).eval()
+        # tokenizers without a limit report a huge sentinel; the position embeddings bound it anyway
+        self.token_limit = self.max_length or min(self.tokenizer.model_max_length,
+                                                  model.config.max_position_embeddings)
+        if self.quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+
+    def _encode_batch(self, features):
+        import torch
+
+        inputs = self.tokenizer.pad(features, return_tensors="pt")
+        with measure("model_forward", items=len(features)), torch.inference_mode():
+            hidden = self.model(**inputs).last_hidden_state
+        mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        return pooled.cpu().numpy()
+
+    def encode(self, texts):
+        """Return a float32 (len(texts), dim) array, rows in input order."""
+        self.load()
+        texts = list(texts)
+        dim = self.model.config.hidden_size
+        embeddings = np.empty((len(texts), dim), dtype=np.float32)
+        block_size = self.batch_size * self.sort_blocks
+
+        for block_start in range(0, len(texts), block_size):
+            block = texts[block_start:block_start + block_size]
+            encoded = self.tokenizer(block, truncation=True, max_length=self.token_limit)
+            order = sorted(range(len(block)), key=lambda i: len(encoded["input_ids"][i]))
+            for batch_start in range(0, len(order), self.batch_size):
+                batch = order[batch_start:batch_start + self.batch_size]
+                features = [{key: encoded[key][i] for key in encoded.keys()} for i in batch]
+                rows = [block_start + i for i in batch]
+                embeddings[rows] = self._encode_batch(features)
+        return embeddings
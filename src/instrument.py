@@ -0,0 +1,144 @@
+"""Wall time, peak RSS and item counts of the hot paths, logged at cfg.log_level
+
+Spans (`measure`, `iter_measured`) are logged at DEBUG as key=value lines
+and added up per stage; `stage` logs the totals at INFO when it ends. When
+cfg.trace_file is set every span and stage is also appended to it as a
+Chrome trace event, so the file opens in chrome://tracing or Perfetto.
+"""
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from src.config import cfg
+
+LOG_LEVEL = str(getattr(cfg, "log_level", None) or "warning").upper()
+TRACE_FILE = getattr(cfg, "trace_file", None)
+
+logger = logging.getLogger("chai")
+_stages = []  # open stages, innermost last
+_trace_lock = threading.Lock()
+
+
+def configure_logging(level=None):
+    """Log to stderr, with the pipeline's own logger at `level` (default cfg.log_level).
+
+    Third-party loggers stay at WARNING, and penman, which warns about every
+    graph it has to repair, at ERROR.
+    """
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logger.setLevel(level or LOG_LEVEL)
+    logging.getLogger("penman").setLevel(logging.ERROR)
+
+
+def peak_rss_mb(who=None):
+    """Peak resident set size of this process or of its largest child process, in MiB.
+
+    `who` (resource.RUSAGE_SELF or RUSAGE_CHILDREN) limits it to one of the
+    two. This is a high-water mark over the whole life of the process, not
+    of the current stage.
+    """
+    whos = [who] if who is not None else [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]
+    rss = max(resource.getrusage(w).ru_maxrss for w in whos)
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+def _fields(**fields):
+    return " ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                    for key, value in fields.items() if value is not None)
+
+
+def _trace(name, category, start, seconds, args):
+    if not TRACE_FILE:
+        return
+    event = {
+        "name": name, "cat": category, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+        "ts": int(start * 1e6), "dur": int(seconds * 1e6), "args": args,
+    }
+    # JSON array format: the closing bracket is optional, so events can be appended from any process
+    with _trace_lock:
+        try:
+            fd = os.open(TRACE_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            os.write(fd, b"[\n")
+            os.close(fd)
+        except FileExistsError:
+            pass
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + ",\n")
+
+
+def _finish(name, start, seconds, items):
+    stage = _stages[-1] if _stages else None
+    if stage is not None:
+        total = stage["spans"].setdefault(name, {"seconds": 0.0, "items": 0, "calls": 0})
+        total["seconds"] += seconds
+        total["items"] += items or 0
+        total["calls"] += 1
+    logger.debug(_fields(span=name, stage=stage and stage["name"], seconds=seconds, items=items))
+    _trace(name, "span", start, seconds, {"items": items})
+
+
+@contextmanager
+def measure(name, items=None):
+    """Time the block as span `name`; the block may set the yielded record's "items"."""
+    record = {"items": items}
+    start, wall_start = time.perf_counter(), time.time()
+    try:
+        yield record
+    finally:
+        _finish(name, wall_start, time.perf_counter() - start, record["items"])
+
+
+def iter_measured(name, iterable, size=None):
+    """Yield from `iterable`, timing only the time spent producing items.
+
+    Items are counted one each, or `size(item)` each when given (e.g. len of a chunk).
+    """
+    iterator = iter(iterable)
+    seconds, items, wall_start = 0.0, 0, time.time()
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                seconds += time.perf_counter() - start
+            items += size(item) if size else 1
+            yield item
+    finally:
+        _finish(name, wall_start, seconds, items)
+
+
+@contextmanager
+def stage(name):
+    """Collect the spans of one analysis stage and log its wall time, peak RSS and span totals.
+
+    `process_peak_rss_mb` is the process-wide high-water mark; `rss_growth_mb`
+    is how much the stage raised it, so a stage that stays below what an
+    earlier stage of the same process used reports 0.
+    """
+    configure_logging()
+    record = {"name": name, "spans": {}}
+    _stages.append(record)
+    baseline = peak_rss_mb()
+    start, wall_start = time.perf_counter(), time.time()
+    try:
+        yield record
+    finally:
+        _stages.remove(record)
+        seconds = time.perf_counter() - start
+        rss = peak_rss_mb()
+        spans = {
+            f"{span}.{key}": value
+            for span, total in record["spans"].items()
+            for key, value in (("seconds", total["seconds"]), ("items", total["items"]))
+        }
+        memory = {"process_peak_rss_mb": rss, "rss_growth_mb": rss - baseline}
+        logger.info(_fields(stage=name, seconds=seconds, **memory, **spans))
+        _trace(name, "stage", wall_start, seconds, {**memory, "spans": record["spans"]})
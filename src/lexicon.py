@@ -0,0 +1,119 @@
+"""Configurable term list and a matcher that finds every term in one scan of the text"""
+import re
+from collections import Counter
+
+from src.config import cfg
+
+TERMS = list(dict.fromkeys(term.lower() for term in getattr(cfg, "terms", None) or ["bias"]))
+WORD_BOUNDARY = getattr(cfg, "term_word_boundary", False)
+LEMMAS = getattr(cfg, "term_lemmas", False)
+
+_WORD_CHAR = re.compile(r"\w")
+
+
+def inflections(term):
+    """The term and the regular inflections of its last word (plural, -ed, -ing)."""
+    head, _, last = term.rpartition(" ")
+    prefix = head + " " if head else ""
+    forms = {last, last + "s", last + "es", last + "ed", last + "ing"}
+    if last.endswith("e"):
+        forms |= {last + "d", last[:-1] + "ing"}
+    if last.endswith("y") and len(last) > 1 and last[-2] not in "aeiou":
+        forms |= {last[:-1] + "ies", last[:-1] + "ied"}
+    return [prefix + form for form in sorted(forms)]
+
+
+def _trie_pattern(forms):
+    trie = {}
+    for form in forms:
+        node = trie
+        for ch in form:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    return _node_pattern(trie)
+
+
+def _node_pattern(node):
+    branches = [re.escape(ch) + _node_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    return f"(?:{body})?" if "" in node else body
+
+
+def slug(term):
+    """File-name friendly form of a term."""
+    return re.sub(r"\W+", "_", term).strip("_")
+
+
+class TermMatcher:
+    """Every occurrence of every term, found in a single scan.
+
+    The terms (and, with `lemmas`, their inflected forms) are compiled into
+    one trie-shaped regex, so like an Aho-Corasick automaton the text is read
+    once whatever the number of terms, and the scan runs in the regex engine
+    rather than in Python. Terms that are prefixes of a longer match are
+    reported too; when an occurrence can start inside another one, the regex
+    is tried at every position inside a lookahead. Hits are reported under
+    their term, so "biases" counts as "bias" when lemmas are on.
+    `word_boundary` only accepts hits between non-word characters.
+    """
+
+    def __init__(self, terms=None, word_boundary=None, lemmas=None, ignore_case=True):
+        terms = [terms] if isinstance(terms, str) else terms or TERMS
+        self.terms = list(dict.fromkeys(term.lower() for term in terms))
+        self.word_boundary = WORD_BOUNDARY if word_boundary is None else word_boundary
+        self.lemmas = LEMMAS if lemmas is None else lemmas
+        self.forms = {}  # surface form -> term
+        for term in self.terms:
+            for form in inflections(term) if self.lemmas else [term]:
+                self.forms.setdefault(form, term)
+        # form -> [(length, term)] of the forms it starts with, itself included
+        self.prefixes = {
+            form: sorted((len(other), term) for other, term in self.forms.items() if form.startswith(other))
+            for form in self.forms
+        }
+        self.overlapping = any(
+            other.startswith(form[k:]) or form[k:].startswith(other)
+            for form in self.forms for k in range(1, len(form)) for other in self.forms
+        )
+
+        pattern = f"({_trie_pattern(self.forms)})"
+        if self.word_boundary:
+            pattern = rf"(?<!\w){pattern}(?!\w)"
+        if self.overlapping:
+            pattern = f"(?={pattern})"
+        self.regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+
+    @property
+    def signature(self):
+        """Identifies what this matcher finds, e.g. to invalidate outputs built with other settings."""
+        return {"terms": self.terms, "word_boundary": self.word_boundary, "lemmas": self.lemmas}
+
+    def forms_of(self, term):
+        return {form for form, t in self.forms.items() if t == term}
+
+    def finditer(self, text):
+        """Yield (start, end, term) for every occurrence, in order of start; each term once per start."""
+        for match in self.regex.finditer(text):
+            start = match.start(1)
+            ends = {}
+            for length, term in self.prefixes.get(match.group(1).lower(), ()):
+                end = start + length
+                if self.word_boundary and end < len(text) and _WORD_CHAR.match(text, end):
+                    continue
+                ends[term] = end
+            for term, end in ends.items():
+                yield start, end, term
+
+    def count(self, text):
+        """Counter of term -> occurrences in `text`."""
+        if self.word_boundary or any(len(prefixes) > 1 for prefixes in self.prefixes.values()):
+            return Counter(term for _, _, term in self.finditer(text))
+        # no form starts with another: one hit per match
+        return Counter(filter(None, (self.forms.get(form.lower()) for form in self.regex.findall(text))))
+
+    def terms_in(self, text):
+        """The terms occurring in `text`, in term-list order."""
+        found = {term for _, _, term in self.finditer(text)}
+        return [term for term in self.terms if term in found]
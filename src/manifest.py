@@ -0,0 +1,53 @@
+"""File manifests (size, mtime, content hash) for incremental reruns"""
+import hashlib
+import json
+import os
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of the file content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    """Return {filename: {"size", "mtime", "sha256"}}, or {} if there is no manifest yet."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, entries):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def scan(directory, filenames, manifest):
+    """Compare files against a manifest.
+
+    Files whose size and mtime are unchanged are trusted without reading them;
+    the others are hashed and only count as changed if their content differs.
+    Returns (entries, changed, removed): the new manifest, the new or modified
+    filenames, and the manifest filenames that no longer exist.
+    """
+    entries, changed = {}, []
+    for name in filenames:
+        st = os.stat(os.path.join(directory, name))
+        old = manifest.get(name)
+        if old and old["size"] == st.st_size and old["mtime"] == st.st_mtime:
+            entries[name] = old
+            continue
+        digest = file_hash(os.path.join(directory, name))
+        entries[name] = {"size": st.st_size, "mtime": st.st_mtime, "sha256": digest}
+        if not old or old["sha256"] != digest:
+            changed.append(name)
+    removed = [name for name in manifest if name not in entries]
+    return entries, changed, removed
@@ -0,0 +1,19 @@
+"""Download NLTK data only when it is not installed yet"""
+import nltk
+
+# nltk.download() id -> nltk.data.find() path
+RESOURCE_PATHS = {
+    "stopwords": "corpora/stopwords",
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+    "averaged_perceptron_tagger_eng": "taggers/averaged_perceptron_tagger_eng",
+}
+
+
+def ensure(*resources):
+    """nltk.download() each resource that nltk.data.find() cannot locate."""
+    for resource in resources:
+        try:
+            nltk.data.find(RESOURCE_PATHS.get(resource, resource))
+        except LookupError:
+            nltk.download(resource, quiet=True)
@@ -0,0 +1,250 @@
+"""Run the analysis stages as a dependency graph: python -m src.pipeline
+
+Inputs are loaded once per branch and shared by the stages that use them,
+stages whose outputs are newer than their inputs are skipped, and branches
+that share no input (the text branch and the AMR branch) run concurrently,
+each in its own process. With --headless (or "headless" in config.json)
+stages write their numbers to the results directory and build no figures.
+"""
+import argparse
+import ast
+import functools
+import importlib
+import multiprocessing
+import os
+import sys
+import time
+
+from src.config import cfg, CONFIG_PATH
+from src.lexicon import TERMS, slug
+from src.manifest import load_manifest, save_manifest
+from src.results import HEADLESS, results_path
+from src.sentence_store import pos_tags_path, sentences_path
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = getattr(cfg, "cache_dir", os.path.join("data", "cache"))
+
+
+def load_text_corpus():
+    from src.corpus import load_corpus
+    return load_corpus(cfg.txt_path)
+
+
+def load_sentences():
+    # None lets the stage read the corpus in chunks; only a CSV is handed over in memory
+    return None
+
+
+def load_amr_corpus():
+    from src.amr_arrays import load_amr_corpus
+    return load_amr_corpus(cfg.amr_path)
+
+
+# Shared inputs, loaded on first use unless a stage of the same run produced them
+ARTIFACTS = {
+    "corpus": load_text_corpus,
+    "sentences": load_sentences,
+    "amr_corpus": load_amr_corpus,
+}
+
+
+class Stage:
+    """A module's main(), the artifacts it is called with and the files it reads and writes.
+
+    `figures` are only written by normal runs; stages with `results` write
+    results/<name>.json instead when headless. `options` are keyword
+    arguments of main(), e.g. asking it to return what it `provides`.
+    """
+
+    def __init__(self, name, uses=(), provides=None, inputs=(), outputs=(), figures=(), results=True,
+                 default=True, options=None):
+        self.name = name
+        self.uses = list(uses)
+        self.provides = provides
+        self.options = dict(options or {})
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.figures = list(figures)
+        self.results = results
+        self.default = default
+
+    @property
+    def artifacts(self):
+        return set(self.uses) | ({self.provides} if self.provides else set())
+
+    @property
+    def shared(self):
+        """What ties the stage to others of its branch: its artifacts and its input files."""
+        return self.artifacts | set(self.inputs)
+
+    def expected_outputs(self, headless=False):
+        if not self.results:
+            return self.outputs
+        return self.outputs + ([results_path(self.name)] if headless else self.figures)
+
+    def run(self, artifacts, headless=False):
+        main = importlib.import_module(f"src.{self.name}").main
+        options = dict(self.options, **({"headless": headless} if self.results else {}))
+        return main(*[artifacts[name] for name in self.uses], **options)
+
+
+STAGES = [
+    Stage("create_csv_sentence", uses=["corpus"], provides="sentences", options={"keep_rows": True},
+          inputs=[cfg.txt_path], outputs=[sentences_path()], results=False),
+    Stage("bias_exploration", uses=["corpus"],
+          inputs=[cfg.txt_path], figures=[os.path.join("data", f"{slug(t)}_analysis_subplots.png") for t in TERMS]),
+    Stage("data_exploration", uses=["corpus"],
+          inputs=[cfg.txt_path], figures=[os.path.join("data", "word_frequency.png")]),
+    Stage("bias_pos_tag", uses=["sentences"],
+          inputs=[sentences_path()], outputs=[pos_tags_path()], figures=[f"figures/{slug(t)}_pos_visualization.png" for t in TERMS]),
+    # the two summary stages read the AMR file themselves, to only decode graphs appended since their last run
+    Stage("bias_amr",
+          inputs=[cfg.amr_path], figures=["figures/hist_concept.png"] + [f"figures/{slug(t)}_amr.png" for t in TERMS]),
+    Stage("bias_position_in_graph",
+          inputs=[cfg.amr_path], figures=[f"figures/relations_{way}_{slug(t)}.png" for t in TERMS for way in ("to", "from")]),
+    Stage("amr_embed", uses=["amr_corpus"], inputs=[cfg.amr_path], default=False),
+]
+
+
+def newest_mtime(paths):
+    """Latest modification time of the given files, or of given directories and the files directly inside.
+
+    A directory's own mtime changes when a file is added, deleted or renamed.
+    """
+    newest = 0.0
+    for path in paths:
+        if os.path.isdir(path):
+            newest = max(newest, os.path.getmtime(path))
+            for entry in os.scandir(path):
+                if entry.is_file():
+                    newest = max(newest, entry.stat().st_mtime)
+        elif os.path.exists(path):
+            newest = max(newest, os.path.getmtime(path))
+    return newest
+
+
+def input_listing(paths):
+    """{directory: sorted names of the files directly inside} for the directories among `paths`."""
+    return {
+        path: sorted(entry.name for entry in os.scandir(path) if entry.is_file())
+        for path in paths if os.path.isdir(path)
+    }
+
+
+def listing_path(stage, headless=False):
+    """Where the input listing of the stage's last run in this mode is kept."""
+    return os.path.join(CACHE_DIR, "pipeline", f"{stage.name}{'.headless' if headless else ''}.inputs.json")
+
+
+@functools.lru_cache(maxsize=None)
+def source_files(module):
+    """The file of src.<module> and of every src module it imports, directly or not, at any depth."""
+    files = set()
+    pending = [module]
+    while pending:
+        path = os.path.join(SRC_DIR, *pending.pop().split(".")) + ".py"
+        if path in files or not os.path.exists(path):
+            continue
+        files.add(path)
+        with open(path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module == "src":
+                pending.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and node.module.startswith("src."):
+                pending.append(node.module[len("src."):])
+            elif isinstance(node, ast.Import):
+                pending.extend(alias.name[len("src."):] for alias in node.names if alias.name.startswith("src."))
+    return sorted(files)
+
+
+def is_up_to_date(stage, headless=False):
+    """True when every output exists and is newer than the inputs, the code the stage runs and the config,
+    and the input directories hold the files they held at the stage's last run.
+    """
+    outputs = stage.expected_outputs(headless)
+    if not outputs or not all(os.path.exists(path) for path in outputs):
+        return False
+    sources = stage.inputs + source_files(stage.name) + [CONFIG_PATH]
+    if min(os.path.getmtime(path) for path in outputs) < newest_mtime(sources):
+        return False
+    return load_manifest(listing_path(stage, headless)) == input_listing(stage.inputs)
+
+
+def branches(stages):
+    """Split stages into groups that share no artifact or input, keeping stage order inside each group."""
+    groups = []
+    for stage in stages:
+        linked = [group for group in groups if any(stage.shared & s.shared for s in group)]
+        merged = [s for group in linked for s in group] + [stage]
+        groups = [group for group in groups if group not in linked] + [merged]
+    order = {stage.name: i for i, stage in enumerate(stages)}
+    return [sorted(group, key=lambda s: order[s.name]) for group in groups]
+
+
+def report(message):
+    """One write per line, so the lines of concurrent branches do not run together."""
+    sys.stdout.write(f"[pipeline] {message}\n")
+    sys.stdout.flush()
+
+
+def run_branch(stages, force=False, headless=False):
+    artifacts = {}
+    for stage in stages:
+        if not force and is_up_to_date(stage, headless):
+            report(f"{stage.name}: up to date, skipped")
+            continue
+        for name in stage.uses:
+            if name not in artifacts:
+                artifacts[name] = ARTIFACTS[name]()
+        start = time.perf_counter()
+        listing = input_listing(stage.inputs)
+        result = stage.run(artifacts, headless)
+        save_manifest(listing_path(stage, headless), listing)
+        if stage.provides:
+            artifacts[stage.provides] = result
+        report(f"{stage.name}: done in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the CHAI-bias analysis pipeline.")
+    parser.add_argument("--stages", help="comma-separated stage names (default: all but amr_embed)")
+    parser.add_argument("--force", action="store_true", help="run stages even if their outputs are up to date")
+    parser.add_argument("--serial", action="store_true", help="run independent branches one after the other")
+    parser.add_argument("--headless", action=argparse.BooleanOptionalAction, default=HEADLESS,
+                        help="write numeric results as JSON instead of figures (default: config.json)")
+    args = parser.parse_args()
+
+    if args.stages:
+        names = args.stages.split(",")
+        unknown = set(names) - {stage.name for stage in STAGES}
+        if unknown:
+            parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+        selected = [stage for stage in STAGES if stage.name in names]
+    else:
+        selected = [stage for stage in STAGES if stage.default]
+
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    if not args.headless:
+        os.makedirs("figures", exist_ok=True)
+    groups = branches(selected)
+    if args.serial or len(groups) == 1:
+        for group in groups:
+            run_branch(group, args.force, args.headless)
+        return
+
+    processes = [
+        multiprocessing.Process(target=run_branch, args=(group, args.force, args.headless))
+        for group in groups
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    failed = [group[0].name for group, process in zip(groups, processes) if process.exitcode != 0]
+    if failed:
+        raise SystemExit(f"[pipeline] branch starting at {', '.join(failed)} failed")
+
+
+if __name__ == "__main__":
+    main()
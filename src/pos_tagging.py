@@ -0,0 +1,104 @@
+"""Batched, parallel POS tagging with a persistent cache keyed by sentence hash"""
+import hashlib
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+import nltk
+from nltk.tokenize import word_tokenize
+
+from src.config import cfg
+from src.instrument import measure
+
+CACHE_DIR = getattr(cfg, "cache_dir", os.path.join("data", "cache"))
+WORKERS = getattr(cfg, "workers", None) or os.cpu_count() or 1
+CHUNK_SIZE = 512  # sentences per worker task
+
+
+def sentence_key(sentence):
+    """Cache key: the sentence and the NLTK version whose tokenizer and tagger produced the tags."""
+    return hashlib.sha1(f"{nltk.__version__}\0{sentence}".encode("utf-8")).hexdigest()
+
+
+def tag_sentences(sentences):
+    """word_tokenize then pos_tag_sents over a chunk of sentences."""
+    return nltk.pos_tag_sents([word_tokenize(s) for s in sentences])
+
+
+def find_tag(tagged, word="bias"):
+    """POS tag of the first token equal to `word` (case-insensitive), or to one of a set of forms; None if absent."""
+    forms = {word} if isinstance(word, str) else word
+    for token, tag in tagged:
+        if token.lower() in forms:
+            return tag
+    return None
+
+
+class TagCache:
+    """SQLite table of sentence hash -> JSON list of (token, tag)."""
+
+    def __init__(self, path=None):
+        path = path or os.path.join(CACHE_DIR, "pos_tags.sqlite")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS pos_tags (key TEXT PRIMARY KEY, tags TEXT NOT NULL)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get_many(self, keys, batch_size=500):
+        """Yield (key, tagged) for the keys that are cached."""
+        keys = list(keys)
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            query = f"SELECT key, tags FROM pos_tags WHERE key IN ({','.join('?' * len(batch))})"
+            for key, tags in self.db.execute(query, batch):
+                yield key, [tuple(pair) for pair in json.loads(tags)]
+
+    def put_many(self, items):
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO pos_tags (key, tags) VALUES (?, ?)",
+                ((key, json.dumps(tagged)) for key, tagged in items),
+            )
+
+    def close(self):
+        self.db.close()
+
+
+def tag_word(sentences, word="bias", workers=WORKERS, cache=None, pool=None):
+    """POS tag of `word` in each sentence, tagging every distinct uncached sentence once.
+
+    `word` may also be a list giving the word (or set of forms) to look up in
+    each sentence, so the sentences of several terms are tagged in one batch.
+    Sentences are tagged with pos_tag_sents in chunks spread over a process
+    pool; results go into the cache so reruns and repeated sentences are free.
+    Callers tagging several batches pass their own `cache` and `pool`, which
+    are then left open; otherwise both are opened and closed here.
+    """
+    words = [word] * len(sentences) if isinstance(word, (str, set, frozenset)) else list(word)
+    keys = [sentence_key(s) for s in sentences]
+    unique = dict(zip(keys, sentences))
+
+    with ExitStack() as stack:
+        if cache is None:
+            cache = stack.enter_context(TagCache())
+        tagged_by_key = dict(cache.get_many(unique))
+        missing = [key for key in unique if key not in tagged_by_key]
+
+        if missing:
+            chunks = [missing[i:i + CHUNK_SIZE] for i in range(0, len(missing), CHUNK_SIZE)]
+            texts = ([unique[key] for key in chunk] for chunk in chunks)
+            if pool is None:
+                pool = stack.enter_context(ProcessPoolExecutor(max(1, min(workers, len(chunks)))))
+            with measure("pos_tagging", items=len(missing)):
+                for chunk, tagged_chunk in zip(chunks, pool.map(tag_sentences, texts)):
+                    cache.put_many(zip(chunk, tagged_chunk))
+                    tagged_by_key.update(zip(chunk, tagged_chunk))
+
+    return [find_tag(tagged_by_key[key], w) for key, w in zip(keys, words)]
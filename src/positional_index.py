@@ -0,0 +1,102 @@
+"""Positional index of the terms over the text corpus, built from a single read of each document"""
+import math
+import string
+import unicodedata
+from collections import Counter
+
+from src.lexicon import TermMatcher
+
+
+class PositionalIndex:
+    """Per-document term counts, token arrays and offsets of the tokens equal to each term.
+
+    Two tokenizations are kept, as in the original analysis: plain lowercased
+    tokens for collocations and NFKC-normalized tokens for context words.
+    Token arrays are only stored for documents where a term occurs. Every
+    term is counted in the same scan of the text, and found in the same pass
+    over its tokens; multi-word terms match runs of tokens.
+    """
+
+    def __init__(self, terms=None, word_boundary=None, lemmas=None):
+        self.matcher = TermMatcher(terms, word_boundary, lemmas, ignore_case=False)
+        self.terms = self.matcher.terms
+        self.term = self.terms[0]
+        # first token -> [(tokens of a form, term)]
+        self.token_forms = {}
+        for form, term in self.matcher.forms.items():
+            tokens = tuple(form.split())
+            self.token_forms.setdefault(tokens[0], []).append((tokens, term))
+        self.lengths = {term: len(term.split()) for term in self.terms}
+        self.counts = {term: {} for term in self.terms}     # term -> filename -> occurrences in the lowercased text
+        self.words = {}                                     # filename -> punctuation-stripped tokens
+        self.hits = {term: {} for term in self.terms}       # term -> filename -> offsets in words
+        self.norm_words = {}                                # filename -> NFKC tokens, also stripped of bullets
+        self.norm_hits = {term: {} for term in self.terms}  # term -> filename -> offsets in norm_words
+
+    def _token_hits(self, words):
+        """term -> offsets of the token runs equal to one of its forms."""
+        hits = {}
+        for i, w in enumerate(words):
+            for tokens, term in self.token_forms.get(w, ()):
+                if len(tokens) == 1 or tuple(words[i:i + len(tokens)]) == tokens:
+                    offsets = hits.setdefault(term, [])
+                    if not offsets or offsets[-1] != i:
+                        offsets.append(i)
+        return hits
+
+    def add(self, filename, text):
+        text = text.lower()
+        counts = self.matcher.count(text)
+        for term in self.terms:
+            self.counts[term][filename] = counts[term]
+        if counts:
+            words = [w.strip(string.punctuation) for w in text.split()]
+            hits = self._token_hits(words)
+            if hits:
+                self.words[filename] = words
+                for term, offsets in hits.items():
+                    self.hits[term][filename] = offsets
+
+        text = unicodedata.normalize("NFKC", text)
+        if any(form in text for form in self.matcher.forms):
+            words = [w.strip(string.punctuation + "•") for w in text.split()]
+            hits = self._token_hits(words)
+            if hits:
+                self.norm_words[filename] = words
+                for term, offsets in hits.items():
+                    self.norm_hits[term][filename] = offsets
+
+    def top_documents(self, fraction=0.1, term=None):
+        """Documents with the most occurrences of `term`, the top `fraction` of the corpus (at least one)."""
+        sorted_docs = sorted(self.counts[term or self.term].items(), key=lambda x: x[1], reverse=True)
+        if not sorted_docs:
+            return []
+        top_n = max(1, math.ceil(len(sorted_docs) * fraction))
+        return sorted_docs[:top_n]
+
+    def collocations(self, docs, window=5, term=None):
+        """Counter of "<word> term" and "term <word>" bigrams, using the nearest word within `window`."""
+        term = term or self.term
+        length = self.lengths[term]
+        ngrams = Counter()
+        for doc in docs:
+            words = self.words.get(doc, ())
+            for i in self.hits[term].get(doc, ()):
+                left = [w for w in words[max(0, i - window):i] if w]
+                right = [w for w in words[i + length:i + length + window] if w]
+                if left:
+                    ngrams[f"{left[-1]} {term}"] += 1
+                if right:
+                    ngrams[f"{term} {right[0]}"] += 1
+        return ngrams
+
+    def context_words(self, docs, window=5, term=None):
+        """NFKC tokens within `window` positions of each occurrence, in document order."""
+        term = term or self.term
+        length = self.lengths[term]
+        context = []
+        for doc in docs:
+            words = self.norm_words.get(doc, ())
+            for i in self.norm_hits[term].get(doc, ()):
+                context.extend(words[max(0, i - window):i] + words[i + length:i + length + window])
+        return context
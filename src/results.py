@@ -0,0 +1,21 @@
+"""Numeric results as JSON, written instead of figures in headless mode"""
+import json
+import os
+
+from src.config import cfg
+
+HEADLESS = getattr(cfg, "headless", False)
+RESULTS_DIR = getattr(cfg, "results_dir", os.path.join("data", "results"))
+
+
+def results_path(name):
+    return os.path.join(RESULTS_DIR, f"{name}.json")
+
+
+def write_results(name, results):
+    """Write `results` to RESULTS_DIR/<name>.json and return the path."""
+    path = results_path(name)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    return path
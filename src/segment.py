@@ -0,0 +1,75 @@
+"""Sentence segmentation, either over whole documents or only around term hits"""
+import re
+from functools import lru_cache
+
+from nltk.tokenize.punkt import PunktTokenizer
+
+HIT_WINDOW = 1000  # characters segmented on each side of a hit, doubled until the sentence fits
+WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=None)
+def punkt_tokenizer(language="english"):
+    """The tokenizer behind nltk.sent_tokenize, loaded once per process."""
+    return PunktTokenizer(language)
+
+
+def sentence_spans(text, language="english"):
+    """(start, end) of every sentence, exactly as nltk.sent_tokenize splits them."""
+    return list(punkt_tokenizer(language).span_tokenize(text))
+
+
+def _enclosing_span(text, pos, tokenizer, window):
+    """Span of the sentence containing `pos`, segmenting as little text as possible.
+
+    Punkt decides each boundary from the word before the punctuation and the
+    token after it. In a window cut on whitespace, every boundary after the
+    first one and before the last token of the window is therefore the one
+    full-document segmentation would find. The window grows until the hit's
+    sentence lies between such boundaries, or reaches the edges of the text.
+    """
+    while True:
+        start = max(0, pos - window)
+        end = min(len(text), pos + window)
+        if start > 0:
+            ws = WHITESPACE.search(text, start, pos)
+            if ws is None:
+                window *= 2
+                continue
+            start = ws.end()
+        last_token = end  # start of the window's last token, which lacks its right context
+        if end < len(text):
+            while end > pos and not text[end - 1].isspace():
+                end -= 1
+            last_token = end
+            while last_token > start and text[last_token - 1].isspace():
+                last_token -= 1
+            while last_token > start and not text[last_token - 1].isspace():
+                last_token -= 1
+
+        for k, (s, e) in enumerate(tokenizer.span_tokenize(text[start:end])):
+            if start + s <= pos < start + e:
+                if (k > 0 or start == 0) and start + e <= last_token:
+                    return start + s, start + e
+                break
+        else:
+            if start == 0 and end == len(text):
+                return None
+        window *= 2
+
+
+def hit_sentence_spans(text, pattern, language="english", window=HIT_WINDOW):
+    """Spans of the sentences containing a match of `pattern`, in document order.
+
+    Only a bounded window around each hit is segmented, so the cost depends on
+    the number of hits rather than on the length of the document.
+    """
+    tokenizer = punkt_tokenizer(language)
+    spans = []
+    for match in pattern.finditer(text):
+        if spans and match.start() < spans[-1][1]:
+            continue  # already inside the previous hit's sentence
+        span = _enclosing_span(text, match.start(), tokenizer, window)
+        if span is not None:
+            spans.append(span)
+    return spans
@@ -0,0 +1,174 @@
+"""Sentence corpus on disk: quoted CSV, or typed Parquet written and read in row groups
+
+pandas and pyarrow are only imported when a corpus is read or written, so
+the pipeline runner can ask for the path without loading them.
+"""
+import os
+
+from src.config import cfg
+from src.instrument import measure
+
+# "csv": the quoted bias-MapAIE.csv; "parquet": typed columns next to it, same name with .parquet
+FORMAT = getattr(cfg, "sentence_format", "csv")
+ROW_GROUP_ROWS = getattr(cfg, "sentence_row_group_rows", 65536)
+ALL_COLUMNS = ["doc_id", "sentence", "term", "start", "end"]  # start/end: offsets of the sentence in its document
+# "term", "start" and "end" are opt-in, so the default corpus keeps the columns it always had
+EXTRA_COLUMNS = list(getattr(cfg, "sentence_extra_columns", None) or [])
+COLUMNS = [column for column in ALL_COLUMNS if column in ["doc_id", "sentence"] + EXTRA_COLUMNS]
+
+
+def sentences_path(fmt=None):
+    """Where the sentence corpus of format `fmt` (default cfg.sentence_format) lives."""
+    fmt = fmt or FORMAT
+    if fmt == "parquet":
+        return os.path.splitext(cfg.MapAIE_csv_path)[0] + ".parquet"
+    if fmt == "csv":
+        return cfg.MapAIE_csv_path
+    raise ValueError(f"Unknown sentence format: {fmt!r} (expected 'csv' or 'parquet')")
+
+
+def pos_tags_path(fmt=None):
+    """Where bias_pos_tag writes the POS tags of each row of the sentence corpus, in the same format."""
+    root, ext = os.path.splitext(sentences_path(fmt))
+    return root + ".pos" + ext
+
+
+def is_parquet(path):
+    return path.endswith(".parquet")
+
+
+def doc_key(doc_id):
+    """doc_id as an integer, or None when the filename had no digits, whatever format it was read from."""
+    if isinstance(doc_id, str):
+        return int(doc_id) if doc_id else None
+    try:
+        return int(doc_id)
+    except (TypeError, ValueError):  # None, NaN or pd.NA
+        return None
+
+
+def _schema(columns):
+    import pyarrow as pa
+    types = {"doc_id": pa.int64(), "sentence": pa.string(), "term": pa.string(), "start": pa.int64(), "end": pa.int64()}
+    return pa.schema([(column, types.get(column, pa.string())) for column in columns])
+
+
+def _nullable_integers(arrow_type):
+    import pandas as pd
+    import pyarrow as pa
+    return pd.Int64Dtype() if pa.types.is_int64(arrow_type) else None
+
+
+class SentenceWriter:
+    """Write sentence rows in batches to a temporary file that replaces `path` on close.
+
+    Parquet rows are buffered into row groups of `row_group_rows`, so the
+    whole corpus is never held in memory; CSV rows are appended with the
+    quoting and escaping the CSV always had. If the block raises, the
+    previous file is left untouched. Other `columns` than the corpus ones
+    are written as strings, for files with one row per corpus row.
+    """
+
+    def __init__(self, path=None, row_group_rows=ROW_GROUP_ROWS, columns=None):
+        unknown = set(EXTRA_COLUMNS) - set(ALL_COLUMNS[2:])
+        if unknown:
+            raise ValueError(f"Unknown sentence_extra_columns: {sorted(unknown)} (expected 'term', 'start' or 'end')")
+        self.path = path or sentences_path()
+        self.tmp_path = self.path + ".tmp"
+        self.row_group_rows = row_group_rows
+        self.columns = columns or COLUMNS
+        self.rows = 0
+        self._buffer = []
+        self._writer = None
+        import pandas as pd
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if is_parquet(self.path):
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(self.tmp_path, _schema(self.columns), compression="zstd")
+        else:
+            pd.DataFrame(columns=self.columns).to_csv(self.tmp_path, index=False, quoting=1, encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, rows):
+        self._buffer.extend(rows)
+        self.rows += len(rows)
+        if len(self._buffer) >= self.row_group_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        import pandas as pd
+        with measure("write_sentences", items=len(self._buffer)):
+            self._write(pd.DataFrame(self._buffer, columns=self.columns))
+        self._buffer = []
+
+    def _write(self, df):
+        if self._writer is not None:
+            import pyarrow as pa
+            if "doc_id" in df:
+                df["doc_id"] = [doc_key(doc_id) for doc_id in df["doc_id"]]
+            self._writer.write_table(pa.Table.from_pandas(df, schema=_schema(self.columns), preserve_index=False))
+        else:
+            df.to_csv(
+                self.tmp_path,
+                mode="a",
+                header=False,
+                index=False,
+                quoting=1,
+                escapechar="\\", # escape special characters
+                encoding="utf-8"
+            )
+
+    def close(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def available_columns(path=None):
+    path = path or sentences_path()
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    import pandas as pd
+    return list(pd.read_csv(path, nrows=0, escapechar="\\").columns)
+
+
+def iter_sentences(path=None, columns=None, chunk_rows=ROW_GROUP_ROWS, raw=False):
+    """Yield the sentence corpus as DataFrames of at most `chunk_rows` rows.
+
+    Parquet files are memory-mapped and read batch by batch; CSV files are
+    parsed `chunk_rows` rows at a time. `columns` that the file lacks (e.g.
+    "term" in a CSV written before term lists) are left out. `raw` reads CSV
+    values as the exact strings written, for rewriting them.
+    """
+    path = path or sentences_path()
+    if columns is not None:
+        present = set(available_columns(path))
+        columns = [column for column in columns if column in present]
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path, memory_map=True)
+        # nullable Int64 keeps doc_id an integer column when some documents have no number
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas(types_mapper=_nullable_integers)
+        return
+    import pandas as pd
+    options = {"dtype": str, "keep_default_na": False} if raw else {}
+    yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows, escapechar="\\", encoding="utf-8", **options)
@@ -0,0 +1,181 @@
+"""Fixed-memory approximate word counts: a Count-Min sketch plus a Space-Saving top-k
+
+Counting with `"word_counting": "sketch"` keeps memory flat however long the
+vocabulary's tail is. With N the total count, a width w and a depth d:
+
+- the Count-Min table never underestimates a count, and overestimates it by
+  more than (e / w) * N with probability at most e ** -d;
+- the Space-Saving summary of k counters keeps every word that occurs more
+  than N / k times, with a count that overestimates it by at most N / k.
+
+Reported counts are the smaller of the two upper bounds. Both parts merge
+exactly (tables add up, summaries combine their counters), so worker
+processes can each count a share of the corpus and send back one sketch.
+"""
+import hashlib
+import heapq
+import math
+from collections import Counter
+from collections.abc import Mapping
+
+import numpy as np
+
+from src.config import cfg
+
+COUNTING = getattr(cfg, "word_counting", "exact")  # "exact": a Counter; "sketch": a FrequencySketch
+MEMORY_MB = getattr(cfg, "sketch_memory_mb", 16)      # size of the Count-Min table
+DEPTH = getattr(cfg, "sketch_depth", 5)
+CAPACITY = getattr(cfg, "sketch_capacity", 2000)      # Space-Saving counters
+BATCH = 1 << 16  # distinct words buffered before they are hashed into the table
+
+
+def make_counter(mode=None):
+    """An empty Counter, or a FrequencySketch in sketch mode; both take update() and most_common()."""
+    mode = mode or COUNTING
+    if mode == "sketch":
+        return FrequencySketch()
+    if mode == "exact":
+        return Counter()
+    raise ValueError(f"Unknown word counting mode: {mode!r} (expected 'exact' or 'sketch')")
+
+
+def _hashes(words):
+    """Two 32-bit hashes of each word, the same in every process (unlike hash())."""
+    digests = b"".join(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest() for w in words)
+    h = np.frombuffer(digests, dtype="<u8") if words else np.empty(0, dtype=np.uint64)
+    return h & 0xFFFFFFFF, (h >> np.uint64(32)) | np.uint64(1)
+
+
+class FrequencySketch:
+    """Approximate counts of a stream of words in about `memory_mb` MB plus `capacity` counters."""
+
+    def __init__(self, memory_mb=MEMORY_MB, depth=DEPTH, capacity=CAPACITY):
+        self.depth = depth
+        self.width = max(1, int(memory_mb * (1 << 20)) // (8 * depth))
+        self.capacity = capacity
+        self.table = np.zeros((depth, self.width), dtype=np.int64)
+        self.total = 0
+        self.counts = {}  # Space-Saving: word -> [count, error], at most `capacity` words
+        self._heap = []   # (count, word), with stale entries skipped when popped
+        self._pending = Counter()
+
+    @property
+    def epsilon(self):
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        return math.exp(-self.depth)
+
+    def describe(self):
+        self._flush()
+        return (f"Count-Min {self.depth}x{self.width}: counts at most {self.epsilon * self.total:.0f} too high "
+                f"with probability {1 - self.delta:.3f}; every word above {self.total / self.capacity:.0f} "
+                f"occurrences is kept")
+
+    def update(self, words):
+        """Add a mapping of word -> count, or an iterable of words, like Counter.update."""
+        if isinstance(words, Mapping):
+            self._pending.update(words)
+            if len(self._pending) >= BATCH:
+                self._flush()
+            return
+        batch = []
+        for word in words:
+            batch.append(word)
+            if len(batch) >= BATCH:
+                self.update(Counter(batch))
+                batch = []
+        self.update(Counter(batch))
+
+    def _columns(self, words):
+        h1, h2 = _hashes(words)
+        return [((h1 + np.uint64(i) * h2) % np.uint64(self.width)).astype(np.int64) for i in range(self.depth)]
+
+    def _flush(self):
+        if not self._pending:
+            return
+        words, counts = list(self._pending), np.fromiter(self._pending.values(), dtype=np.int64)
+        for row, columns in zip(self.table, self._columns(words)):
+            np.add.at(row, columns, counts)
+        self.total += int(counts.sum())
+        for word, count in self._pending.items():
+            self._offer(word, count)
+        self._pending = Counter()
+
+    def _offer(self, word, count):
+        """Space-Saving: add to a counted word, or let it take over the smallest counter when all are in use."""
+        entry = self.counts.get(word)
+        if entry is not None:
+            entry[0] += count
+        elif len(self.counts) < self.capacity:
+            entry = self.counts[word] = [count, 0]
+        else:
+            floor, victim = self._pop_min()
+            del self.counts[victim]
+            entry = self.counts[word] = [floor + count, floor]
+        heapq.heappush(self._heap, (entry[0], word))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, w) for w, (c, _) in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while True:
+            count, word = heapq.heappop(self._heap)
+            entry = self.counts.get(word)
+            if entry is not None and entry[0] == count:
+                return count, word
+
+    def _floor(self):
+        """Upper bound on the count of any word the summary does not hold."""
+        return min(c for c, _ in self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def estimate(self, words):
+        """Count-Min estimates of `words`, as an int64 array."""
+        self._flush()
+        if not words:
+            return np.empty(0, dtype=np.int64)
+        return np.min([row[columns] for row, columns in zip(self.table, self._columns(words))], axis=0)
+
+    def merge(self, other):
+        """Fold in a sketch of the same size built over another part of the stream."""
+        if (self.depth, self.width) != (other.depth, other.width):
+            raise ValueError("Cannot merge Count-Min sketches of different sizes")
+        self._flush()
+        other._flush()
+        self.table += other.table
+        self.total += other.total
+        # a word missing from one summary occurred at most that summary's floor times there
+        own_floor, other_floor = self._floor(), other._floor()
+        merged = {word: [c + other_floor, e + other_floor] for word, (c, e) in self.counts.items()}
+        for word, (c, e) in other.counts.items():
+            if word in merged:
+                merged[word][0] += c - other_floor
+                merged[word][1] += e - other_floor
+            else:
+                merged[word] = [c + own_floor, e + own_floor]
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1][0])
+        self.counts = dict(kept)
+        self._heap = [(c, w) for w, (c, _) in self.counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def most_common(self, n=None):
+        """[(word, count)] of the heaviest candidate words, by decreasing count, then word."""
+        self._flush()
+        words = list(self.counts)
+        sketched = self.estimate(words)
+        counts = [min(int(s), self.counts[w][0]) for w, s in zip(words, sketched)]
+        ranked = sorted(zip(words, counts), key=lambda item: (-item[1], item[0]))
+        return ranked if n is None else ranked[:n]
+
+    def __getstate__(self):
+        self._flush()
+        state = self.__dict__.copy()
+        state["_heap"] = None  # rebuilt from the counters on load
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._heap = [(c, w) for w, (c, _) in self.counts.items()]
+        heapq.heapify(self._heap)
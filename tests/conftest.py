@@ -0,0 +1,46 @@
+"""Shared setup: a scratch cache, and stages run in a fresh process with config overrides
+
+The stage modules read the config at import time, so it is pointed at a
+scratch cache before any of them is imported, as benchmarks.stage does.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+from src.config import cfg
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRATCH = tempfile.mkdtemp(prefix="chai-tests-")
+cfg.cache_dir = os.path.join(SCRATCH, "cache")
+cfg.workers = 2
+
+# Applies the overrides to cfg, then imports the stage and runs its main()
+_RUNNER = """
+import importlib, json, sys
+from src.config import Config, cfg
+vars(cfg).update(vars(Config(json.loads(sys.argv[1]))))
+importlib.import_module(sys.argv[2]).main()
+"""
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(SCRATCH, ignore_errors=True)
+
+
+@pytest.fixture
+def run_stage(tmp_path):
+    """Run src.<stage> in tmp_path with `config` overriding config.json; returns its stdout."""
+    def run(stage, **config):
+        config.setdefault("cache_dir", str(tmp_path / "cache"))
+        config.setdefault("log_level", "warning")
+        env = dict(os.environ, PYTHONPATH=ROOT, MPLBACKEND="Agg")
+        done = subprocess.run([sys.executable, "-c", _RUNNER, json.dumps(config), f"src.{stage}"],
+                              cwd=tmp_path, env=env, capture_output=True, text=True)
+        assert done.returncode == 0, done.stderr
+        return done.stdout
+    return run
@@ -0,0 +1,82 @@
+"""Graph/sentence alignment: the hashed join against comparing every graph with every row"""
+import random
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_amr
+from src.alignment import SentenceAlignment, normalize
+from src.amr_loader import iter_records
+
+
+@pytest.fixture
+def files(tmp_path):
+    amr_path = tmp_path / "aligned.amr"
+    write_amr(str(amr_path), 120, seed=6)
+    with open(amr_path, "a", encoding="utf-8") as f:
+        f.write("# ::id no_snt\n(n / nothing)\n\n# ::id empty_snt\n# ::snt ...\n(e / empty)\n\n")
+    snts = [metadata.get("snt") for _, _, metadata in iter_records(str(amr_path), workers=1)]
+
+    rng = random.Random(6)
+    rows = []
+    for _ in range(400):
+        pick = rng.random()
+        if pick < 0.6:
+            sentence = rng.choice(snts[:120])
+            sentence = rng.choice([sentence, sentence.upper(), sentence.replace(" ", "  "), f" {sentence}!",
+                                   sentence.replace("'s", " 's")])
+        elif pick < 0.9:
+            sentence = f"Unrelated sentence {rng.randint(0, 50)} about bias."
+        else:
+            sentence = rng.choice(["", "...", "bias"])
+        rows.append({"doc_id": rng.choice(["", "7", "12", "120"]), "sentence": sentence})
+    sentence_path = tmp_path / "sentences.csv"
+    pd.DataFrame(rows).to_csv(sentence_path, index=False, quoting=1, escapechar="\\")
+    return str(amr_path), str(sentence_path), snts, rows
+
+
+def brute_force(snts, rows):
+    """{graph: [rows]} of every graph and row whose normalized, non-empty sentences are equal."""
+    keys = [normalize(s) if isinstance(s, str) else "" for s in snts]
+    return {g: [r for r, row in enumerate(rows) if key and normalize(row["sentence"]) == key]
+            for g, key in enumerate(keys)}
+
+
+def test_join_matches_brute_force(files):
+    amr_path, sentence_path, snts, rows = files
+    alignment = SentenceAlignment.build(amr_path, sentence_path)
+    expected = brute_force(snts, rows)
+    assert any(expected.values())
+    for g, matches in expected.items():
+        assert alignment.rows_of(g).tolist() == matches
+        assert alignment.documents_of(g) == [(int(rows[r]["doc_id"]) if rows[r]["doc_id"] else None, r)
+                                             for r in matches]
+    for r in range(len(rows)):
+        assert alignment.graphs_of(r).tolist() == [g for g, matches in expected.items() if r in matches]
+    graphs, pair_rows = alignment.pairs()
+    assert list(zip(graphs.tolist(), pair_rows.tolist())) == [(g, r) for g, ms in expected.items() for r in ms]
+    assert alignment.graph_number("synthetic_5") == 5 and alignment.graph_number("missing") is None
+
+
+def test_saved_alignment_and_join_with_row_results(files, tmp_path):
+    amr_path, sentence_path, snts, rows = files
+    alignment = SentenceAlignment.build(amr_path, sentence_path)
+    path = str(tmp_path / "aligned.alignment.npz")
+    alignment.save(path, ["key"])
+    assert SentenceAlignment.open(path, ["other key"]) is None
+    reopened = SentenceAlignment.open(path, ["key"])
+    assert reopened.graph_ids == alignment.graph_ids
+    pd.testing.assert_frame_equal(reopened.to_frame(), alignment.to_frame())
+
+    # per-row results (e.g. POS tags, row i for sentence row i) joined to graphs through the table
+    tags = pd.DataFrame({"bias_pos": [f"tag{r}" for r in range(len(rows))]})
+    joined = alignment.to_frame().merge(tags, left_on="row", right_index=True)
+    expected = brute_force(snts, rows)
+    assert sorted(zip(joined["graph"], joined["bias_pos"])) == sorted(
+        (g, f"tag{r}") for g, matches in expected.items() for r in matches)
+
+
+def test_normalize_ignores_case_spacing_and_punctuation():
+    assert normalize("AI's  BIAS!") == normalize("ai 's bias") == "aisbias"
+    assert normalize("Ｂｉａｓ") == "bias"
+    assert normalize("...") == ""
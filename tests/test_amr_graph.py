@@ -0,0 +1,37 @@
+"""IndexedGraph: concept lookups through the index against a scan of the :instance triples"""
+import penman
+import pytest
+
+from benchmarks.synthetic import write_amr
+from src.amr_graph import IndexedGraph
+from src.lexicon import TermMatcher
+
+
+@pytest.fixture(scope="module")
+def graphs(tmp_path_factory):
+    path = tmp_path_factory.mktemp("amr") / "graphs.amr"
+    write_amr(str(path), 200, seed=5)
+    return penman.load(str(path))
+
+
+def instances(graph):
+    return [(source, target) for source, role, target in graph.triples if role == ":instance" and target]
+
+
+@pytest.mark.parametrize("term", ["bias", "BIAS", "-0", "data", "nothing-here"])
+def test_find_nodes_matches_scan(graphs, term):
+    for graph in graphs:
+        expected = [variable for variable, concept in instances(graph) if term.lower() in concept.lower()]
+        assert IndexedGraph(graph).find_nodes(term) == expected
+
+
+def test_find_terms_matches_scan(graphs):
+    matcher = TermMatcher(["system", "bias", "data", "protect"])
+    for graph in graphs:
+        expected = {}
+        for variable, concept in instances(graph):
+            for term in matcher.terms_in(concept):
+                expected.setdefault(term, []).append(variable)
+        found = IndexedGraph(graph).find_terms(matcher)
+        assert found == expected
+        assert list(found) == list(expected)  # terms in the order of their first node
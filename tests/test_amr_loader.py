@@ -0,0 +1,29 @@
+"""Streaming AMR loader: parallel, chunked decoding against penman decoding the whole file"""
+import penman
+import pytest
+
+from benchmarks.synthetic import write_amr
+from src import amr_cache
+from src.amr_loader import iter_records, iter_records_between
+
+
+@pytest.fixture(scope="module")
+def amr_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("amr") / "loader.amr"
+    write_amr(str(path), 300, seed=6)
+    return str(path)
+
+
+def expected(path):
+    return [amr_cache.to_record(graph) for graph in penman.load(path)]
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+@pytest.mark.parametrize("chunk_size", [1, 500, 1 << 20])
+def test_chunked_decoding_matches_penman(amr_file, workers, chunk_size):
+    assert list(iter_records_between(amr_file, 0, workers=workers, chunk_size=chunk_size)) == expected(amr_file)
+
+
+def test_cached_records_match_decoded(amr_file):
+    decoded = list(iter_records(amr_file, workers=2))  # writes the cache
+    assert list(iter_records(amr_file)) == decoded == expected(amr_file)
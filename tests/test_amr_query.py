@@ -0,0 +1,95 @@
+"""AMR pattern queries: postings lookups against a brute-force scan of the penman triples"""
+import pytest
+
+from benchmarks.synthetic import write_amr
+from src import amr_cache
+from src.amr_arrays import AMRCorpus
+from src.amr_loader import iter_records
+from src.amr_query import AMRIndex, Pattern
+
+PATTERNS = [
+    "~bias",
+    "bias-01",
+    "~BIAS",
+    "*",
+    "nothing-here",
+    "~bias >:polarity=-",
+    "~bias !>:polarity=-",
+    "~bias <:ARG1",
+    "~bias !<:ARG1 >:mod",
+    "* <:ARG0/~bias",
+    "* >:mod/~bias",
+    "* >:ARG1/*",
+    "system >:ARG1",
+    "~a <:mod/~s !>:polarity=- >:ARG1/*",
+    "* >:op1=nothing",
+    "name <:name",
+]
+
+
+def concept_matches(spec, concept):
+    if concept is None:
+        return False
+    if spec == "*":
+        return True
+    if spec.startswith("~"):
+        return spec[1:].lower() in concept.lower()
+    return concept == spec
+
+
+def brute_force(graphs, pattern):
+    """(graph number, variable, concept) of every matching node, checking each node against each constraint."""
+    found = []
+    for number, graph in enumerate(graphs, 1):
+        instances = [(source, target) for source, role, target in graph.triples if role == ":instance"]
+        concepts = {}
+        for variable, concept in instances:
+            concepts.setdefault(variable, []).append(concept)
+        for variable, concept in instances:
+            if not concept_matches(pattern.concept, concept):
+                continue
+            matched = True
+            for direction, role, spec, constant, negated in pattern.constraints:
+                if direction == "<":
+                    hit = any(r == role and target == variable
+                              and (spec is None or any(concept_matches(spec, c) for c in concepts.get(source, ())))
+                              for source, r, target in graph.triples)
+                else:
+                    hit = any(r == role and source == variable
+                              and (constant is None or target == constant)
+                              and (constant is not None or spec is None
+                                   or any(concept_matches(spec, c) for c in concepts.get(target, ())))
+                              for source, r, target in graph.triples)
+                if hit == negated:
+                    matched = False
+                    break
+            if matched:
+                found.append((number, variable, concept))
+    return found
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    path = tmp_path_factory.mktemp("amr") / "query.amr"
+    write_amr(str(path), 400, seed=4)
+    records = list(iter_records(str(path), workers=1))
+    return AMRCorpus.from_records(records), [amr_cache.from_record(record) for record in records]
+
+
+@pytest.mark.parametrize("text", PATTERNS)
+def test_pattern_matches_brute_force(corpus, text):
+    arrays, graphs = corpus
+    result = AMRIndex(arrays).match(text)
+    expected = brute_force(graphs, Pattern.parse(text))
+    assert result.nodes() == expected
+    assert result.graphs() == sorted({number for number, _, _ in expected})
+
+
+def test_saved_postings_answer_like_fresh_ones(corpus, tmp_path):
+    arrays, _ = corpus
+    path = str(tmp_path / "query.postings.npz")
+    AMRIndex(arrays).save(path, ["key"])
+    reopened = AMRIndex.open(arrays, path, ["key"])
+    assert AMRIndex.open(arrays, path, ["other key"]) is None
+    for text in PATTERNS:
+        assert reopened.match(text).nodes() == AMRIndex(arrays).match(text).nodes()
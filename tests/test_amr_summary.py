@@ -0,0 +1,84 @@
+"""AMR stage summaries: appended graphs merged into a checkpoint against a full recompute"""
+import importlib
+import json
+
+import pytest
+
+from benchmarks.synthetic import write_amr
+from src import amr_summary
+from src.amr_arrays import load_amr_corpus
+
+
+def as_json(summary):
+    return json.dumps(summary, sort_keys=True)
+
+
+@pytest.fixture
+def graphs(tmp_path):
+    path = tmp_path / "all.amr"
+    write_amr(str(path), 300, seed=3)
+    return path.read_text(encoding="utf-8").split("\n\n")[:-1]
+
+
+def full_summary(path, module):
+    return as_json(module.summarize(load_amr_corpus(str(path)), 0))
+
+
+@pytest.mark.parametrize("stage", ["bias_amr", "bias_position_in_graph"])
+def test_appended_graphs_match_full_recompute(tmp_path, graphs, monkeypatch, stage):
+    module = importlib.import_module(f"src.{stage}")
+    path = tmp_path / f"{tmp_path.name}.amr"  # the cache is shared by the whole session
+    path.write_text("\n\n".join(graphs[:180]) + "\n\n", encoding="utf-8")
+    summary, count = amr_summary.update(str(path), stage, module.summarize, module.MATCHER.signature)
+    assert count == 180
+    assert as_json(summary) == full_summary(path, module)
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n\n".join(graphs[180:]) + "\n\n")
+    with monkeypatch.context() as patch:
+        # only the appended graphs may be decoded
+        patch.setattr(amr_summary, "load_amr_corpus", lambda *args, **kwargs: pytest.fail("full reload"))
+        summary, count = amr_summary.update(str(path), stage, module.summarize, module.MATCHER.signature)
+    assert count == 300
+    assert as_json(summary) == full_summary(path, module)
+
+
+def test_modified_prefix_is_summarized_again(tmp_path, graphs):
+    module = importlib.import_module("src.bias_amr")
+    path = tmp_path / f"{tmp_path.name}.amr"
+    path.write_text("\n\n".join(graphs[:200]) + "\n\n", encoding="utf-8")
+    amr_summary.update(str(path), "bias_amr", module.summarize, module.MATCHER.signature)
+
+    first = graphs[0].replace("(v0 / ", "(v0 / bias-01 :mod (x / ", 1) + ")"
+    path.write_text("\n\n".join([first] + graphs[1:]) + "\n\n", encoding="utf-8")
+    summary, count = amr_summary.update(str(path), "bias_amr", module.summarize, module.MATCHER.signature)
+    assert count == 300
+    assert as_json(summary) == full_summary(path, module)
+
+
+def test_graphs_appended_during_a_full_run_are_left_to_the_next(tmp_path, graphs, monkeypatch):
+    module = importlib.import_module("src.bias_position_in_graph")
+    path = tmp_path / f"{tmp_path.name}.amr"
+    prefix = tmp_path / "prefix.amr"
+    prefix.write_text("\n\n".join(graphs[:180]) + "\n\n", encoding="utf-8")
+    path.write_bytes(prefix.read_bytes())
+    stat = amr_summary.os.stat
+
+    def stat_then_append(target, *args, **kwargs):
+        result = stat(target, *args, **kwargs)
+        if str(target) == str(path):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n\n".join(graphs[180:]) + "\n\n")
+            monkeypatch.setattr(amr_summary.os, "stat", stat)
+        return result
+
+    monkeypatch.setattr(amr_summary.os, "stat", stat_then_append)
+    summary, count = amr_summary.update(str(path), "bias_position_in_graph", module.summarize,
+                                        module.MATCHER.signature)
+    assert count == 180
+    assert as_json(summary) == full_summary(prefix, module)
+
+    summary, count = amr_summary.update(str(path), "bias_position_in_graph", module.summarize,
+                                        module.MATCHER.signature)
+    assert count == 300
+    assert as_json(summary) == full_summary(path, module)
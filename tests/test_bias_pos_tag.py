@@ -0,0 +1,41 @@
+"""POS tagging: the per-row tag file against tagging each row on its own"""
+import nltk
+import pandas as pd
+from nltk.tokenize import word_tokenize
+
+from benchmarks.synthetic import write_charters
+
+
+def tag_of(sentence, forms):
+    """Tag of the first token that is one of `forms`, as bias_pos_tag always computed it row by row."""
+    for word, tag in nltk.pos_tag(word_tokenize(sentence)):
+        if word.lower() in forms:
+            return tag
+    return None
+
+
+def run(tmp_path, run_stage, name, extra_columns):
+    config = {"txt_path": str(tmp_path / "txts"), "MapAIE_csv_path": f"{name}.csv", "terms": ["bias", "fairness"],
+              "sentence_extra_columns": extra_columns, "headless": True}
+    run_stage("create_csv_sentence", **config)
+    run_stage("bias_pos_tag", **config)
+    sentences = pd.read_csv(tmp_path / f"{name}.csv", escapechar="\\")
+    tags = pd.read_csv(tmp_path / f"{name}.pos.csv", escapechar="\\")
+    return sentences, tags.astype(object).where(tags.notna(), None)
+
+
+def test_tag_file_has_the_tags_of_each_row(tmp_path, run_stage):
+    write_charters(str(tmp_path / "txts"), 6, seed=5, sentences=(5, 20))
+    sentences, tags = run(tmp_path, run_stage, "rows", [])
+    assert list(tags.columns) == ["bias_pos", "fairness_pos"] and len(tags) == len(sentences)
+    assert tags["bias_pos"].notna().any() and tags["fairness_pos"].notna().any()
+    for sentence, bias_pos, fairness_pos in zip(sentences["sentence"], tags["bias_pos"], tags["fairness_pos"]):
+        assert bias_pos == tag_of(sentence, {"bias"})
+        assert fairness_pos == tag_of(sentence, {"fairness"})
+
+    by_term, term_tags = run(tmp_path, run_stage, "by_term", ["term"])
+    assert len(term_tags) == len(by_term)
+    for sentence, term, bias_pos, fairness_pos in zip(by_term["sentence"], by_term["term"],
+                                                      term_tags["bias_pos"], term_tags["fairness_pos"]):
+        assert (bias_pos, fairness_pos) == ((tag_of(sentence, {"bias"}), None) if term == "bias"
+                                            else (None, tag_of(sentence, {"fairness"})))
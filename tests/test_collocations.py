@@ -0,0 +1,91 @@
+"""Collocations on token arrays against counting over token lists"""
+import math
+import random
+import string
+from collections import Counter
+
+import pytest
+
+from src.collocations import TokenCorpus
+
+WORDS = ["bias", "data", "ai", "fair", "model", "the", "of", "machine", "learning", "risk", "audit", "systems"]
+
+
+@pytest.fixture(scope="module")
+def documents():
+    rng = random.Random(7)
+    documents = []
+    for d in range(25):
+        tokens = [rng.choice(WORDS + ["Bias,", "(data)", "—", "...", "Machine", "learning."])
+                  for _ in range(rng.randint(0, 120))]
+        documents.append((f"doc_{d}.txt", " ".join(tokens)))
+    return documents
+
+
+def tokenize(text):
+    return [word for word in (raw.strip(string.punctuation) for raw in text.lower().split()) if word]
+
+
+def occurrences(docs, term):
+    words = term.split()
+    return [(d, i) for d, tokens in enumerate(docs)
+            for i in range(len(tokens) - len(words) + 1) if tokens[i:i + len(words)] == words]
+
+
+def expected_scores(docs, term, window, min_count):
+    """{word: (count, pmi, ll)} from the 2x2 table of window slots against the rest of the corpus."""
+    length = len(term.split())
+    joint, slots = Counter(), 0
+    for d, i in occurrences(docs, term):
+        tokens = docs[d]
+        around = tokens[max(i - window, 0):i] + tokens[i + length:i + length + window]
+        joint.update(around)
+        slots += len(around)
+    frequencies = Counter(word for tokens in docs for word in tokens)
+    total = sum(frequencies.values())
+    scores = {}
+    for word, o11 in joint.items():
+        if o11 < min_count or word in term.split():
+            continue
+        c1 = frequencies[word]
+        observed = [o11, slots - o11, c1 - o11, total - slots - c1 + o11]
+        expected = [slots * c1 / total, slots * (total - c1) / total,
+                    (total - slots) * c1 / total, (total - slots) * (total - c1) / total]
+        ll = 2 * sum(o * math.log(o / e) for o, e in zip(observed, expected) if o > 0)
+        scores[word] = (o11, math.log2(o11 / expected[0]), ll if o11 >= expected[0] else -ll)
+    return scores
+
+
+@pytest.mark.parametrize("term", ["bias", "machine learning", "the"])
+@pytest.mark.parametrize("window", [1, 5])
+def test_scores_match_the_contingency_table(documents, term, window):
+    corpus = TokenCorpus.from_texts(documents)
+    docs = [tokenize(text) for _, text in documents]
+    starts = corpus.find(term)
+    first = [sum(len(tokens) for tokens in docs[:d]) for d in range(len(docs))]
+    assert starts.tolist() == [first[d] + i for d, i in occurrences(docs, term)]
+
+    collocates = corpus.collocates(starts, len(term.split()), window, 2, exclude=term.split())
+    expected = expected_scores(docs, term, window, 2)
+    assert {word for word, _ in collocates} == set(expected)
+    for word, score in collocates:
+        count, pmi, ll = expected[word]
+        assert score["count"] == count
+        assert score["pmi"] == pytest.approx(pmi, abs=1e-3)
+        assert score["ll"] == pytest.approx(ll, abs=1e-3)
+    assert [score["ll"] for _, score in collocates] == sorted((score["ll"] for _, score in collocates), reverse=True)
+
+
+@pytest.mark.parametrize("term", ["bias", "machine learning"])
+@pytest.mark.parametrize("n", [2, 3])
+def test_ngrams_match_sliding_windows(documents, term, n):
+    corpus = TokenCorpus.from_texts(documents)
+    docs = [tokenize(text) for _, text in documents]
+    length = len(term.split())
+    expected = Counter()
+    for d, i in occurrences(docs, term):
+        tokens = docs[d]
+        for start in range(i + length - n, i + 1):
+            if start >= 0 and start + n <= len(tokens):
+                expected[" ".join(tokens[start:i] + [term] + tokens[i + length:start + n])] += 1
+    assert corpus.ngrams(corpus.find(term), length, n, term) == expected
@@ -0,0 +1,61 @@
+"""Concept search: blocked top-k against a brute-force cosine ranking"""
+import numpy as np
+import pytest
+
+from src.amr_embed import concept_index
+from src.concept_search import ConceptIndex, nearest_concepts
+from src.embedding_store import EmbeddingStore
+
+
+def brute_force(queries, vocabulary, top_k):
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    vocabulary = vocabulary / np.linalg.norm(vocabulary, axis=1, keepdims=True)
+    scores = queries @ vocabulary.T
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+    return order, np.take_along_axis(scores, order, axis=1)
+
+
+@pytest.fixture
+def embeddings():
+    rng = np.random.default_rng(0)
+    return rng.standard_normal((500, 16)).astype(np.float32), rng.standard_normal((7, 16)).astype(np.float32)
+
+
+@pytest.mark.parametrize("block_size", [1, 33, 500, 65536])
+@pytest.mark.parametrize("top_k", [1, 10, 600])
+def test_search_matches_brute_force(embeddings, block_size, top_k):
+    vocabulary, queries = embeddings
+    indices, scores = ConceptIndex(range(len(vocabulary)), vocabulary).search(queries, top_k, block_size)
+    expected_indices, expected_scores = brute_force(queries, vocabulary, top_k)
+    assert indices.shape == (len(queries), min(top_k, len(vocabulary)))
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-5, atol=1e-6)
+    assert np.array_equal(indices, expected_indices)
+
+
+def test_saved_index_answers_like_a_fresh_one(embeddings, tmp_path):
+    vocabulary, queries = embeddings
+    labels = [f"concept-{i}" for i in range(len(vocabulary))]
+    ConceptIndex(labels, vocabulary).save(str(tmp_path))
+    reopened = ConceptIndex.load(str(tmp_path))
+    assert isinstance(reopened.matrix, np.memmap)
+    queried = [f"query-{i}" for i in range(len(queries))]
+    assert (nearest_concepts(queried, queries, top_k=5, index=reopened)
+            == nearest_concepts(queried, queries, labels, vocabulary, top_k=5))
+
+
+def test_concept_index_is_reused_for_the_same_concepts(embeddings, tmp_path):
+    vocabulary, _ = embeddings
+    labels = [f"concept-{i}" for i in range(len(vocabulary))]
+    calls = []
+
+    def encode(texts):
+        calls.append(len(texts))
+        return vocabulary[[labels.index(text) for text in texts]]
+
+    store = EmbeddingStore("model", str(tmp_path))
+    first = concept_index(store, labels[:300], encode)
+    assert concept_index(store, labels[:300], encode).labels == first.labels
+    assert calls == [300]
+    grown = concept_index(store, labels, encode)
+    assert calls == [300, 200]
+    assert np.array_equal(grown.search(vocabulary[:5], 1)[0][:, 0], np.arange(5))
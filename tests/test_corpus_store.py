@@ -0,0 +1,67 @@
+"""Packed text corpus: refreshing a pack against packing from scratch and reading the files"""
+import os
+import random
+
+from benchmarks.synthetic import write_charters
+from src.corpus_store import CorpusStore
+
+
+def snapshot(text_dir, store_dir):
+    store = CorpusStore(str(text_dir), str(store_dir))
+    try:
+        return [(name, store.text(name), store.doc_id(name)) for name in store.order], store.pack
+    finally:
+        store.close()
+
+
+def test_refresh_matches_fresh_pack(tmp_path):
+    txts = tmp_path / "txts"
+    write_charters(str(txts), 10, seed=2, sentences=(5, 30))
+    (txts / "latin1.txt").write_bytes("Caf\xe9 bias\r\nline two\n".encode("latin-1"))
+    CorpusStore(str(txts), str(tmp_path / "incremental")).refresh()
+
+    rng = random.Random(0)
+    for round in range(4):
+        names = sorted(os.listdir(txts))
+        *modified, removed = rng.sample(names, 4)
+        for name in modified:
+            (txts / name).write_text(f"Round {round}: bias in {name}.\n", encoding="utf-8")
+        os.remove(txts / removed)
+        (txts / f"added_{round}.txt").write_text(f"Added in round {round}, about fairness.\n", encoding="utf-8")
+
+        store = CorpusStore(str(txts), str(tmp_path / "incremental"))
+        assert store.refresh() == 4
+        store.close()
+        fresh = CorpusStore(str(txts), str(tmp_path / f"fresh_{round}"))
+        fresh.refresh()
+        fresh.close()
+
+        documents, pack = snapshot(txts, tmp_path / "incremental")
+        assert documents == snapshot(txts, tmp_path / f"fresh_{round}")[0]
+        for name, text, _ in documents:
+            with open(txts / name, "r", encoding="utf-8", errors="ignore") as f:
+                assert text == f.read()
+    assert pack != "corpus.0.pack"  # stale texts outgrew the live ones and the pack was rewritten
+
+
+def test_touched_files_are_hashed_once(tmp_path, monkeypatch):
+    from src import manifest
+
+    txts = tmp_path / "txts"
+    write_charters(str(txts), 5, seed=3, sentences=(5, 10))
+    CorpusStore(str(txts), str(tmp_path / "store")).refresh()
+    for name in ("charter_00001.txt", "charter_00003.txt"):
+        mtime = os.path.getmtime(txts / name)
+        os.utime(txts / name, (mtime + 10, mtime + 10))  # touched, same content
+
+    hashed = []
+    file_hash = manifest.file_hash
+    monkeypatch.setattr(manifest, "file_hash", lambda path: hashed.append(os.path.basename(path)) or file_hash(path))
+    assert CorpusStore(str(txts), str(tmp_path / "store")).refresh() == 0
+    assert sorted(hashed) == ["charter_00001.txt", "charter_00003.txt"]
+    hashed.clear()
+    store = CorpusStore(str(txts), str(tmp_path / "store"))
+    assert store.refresh() == 0
+    assert hashed == []
+    assert store.text("charter_00003.txt") == (txts / "charter_00003.txt").read_text(encoding="utf-8")
+    store.close()
@@ -0,0 +1,86 @@
+"""Sentence corpus: incremental reruns and hit-window segmentation against full rebuilds"""
+import os
+import random
+import re
+
+import pytest
+
+from benchmarks.synthetic import write_charters
+
+
+def read_corpus(path):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.read_table(path).to_pydict()
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def txts(tmp_path):
+    directory = tmp_path / "txts"
+    write_charters(str(directory), 12, seed=1, sentences=(5, 40))
+    # files sharing a doc_id: two without digits, and annex2 next to charter_00002
+    (directory / "notes.txt").write_text("A note on bias. Nothing else.\n", encoding="utf-8")
+    (directory / "readme.txt").write_text("Fair and unbiased. The end.\n", encoding="utf-8")
+    (directory / "annex2.txt").write_text("Annex: bias audits. Fairness reviews.\n", encoding="utf-8")
+    return directory
+
+
+@pytest.mark.parametrize("extra_columns", [[], ["term", "start", "end"]])
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_incremental_rerun_matches_full_rebuild(tmp_path, txts, run_stage, fmt, extra_columns):
+    config = {"txt_path": str(txts), "MapAIE_csv_path": "data/bias-MapAIE.csv", "terms": ["bias", "fair"],
+              "sentence_format": fmt, "sentence_extra_columns": extra_columns}
+    output = os.path.join(tmp_path, "data", f"bias-MapAIE.{fmt}")
+    run_stage("create_csv_sentence", **config)
+
+    (txts / "charter_00003.txt").write_text("Rewritten: bias everywhere. Fair enough.\n", encoding="utf-8")
+    (txts / "readme.txt").write_text("Now about fairness only. And bias.\n", encoding="utf-8")
+    (txts / "appendix.txt").write_text("An appendix with bias. And more bias.\n", encoding="utf-8")
+    os.remove(txts / "charter_00005.txt")
+    mtime = os.path.getmtime(txts / "notes.txt")
+    os.utime(txts / "notes.txt", (mtime + 10, mtime + 10))  # touched, same content
+    assert "Extracting sentences from 3 of 15 documents." in run_stage("create_csv_sentence", **config)
+    incremental = read_corpus(output)
+
+    os.remove(output)
+    os.remove(output + ".manifest.json")
+    assert "Extracting sentences from 15 of 15 documents." in run_stage("create_csv_sentence", **config)
+    assert read_corpus(output) == incremental
+
+
+def test_files_listed_out_of_corpus_order_are_extracted_again():
+    from src.create_csv_sentence import files_to_copy
+
+    manifest = {"a": {"first_row": 0, "rows": 3}, "b": {"first_row": 3, "rows": 0},
+                "c": {"first_row": 3, "rows": 2}, "d": {"first_row": 5, "rows": 4}}
+    assert files_to_copy(["a", "b", "c", "d", "new"], manifest, set()) == {"a", "b", "c", "d"}
+    assert files_to_copy(["a", "c", "new", "d"], manifest, {"b"}) == {"a", "c", "d"}
+    # the directory now lists d before c: c's rows would have to be read back, so c is extracted again
+    assert files_to_copy(["b", "d", "a", "c"], manifest, set()) == {"b", "d"}
+
+
+@pytest.mark.parametrize("word_boundary", [False, True])
+def test_hit_segmentation_matches_full_documents(tmp_path, txts, run_stage, word_boundary):
+    config = {"txt_path": str(txts), "terms": ["bias", "fair"], "term_word_boundary": word_boundary,
+              "sentence_extra_columns": ["term", "start", "end"]}
+    run_stage("create_csv_sentence", MapAIE_csv_path="hits.csv", sentence_segmentation="hits", **config)
+    run_stage("create_csv_sentence", MapAIE_csv_path="full.csv", sentence_segmentation="full", **config)
+    assert read_corpus(str(tmp_path / "hits.csv")) == read_corpus(str(tmp_path / "full.csv"))
+
+
+def test_hit_spans_match_full_spans_on_adversarial_text():
+    from src.segment import hit_sentence_spans, sentence_spans
+
+    pattern = re.compile("bias", re.IGNORECASE)
+    pieces = ["bias", "Bias", "BIAS", "the", "Mr.", "Dr.", "etc.", "e.g.", "U.S.", "1.", "J.", "...", "!!!", "?",
+              "(bias.)", "\"bias.\"", "word.", "word", ")", "\n", "\n\n", "  ", "a.b.c.", "biasbias", "x"]
+    rng = random.Random(0)
+    for _ in range(300):
+        text = "".join(rng.choice(pieces) + rng.choice([" ", " ", "", "\n", "  "])
+                       for _ in range(rng.randint(1, 120)))
+        full = [(s, e) for s, e in sentence_spans(text) if pattern.search(text[s:e])]
+        for window in (1, 7, 1000):
+            hits = [(s, e) for s, e in hit_sentence_spans(text, pattern, window=window) if pattern.search(text[s:e])]
+            assert hits == full, (text, window)
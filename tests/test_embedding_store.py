@@ -0,0 +1,61 @@
+"""Embedding store: stored rows against encoding every text, across reopenings"""
+import zlib
+
+import numpy as np
+
+from src.embedding_store import EmbeddingStore
+
+
+class Encoder:
+    """Deterministic embeddings seeded by each text; records what it was asked to encode."""
+
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.stack([np.random.default_rng(zlib.crc32(text.encode())).standard_normal(self.dim)
+                         for text in texts]).astype(np.float32)
+
+
+def test_embed_matches_encoding_and_only_encodes_missing_texts(tmp_path):
+    encode = Encoder()
+    store = EmbeddingStore("model/one", str(tmp_path))
+    first = ["bias", "fairness", "bias", "system"]
+    assert np.array_equal(store.embed(first, encode), encode(first))
+    assert encode.calls[0] == ["bias", "fairness", "system"]
+
+    encode.calls.clear()
+    second = ["system", "equity", "bias", "audit", "equity"]
+    assert np.array_equal(store.embed(second, encode), Encoder()(second))
+    assert encode.calls == [["equity", "audit"]]
+    assert len(store) == 5
+
+    encode.calls.clear()
+    reopened = EmbeddingStore("model/one", str(tmp_path))
+    assert reopened.texts == store.texts
+    assert np.array_equal(reopened.embed(first + second, encode), Encoder()(first + second))
+    assert encode.calls == []
+    assert np.array_equal(reopened.matrix(), Encoder()(store.texts))
+
+
+def test_models_do_not_share_rows(tmp_path):
+    EmbeddingStore("model/one", str(tmp_path)).embed(["bias"], Encoder())
+    other = EmbeddingStore("model/two", str(tmp_path))
+    assert "bias" not in other
+    encode = Encoder(dim=4)
+    assert other.embed(["bias"], encode).shape == (1, 4)
+    assert encode.calls == [["bias"]]
+
+
+def test_index_ahead_of_matrix_starts_over(tmp_path):
+    store = EmbeddingStore("model/one", str(tmp_path))
+    store.embed(["bias", "fairness"], Encoder())
+    with open(store.matrix_path, "r+b") as f:
+        f.truncate(4 * store.dim)  # an interrupted write
+    encode = Encoder()
+    reopened = EmbeddingStore("model/one", str(tmp_path))
+    assert len(reopened) == 0
+    assert np.array_equal(reopened.embed(["fairness", "bias"], encode), Encoder()(["fairness", "bias"]))
+    assert encode.calls == [["fairness", "bias"]]
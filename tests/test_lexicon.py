@@ -0,0 +1,64 @@
+"""Term matcher: one-scan matching against trying every form at every position"""
+import random
+
+import pytest
+
+from src.lexicon import TermMatcher, inflections
+
+TERM_LISTS = [
+    ["bias"],
+    ["bias", "biased", "fair", "fairness"],
+    ["aa", "aaa", "a a"],  # terms starting inside other occurrences
+    ["machine learning", "learning", "ai"],
+    ["ana", "nan", "banana"],
+]
+
+
+def naive(text, terms, word_boundary, lemmas):
+    """(start, end, term) of the longest form of each term at each position."""
+    forms = {}
+    for term in terms:
+        for form in inflections(term) if lemmas else [term]:
+            forms.setdefault(form, term)
+    lowered = text.lower()
+    hits = {}
+    for start in range(len(text)):
+        if word_boundary and start > 0 and (text[start - 1].isalnum() or text[start - 1] == "_"):
+            continue
+        for form, term in forms.items():
+            end = start + len(form)
+            if lowered[start:end] != form:
+                continue
+            if word_boundary and end < len(text) and (text[end].isalnum() or text[end] == "_"):
+                continue
+            hits[start, term] = max(end, hits.get((start, term), end))
+    return sorted((start, end, term) for (start, term), end in hits.items())
+
+
+def random_text(rng, terms):
+    pieces = terms + [t.upper() for t in terms] + [t + "es" for t in terms] + [t + "ed" for t in terms] + [
+        "a", "an", "n", "s", "ed", "ing", "un", "-", "_", "'", ".", "learnings", "banananana", "é"]
+    return "".join(rng.choice(pieces) + rng.choice(["", " ", "  ", "\n", ", "]) for _ in range(rng.randint(0, 40)))
+
+
+@pytest.mark.parametrize("terms", TERM_LISTS)
+@pytest.mark.parametrize("word_boundary", [False, True])
+@pytest.mark.parametrize("lemmas", [False, True])
+def test_finditer_matches_naive_scan(terms, word_boundary, lemmas):
+    matcher = TermMatcher(terms, word_boundary=word_boundary, lemmas=lemmas)
+    rng = random.Random(repr((terms, word_boundary, lemmas)))
+    for _ in range(200):
+        text = random_text(rng, terms)
+        expected = naive(text, matcher.terms, word_boundary, lemmas)
+        hits = list(matcher.finditer(text))
+        assert [start for start, _, _ in hits] == sorted(start for start, _, _ in hits)
+        assert sorted(hits) == expected, text
+        assert matcher.count(text) == {term: sum(t == term for _, _, t in expected)
+                                       for term in {t for _, _, t in expected}}
+        assert matcher.terms_in(text) == [term for term in matcher.terms if any(t == term for _, _, t in expected)]
+
+
+def test_lemmas_count_under_their_term():
+    matcher = TermMatcher(["bias", "study"], lemmas=True)
+    assert matcher.count("Biases, biased, BIAS; studies and studied, unbiasedly.") == {"bias": 4, "study": 2}
+    assert TermMatcher(["bias"], word_boundary=True, lemmas=True).count("unbiased biases bias_x") == {"bias": 1}
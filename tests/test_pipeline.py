@@ -0,0 +1,64 @@
+"""Pipeline runner: when a stage counts as up to date"""
+import os
+
+import pytest
+
+from src import pipeline
+
+
+@pytest.fixture
+def stage(tmp_path, monkeypatch):
+    """A stage over a folder of three files, with no source files; listings are kept per stage name."""
+    monkeypatch.setattr(pipeline, "source_files", lambda name: [])
+    txts = tmp_path / "txts"
+    txts.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (txts / name).write_text(name, encoding="utf-8")
+    output = tmp_path / "out.csv"
+    return pipeline.Stage(tmp_path.name, inputs=[str(txts)], outputs=[str(output)], results=False)
+
+
+def age(path, seconds):
+    mtime = os.path.getmtime(path) - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def run(stage, tmp_path):
+    """What run_branch records around a stage run."""
+    listing = pipeline.input_listing(stage.inputs)
+    (tmp_path / "out.csv").write_text("rows", encoding="utf-8")
+    pipeline.save_manifest(pipeline.listing_path(stage), listing)
+
+
+def test_unchanged_inputs_are_up_to_date(stage, tmp_path):
+    assert not pipeline.is_up_to_date(stage)
+    run(stage, tmp_path)
+    assert pipeline.is_up_to_date(stage)
+    assert not pipeline.is_up_to_date(stage, headless=True)  # no listing recorded for headless runs
+
+
+@pytest.mark.parametrize("change", ["delete", "rename", "add", "modify"])
+def test_changed_folder_makes_the_stage_stale(stage, tmp_path, change):
+    run(stage, tmp_path)
+    txts = tmp_path / "txts"
+    if change == "delete":
+        os.remove(txts / "b.txt")
+    elif change == "rename":
+        os.rename(txts / "b.txt", txts / "d.txt")
+    elif change == "add":
+        (txts / "d.txt").write_text("d", encoding="utf-8")
+    else:
+        (txts / "b.txt").write_text("changed", encoding="utf-8")
+    assert not pipeline.is_up_to_date(stage)
+    if change != "modify":
+        # even where the folder's mtime does not move, the recorded listing differs
+        age(txts, 3600)
+        for path in txts.iterdir():
+            age(path, 3600)
+        assert not pipeline.is_up_to_date(stage)
+
+
+def test_newest_mtime_includes_the_folder_itself(tmp_path):
+    (tmp_path / "a.txt").write_text("a", encoding="utf-8")
+    age(tmp_path / "a.txt", 3600)
+    assert pipeline.newest_mtime([str(tmp_path)]) == os.path.getmtime(tmp_path)
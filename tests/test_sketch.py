@@ -0,0 +1,90 @@
+"""Approximate counting: sketch bounds and merges against exact counts of a Zipf stream"""
+import pickle
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.sketch import FrequencySketch, make_counter
+
+
+def zipf_stream(n, vocabulary, seed):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+    return rng.choices([f"w{rank}" for rank in range(vocabulary)], weights, k=n)
+
+
+def sketch_of(words, **options):
+    sketch = FrequencySketch(**options)
+    sketch.update(words)
+    sketch.most_common()  # hashes the words still buffered
+    return sketch
+
+
+SMALL = {"memory_mb": 0.01, "depth": 3, "capacity": 50}  # about 400 columns: collisions happen
+
+
+@pytest.fixture(scope="module")
+def stream():
+    return zipf_stream(40000, 5000, seed=1)
+
+
+def test_count_min_bounds(stream):
+    exact = Counter(stream)
+    sketch = sketch_of(stream, **SMALL)
+    words = list(exact)
+    estimates = sketch.estimate(words)
+    truth = np.array([exact[w] for w in words])
+    assert sketch.total == len(stream)
+    assert (estimates >= truth).all()
+    assert (estimates > truth).any()
+    too_high = estimates - truth > sketch.epsilon * sketch.total
+    assert too_high.mean() <= sketch.delta
+
+
+def test_space_saving_keeps_heavy_words(stream):
+    exact = Counter(stream)
+    sketch = sketch_of(stream, **SMALL)
+    threshold = sketch.total / sketch.capacity
+    assert len(sketch.counts) == sketch.capacity
+    assert {w for w, c in exact.items() if c > threshold} <= set(sketch.counts)
+    for word, (count, error) in sketch.counts.items():
+        assert count - error <= exact[word] <= count
+        assert error <= threshold
+    for word, count in sketch.most_common():
+        assert exact[word] <= count
+
+
+@pytest.mark.parametrize("parts", [2, 5])
+def test_merge_matches_one_sketch_of_the_whole_stream(stream, parts):
+    exact = Counter(stream)
+    whole = sketch_of(stream, **SMALL)
+    merged = sketch_of(stream[0::parts], **SMALL)
+    for k in range(1, parts):
+        merged.merge(pickle.loads(pickle.dumps(sketch_of(stream[k::parts], **SMALL))))
+    assert merged.total == whole.total
+    assert np.array_equal(merged.table, whole.table)
+    threshold = merged.total / merged.capacity
+    assert {w for w, c in exact.items() if c > threshold} <= set(merged.counts)
+    for word, (count, error) in merged.counts.items():
+        assert count - error <= exact[word] <= count
+    with pytest.raises(ValueError):
+        merged.merge(FrequencySketch(memory_mb=0.02, depth=3))
+
+
+def test_top_words_are_exact_on_a_zipf_stream(stream):
+    exact = Counter(stream)
+    sketch = sketch_of(iter(stream), memory_mb=1, depth=5, capacity=500)
+    expected = sorted(exact.items(), key=lambda item: (-item[1], item[0]))[:20]
+    assert sketch.most_common(20) == expected
+    assert sorted(make_counter("exact").most_common()) == []
+    assert isinstance(make_counter("sketch"), FrequencySketch)
+    with pytest.raises(ValueError):
+        make_counter("approximate")
+
+
+def test_describe_covers_buffered_words():
+    sketch = FrequencySketch(memory_mb=0.01, depth=3, capacity=4)
+    sketch.update(["bias"] * 40)
+    assert "every word above 10 occurrences is kept" in sketch.describe()